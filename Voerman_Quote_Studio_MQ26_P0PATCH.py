@@ -12,7 +12,7 @@ v4.4 – Adds ROAD freight support:
 Other parts kept as in v4.3. AI parser unchanged.
 """
 import os
-import copy, sys, json, traceback, requests, math, re, time
+import copy, functools, sys, json, threading, traceback, requests, math, re, time
 from dataclasses import dataclass
 from typing import Optional, Tuple, List, Dict
 from datetime import datetime
@@ -27,7 +27,7 @@ except Exception:
 try:
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import mm
-    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle, Image
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle, Image, Flowable
     from reportlab.lib import colors
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     REPORTLAB_OK = True
@@ -134,6 +134,30 @@ from geopy.distance import geodesic
 # --- utils ---
 from xml.sax.saxutils import escape
 
+# --- Rate-book cache (tarieven.xlsx één keer parsen per bestandsversie) ---
+try:
+    from engine import ratebook as _ratebook
+except Exception:
+    _ratebook = None
+try:
+    from engine import service_index as _service_index
+except Exception:
+    _service_index = None
+try:
+    from engine import lane_directory as _lane_directory
+except Exception:
+    _lane_directory = None
+try:
+    from engine import lane_rates as _lane_rates
+except Exception:
+    _lane_rates = None
+try:
+    from engine.pricing_engine import QuoteInput, PriceResult, PricingError, price as _engine_price, check_input as _engine_check
+    from engine.geo_context import GeoContext
+except Exception:
+    QuoteInput = PriceResult = _engine_price = _engine_check = GeoContext = None
+    class PricingError(Exception): pass
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -241,6 +265,11 @@ def _has_legacy():
 # =================== CONFIG ===================
 WAREHOUSE_OPERATION = "Nootdorp"
 WAREHOUSE_LOCATION  = "Nootdorp, Netherlands"
+# Vaste coördinaten van het warehouse (geen geocode per offerte); override: WAREHOUSE_LATLON="52.051,4.396"
+try:
+    WAREHOUSE_COORDS = tuple(float(x) for x in os.getenv("WAREHOUSE_LATLON", "52.051,4.396").split(","))[:2]
+except ValueError:
+    WAREHOUSE_COORDS = (52.051, 4.396)
 
 EXCEL_PAD        = "tarieven.xlsx"
 
@@ -660,7 +689,21 @@ class LineParams:
     volume_cbm: float
     distance_km: float
 
+def _from_ratebook(pad: str, key, build):
+    """Haal een afgeleid object uit de rate-book cache; zonder cache direct bouwen.
+    Het resultaat wordt gedeeld tussen runs: niet muteren."""
+    if _ratebook is None:
+        return build()
+    try:
+        book = _ratebook.get_ratebook(pad)
+    except OSError:
+        return build()
+    return book.get(key, build)
+
 def lees_services_sheet(pad: str, sheet) -> pd.DataFrame:
+    return _from_ratebook(pad, ("services", sheet), lambda: _lees_services_sheet(pad, sheet))
+
+def _lees_services_sheet(pad: str, sheet) -> pd.DataFrame:
     df = pd.read_excel(pad, sheet_name=sheet, header=0)
     missing = [v for v in COLS.values() if v not in df.columns]
     if missing: raise ValueError(f"Missing columns in services sheet: {missing}")
@@ -696,8 +739,16 @@ def geocode_country(addr: str) -> Tuple[Tuple[float,float], str, str]:
         if "Netherlands" in loc.address or "Nederland" in loc.address: cc = "nl"; name = "Netherlands"
     return (loc.latitude, loc.longitude), cc, name
 
+# Gedeelde ORS-client (routing.py: connection pool, gelijktijdige routes, matrix); zonder die module: losse requests.post
+try:
+    import routing as _ROUTING
+except Exception:
+    _ROUTING = None
+
 def ors_route_distance_km(a: Tuple[float,float], b: Tuple[float,float]) -> Optional[float]:
     if not ORS_API_KEY: return None
+    if _ROUTING is not None:
+        return _ROUTING.get_client(ORS_API_KEY).route_km(a, b)
     url = "https://api.openrouteservice.org/v2/directions/driving-car"
     headers = {"Authorization": ORS_API_KEY, "Content-Type": "application/json"}
     body = {"coordinates": [[a[1], a[0]], [b[1], b[0]]]}
@@ -709,17 +760,91 @@ def ors_route_distance_km(a: Tuple[float,float], b: Tuple[float,float]) -> Optio
     except Exception:
         return None
 
-def afstand_km_via_warehouse(free_addr: str, warehouse_addr: str) -> Tuple[float, str]:
-    a = geocode(free_addr); b = geocode(warehouse_addr)
+# Routecache + warehouse-tabel (distance_cache, SQLite gedeeld met de API); zonder die module: altijd live
+try:
+    import distance_cache as _DISTSTORE
+except Exception:
+    _DISTSTORE = None
+
+_ORS_NOTE = "OpenRouteService (route)"
+
+def _dist_cached(a, b) -> Optional[Tuple[float, str]]:
+    if _DISTSTORE is None: return None
+    try: return _DISTSTORE.get(a, b)
+    except Exception: return None
+
+def _dist_routed(a, b, km: float) -> Tuple[float, str]:
+    if _DISTSTORE is not None:
+        try: _DISTSTORE.put(a, b, km, _ORS_NOTE)
+        except Exception: pass
+    return km, _ORS_NOTE
+
+def _dist_estimate(a, b) -> Tuple[float, str]:
+    return geodesic(a, b).km * 1.25, "Geodesic × 1.25 (approx.)"
+
+def distance_between_coords(a: Tuple[float,float], b: Tuple[float,float]) -> Tuple[float, str]:
+    hit = _dist_cached(a, b)
+    if hit: return hit
     km = ors_route_distance_km(a, b)
-    return (geodesic(a, b).km * 1.25, "Geodesic × 1.25 (approx.)") if km is None else (km, "OpenRouteService (route)")
+    return _dist_estimate(a, b) if km is None else _dist_routed(a, b, km)
+
+def distances_between_coords_many(pairs) -> List[Tuple[float, str]]:
+    """distance_between_coords voor meerdere paren: cache eerst, de rest gelijktijdig via de ORS-client."""
+    out: List[Optional[Tuple[float, str]]] = [_dist_cached(a, b) for a, b in pairs]
+    todo = [i for i, hit in enumerate(out) if not hit]
+    if not (todo and ORS_API_KEY and _ROUTING is not None):
+        return [hit or distance_between_coords(*pairs[i]) for i, hit in enumerate(out)]
+    kms = _ROUTING.get_client(ORS_API_KEY).routes([pairs[i] for i in todo])
+    for i, km in zip(todo, kms):
+        if km is not None: out[i] = _dist_routed(*pairs[i], km)
+    return [hit or _dist_estimate(*pairs[i]) for i, hit in enumerate(out)]   # ORS faalde al: niet nog eens serieel
+
+def distances_from_coords(origin: Tuple[float,float], points) -> List[Tuple[float, str]]:
+    """Van één punt naar veel punten (warehouse-tabel): cache, dan de ORS-matrix in blokken; geodesisch als fallback."""
+    points = list(points)
+    out: List[Optional[Tuple[float, str]]] = [_dist_cached(origin, p) for p in points]
+    todo = [i for i, hit in enumerate(out) if not hit]
+    if todo and ORS_API_KEY and _ROUTING is not None:
+        row = _ROUTING.get_client(ORS_API_KEY).matrix_km([origin], [points[i] for i in todo])[0]
+        for i, km in zip(todo, row):
+            if km is not None: out[i] = _dist_routed(origin, points[i], km)
+    return [hit or _dist_estimate(origin, points[i]) for i, hit in enumerate(out)]
+
+def warehouse_table_km(addr: str) -> Optional[Tuple[float, str]]:
+    """(km, toelichting) uit de vooraf berekende warehouse-tabel, of None (dan geocode + route)."""
+    if _DISTSTORE is None: return None
+    try:
+        hit = _DISTSTORE.warehouse_km(addr, WAREHOUSE_COORDS)
+    except Exception:
+        return None
+    if hit and ORS_API_KEY and hit[1] != _ORS_NOTE: return None   # geschat zonder ORS; nu kan het exact
+    return hit
+
+def _coords(addr: str) -> Tuple[float, float]:
+    return WAREHOUSE_COORDS if addr == WAREHOUSE_LOCATION else geocode(addr)
+
+def afstand_km_via_warehouse(free_addr: str, warehouse_addr: str) -> Tuple[float, str]:
+    if warehouse_addr == WAREHOUSE_LOCATION:
+        hit = warehouse_table_km(free_addr)
+        if hit: return hit
+    return distance_between_coords(geocode(free_addr), _coords(warehouse_addr))
 
 def road_distance_between_addrs(origin_addr: str, dest_addr: str) -> Tuple[float, str]:
-    a = geocode(origin_addr); b = geocode(dest_addr)
-    km = ors_route_distance_km(a, b)
-    return (geodesic(a, b).km * 1.25, "Geodesic × 1.25 (approx.)") if km is None else (km, "OpenRouteService (route)")
+    return distance_between_coords(geocode(origin_addr), geocode(dest_addr))
 
 def match_service_rij(df: pd.DataFrame, p: LineParams) -> pd.Series:
+    """Origin/Destination-rij via de service-index (hash + bisect); zie _match_service_rij_scan."""
+    if _service_index is None:
+        return _match_service_rij_scan(df, p)
+    return _service_index.index_for(df, COLS).match(p)
+
+def match_service_rij_strict_op(df: pd.DataFrame, p: LineParams) -> pd.Series:
+    """Exacte Operation-match via de service-index; zie _match_service_rij_strict_op_scan."""
+    if _service_index is None:
+        return _match_service_rij_strict_op_scan(df, p)
+    return _service_index.index_for(df, COLS).match_strict(p)
+
+def _match_service_rij_scan(df: pd.DataFrame, p: LineParams) -> pd.Series:
     heeft_op = (df[COLS["operation"]].str.lower() == p.location_for_operation.lower().strip()).any()
     base = (
         (df[COLS["type"]].str.lower() == p.type_label.lower()) &
@@ -759,7 +884,7 @@ def match_service_rij(df: pd.DataFrame, p: LineParams) -> pd.Series:
     return cand.iloc[0]
 
 
-def match_service_rij_strict_op(df: pd.DataFrame, p: LineParams) -> pd.Series:
+def _match_service_rij_strict_op_scan(df: pd.DataFrame, p: LineParams) -> pd.Series:
     """
     Enforce exact Operation match for non-NL places. Ignores distance band and picks a single row that matches
     Type + Mode + Operation, with a preference for volume-appropriate rows or FLAT rate rows.
@@ -840,9 +965,12 @@ def calc_service_prijs(row: pd.Series, volume_cbm: float) -> float:
         return round(per_cbm * float(volume_cbm), 2)
     return round(float(flat_val or 0.0), 2)
 
-def lees_fcl_lanes(pad: str, sheet_name: str) -> pd.DataFrame:
+def lees_fcl_lanes(pad: str, sheet_name: str, header: int | None = None) -> pd.DataFrame:
+    return _from_ratebook(pad, ("fcl_lanes", sheet_name, header), lambda: _lees_fcl_lanes(pad, sheet_name, header))
+
+def _lees_fcl_lanes(pad: str, sheet_name: str, header: int | None = None) -> pd.DataFrame:
     last_err = None; df = None; cols = None
-    for hdr in range(0, 6):
+    for hdr in ([header] if header is not None else range(0, 6)):
         try:
             df_try = pd.read_excel(pad, sheet_name=sheet_name, header=hdr)
             cols_try = detect_cols(df_try, FCL_LANE_COLS)
@@ -867,16 +995,15 @@ def lees_fcl_lanes(pad: str, sheet_name: str) -> pd.DataFrame:
         "RATE_LCL_CBM": (num(df[cols["lcl"]]) if "lcl" in cols and cols["lcl"] in df.columns else pd.Series([pd.NA]*len(df)))
     })
 
-    name2code = {}
-    for _, r in out.iterrows():
-        if is_unlocode(r["OPORT_CODE"]): name2code[r["OPORT"]] = r["OPORT_CODE"]
-        if is_unlocode(r["DPORT_CODE"]): name2code[r["DPORT"]] = r["DPORT_CODE"]
-
-    def map_name_to_code(name):
-        if name in name2code: return name2code[name]
-        for k, v in name2code.items():
-            if str(k).lower() == str(name).lower(): return v
-        return None
+    if _lane_directory is not None:
+        map_name_to_code = _lane_directory.from_fcl_lanes(out, is_unlocode).lookup
+    else:
+        name2code = build_name_to_code(out)
+        def map_name_to_code(name):
+            if name in name2code: return name2code[name]
+            for k, v in name2code.items():
+                if str(k).lower() == str(name).lower(): return v
+            return None
 
     bad_o = ~out["OPORT_CODE"].apply(is_unlocode)
     out.loc[bad_o, "OPORT_CODE"] = out.loc[bad_o, "OPORT"].map(map_name_to_code)
@@ -886,7 +1013,26 @@ def lees_fcl_lanes(pad: str, sheet_name: str) -> pd.DataFrame:
 
     return out
 
+def _sheet_previews(excel_path: str) -> dict:
+    return _from_ratebook(excel_path, "sheet_previews", lambda: _ratebook.sheet_previews(excel_path))
+
+def _score_fcl_cols(columns) -> int:
+    return len(detect_cols(pd.DataFrame(columns=columns), FCL_LANE_COLS))
+
+def detect_fcl_lanes_sheet(excel_path: str) -> Tuple[str, Optional[int]]:
+    """(sheetnaam, header-rij) van de FCL lanes; één preview per sheet, resultaat gecachet."""
+    if _ratebook is None:
+        return (_auto_find_fcl_lanes_sheet(excel_path), None)
+    def _detect():
+        hit = _ratebook.detect_sheet(_sheet_previews(excel_path), _score_fcl_cols, prefer=("FCL","LANE","FREIGHT","SEA"))
+        if not hit: raise ValueError("Could not auto-detect the FCL lanes sheet.")
+        return hit
+    return _from_ratebook(excel_path, ("detect", "fcl"), _detect)
+
 def auto_find_fcl_lanes_sheet(excel_path: str) -> str:
+    return detect_fcl_lanes_sheet(excel_path)[0]
+
+def _auto_find_fcl_lanes_sheet(excel_path: str) -> str:
     xls = pd.ExcelFile(excel_path)
     best = None
     for name in xls.sheet_names:
@@ -903,7 +1049,19 @@ def auto_find_fcl_lanes_sheet(excel_path: str) -> str:
         raise ValueError("Could not auto-detect the FCL lanes sheet.")
     return best[1]
 
+def port_directory(df_lanes: pd.DataFrame):
+    """LaneDirectory van een FCL lanes-frame (één keer per frame opgebouwd), of None."""
+    if _lane_directory is None: return None
+    return _lane_directory.for_frame(df_lanes, "fcl", lambda: _lane_directory.from_fcl_lanes(df_lanes, is_unlocode))
+
+def air_directory(df: pd.DataFrame, cols: Dict[str,str]):
+    """LaneDirectory van een AIR lanes-frame, of None."""
+    if _lane_directory is None: return None
+    return _lane_directory.for_frame(df, "air", lambda: _lane_directory.from_air_lanes(df, cols))
+
 def build_name_to_code(df_lanes: pd.DataFrame) -> dict:
+    d = port_directory(df_lanes)
+    if d is not None: return dict(d.name2code)
     m = {}
     for _, r in df_lanes.iterrows():
         if is_unlocode(r["OPORT_CODE"]): m[str(r["OPORT"]).strip()] = r["OPORT_CODE"]
@@ -911,6 +1069,8 @@ def build_name_to_code(df_lanes: pd.DataFrame) -> dict:
     return m
 
 def build_code_to_name(df_lanes: pd.DataFrame) -> dict:
+    d = port_directory(df_lanes)
+    if d is not None: return dict(d.code2name)
     m = {}
     for _, r in df_lanes.iterrows():
         oc, dc = str(r.get("OPORT_CODE","")).strip().upper(), str(r.get("DPORT_CODE","")).strip().upper()
@@ -922,6 +1082,11 @@ def build_code_to_name(df_lanes: pd.DataFrame) -> dict:
 def resolve_port_input(inp: str, df_lanes: pd.DataFrame) -> str:
     s = (inp or "").strip()
     if is_unlocode(s): return s.upper()
+    d = port_directory(df_lanes)
+    if d is not None:
+        code = d.lookup(s)
+        if code is None: raise ValueError(f"Could not resolve UN/LOCODE for '{inp}'.")
+        return code
     name2code = build_name_to_code(df_lanes)
     if s in name2code: return name2code[s]
     for k, v in name2code.items():
@@ -930,6 +1095,12 @@ def resolve_port_input(inp: str, df_lanes: pd.DataFrame) -> str:
 
 def fcl_rates_for_lane(df_lanes: pd.DataFrame, o_code: str, d_code: str) -> Dict[str, float]:
     o_code = o_code.strip().upper(); d_code = d_code.strip().upper()
+    if _lane_rates is not None:
+        lane = _lane_rates.fcl_table(df_lanes).get((o_code, d_code))
+        if lane is None: raise LookupError(f"No FCL lane for {o_code} → {d_code}.")
+        rates = lane.containers()
+        if not rates: raise LookupError("No container rates filled for this lane.")
+        return rates
     sub = df_lanes[(df_lanes["OPORT_CODE"] == o_code) & (df_lanes["DPORT_CODE"] == d_code)]
     if sub.empty:
         sub = df_lanes[(df_lanes["OPORT_CODE"] == d_code) & (df_lanes["DPORT_CODE"] == o_code)]
@@ -941,10 +1112,49 @@ def fcl_rates_for_lane(df_lanes: pd.DataFrame, o_code: str, d_code: str) -> Dict
     if not rates: raise LookupError("No container rates filled for this lane.")
     return rates
 
+def lcl_rate_for_lane(df_lanes: pd.DataFrame, pol: str, pod: str) -> Optional[float]:
+    """LCL-tarief per cbm uit de lanes-sheet (RATE_LCL_CBM), of None als de lane/waarde ontbreekt."""
+    if "RATE_LCL_CBM" not in df_lanes.columns: return None
+    if _lane_rates is not None:
+        return _lane_rates.lcl_table(df_lanes).get((pol, pod))
+    pair = df_lanes[((df_lanes["OPORT_CODE"]==pol) & (df_lanes["DPORT_CODE"]==pod)) | ((df_lanes["OPORT_CODE"]==pod) & (df_lanes["DPORT_CODE"]==pol))]
+    if pair.empty: return None
+    val = pd.to_numeric(pair.iloc[0].get("RATE_LCL_CBM"), errors="coerce")
+    return None if pd.isna(val) else float(val)
+
 def choose_fcl_combo(volume_cbm: float, rates: Dict[str, float]) -> Dict[str, int]:
+    """Goedkoopste containercombinatie; zie fcl_combo_options."""
+    return fcl_combo_options(volume_cbm, rates, top_n=1)[0][1]
+
+def fcl_combo_options(volume_cbm: float, rates: Dict[str, float], top_n: int = 5) -> List[Tuple[float, Dict[str, int]]]:
+    """Beste `top_n` combinaties [(kosten, {"20FT","40FT","40HQ"}), ...], goedkoopste eerst (de eerste is
+    wat _choose_fcl_combo_scan kiest). Gememoiseerd per (volume in 0,1 cbm, tarieven, top_n); de
+    capaciteiten zijn veelvouden van 0,1 cbm, dus afronden naar boven verandert de uitkomst niet."""
+    if not any(t in rates for t in ["40HQ","40FT","20FT"]): raise LookupError("No usable FCL rates.")
+    units = max(0, math.ceil(float(volume_cbm) * 10 - 1e-9))
+    opts = _fcl_options_memo(units, tuple(sorted((t, float(r)) for t, r in rates.items())), max(1, int(top_n)))
+    return [(cost, dict(combo)) for cost, combo in opts]
+
+@functools.lru_cache(maxsize=4096)
+def _fcl_options_memo(units: int, rates_key: tuple, top_n: int) -> tuple:
+    volume_cbm, rates = units / 10, dict(rates_key)
+    best = _choose_fcl_combo_scan(volume_cbm, rates)
+    if top_n == 1: return ((_fcl_cost(best, rates), tuple(best.items())),)   # choose_fcl_combo: geen alternatieven nodig
+    cap = FCL_CAPACITY
+    def _minimal(c):   # geen overbodige container: één minder dekt het volume niet meer
+        total = sum(n * cap.get(t, 0) for t, n in c.items())
+        return all(total - cap.get(t, 0) < volume_cbm - 1e-9 for t, n in c.items() if n)
+    others = sorted(((cost, sum(c.values()), c) for cost, c in _fcl_combos(volume_cbm, rates) if c != best and _minimal(c)),
+                    key=lambda x: (x[0], x[1]))
+    opts = [(_fcl_cost(best, rates), best)] + [(cost, c) for cost, _n, c in others]
+    return tuple((cost, tuple(c.items())) for cost, c in opts[:top_n])
+
+def _fcl_cost(combo: Dict[str, int], rates: Dict[str, float]) -> float:
+    return combo["40HQ"]*rates.get("40HQ",0.0)+combo["40FT"]*rates.get("40FT",0.0)+combo["20FT"]*rates.get("20FT",0.0)
+
+def _fcl_combos(volume_cbm: float, rates: Dict[str, float]):
+    """Alle kandidaten van de scan (kosten, combinatie) die het volume dekken, in scan-volgorde."""
     cap = FCL_CAPACITY; types = [t for t in ["40HQ","40FT","20FT"] if t in rates]
-    if not types: raise LookupError("No usable FCL rates.")
-    best_cost = math.inf; best = {"20FT":0,"40FT":0,"40HQ":0}
     max_hq = math.ceil(volume_cbm / cap.get("40HQ", 1e9)) + 3 if "40HQ" in types else 0
     for n_hq in range(0, max_hq+1):
         vol_after_hq = max(0.0, volume_cbm - n_hq*cap.get("40HQ",0))
@@ -958,9 +1168,16 @@ def choose_fcl_combo(volume_cbm: float, rates: Dict[str, float]) -> Dict[str, in
                 if vol_after_40>0: continue
             total_cap = n_hq*cap.get("40HQ",0)+n_40*cap.get("40FT",0)+n_20*cap.get("20FT",0)
             if total_cap < volume_cbm - 1e-9: continue
-            cost = n_hq*rates.get("40HQ",0.0)+n_40*rates.get("40FT",0.0)+n_20*rates.get("20FT",0.0)
-            if (cost < best_cost - 1e-6) or (abs(cost-best_cost)<=1e-6 and (n_hq+n_40+n_20) < (best["40HQ"]+best["40FT"]+best["20FT"])):
-                best_cost = cost; best = {"20FT":n_20,"40FT":n_40,"40HQ":n_hq}
+            combo = {"20FT":n_20,"40FT":n_40,"40HQ":n_hq}
+            yield _fcl_cost(combo, rates), combo
+
+def _choose_fcl_combo_scan(volume_cbm: float, rates: Dict[str, float]) -> Dict[str, int]:
+    types = [t for t in ["40HQ","40FT","20FT"] if t in rates]
+    if not types: raise LookupError("No usable FCL rates.")
+    best_cost = math.inf; best = {"20FT":0,"40FT":0,"40HQ":0}
+    for cost, combo in _fcl_combos(volume_cbm, rates):
+        if (cost < best_cost - 1e-6) or (abs(cost-best_cost)<=1e-6 and sum(combo.values()) < sum(best.values())):
+            best_cost = cost; best = combo
     if math.isinf(best_cost): raise LookupError("No container combination covers this volume.")
     return best
 
@@ -997,7 +1214,23 @@ def _detect_cols_any(df: pd.DataFrame, candidates: Dict[str, List[str]]) -> Dict
 def _is_iata(s: str) -> bool:
     return isinstance(s, str) and s.strip().isalpha() and len(s.strip())==3
 
+def _score_air_cols(columns) -> int:
+    return len(_detect_cols_any(pd.DataFrame(columns=columns), AIR_LANE_COLS))
+
+def detect_air_lanes_sheet(excel_path: str) -> Tuple[str, Optional[int]]:
+    """(sheetnaam, header-rij) van de AIR lanes; één preview per sheet, resultaat gecachet."""
+    if _ratebook is None:
+        return (_air_auto_sheet(excel_path), None)
+    def _detect():
+        hit = _ratebook.detect_sheet(_sheet_previews(excel_path), _score_air_cols, prefer=("AIR","AIRFREIGHT","AIR FREIGHT","AIR_LANES"))
+        if not hit: raise ValueError("Could not auto-detect the AIR lanes sheet.")
+        return hit
+    return _from_ratebook(excel_path, ("detect", "air"), _detect)
+
 def air_auto_sheet(excel_path: str) -> str:
+    return detect_air_lanes_sheet(excel_path)[0]
+
+def _air_auto_sheet(excel_path: str) -> str:
     xls = pd.ExcelFile(excel_path)
     best = None
     for name in xls.sheet_names:
@@ -1013,9 +1246,12 @@ def air_auto_sheet(excel_path: str) -> str:
     if not best: raise ValueError("Could not auto-detect the AIR lanes sheet.")
     return best[1]
 
-def lees_air_lanes(pad: str, sheet_name: str):
+def lees_air_lanes(pad: str, sheet_name: str, header: int | None = None):
+    return _from_ratebook(pad, ("air_lanes", sheet_name, header), lambda: _lees_air_lanes(pad, sheet_name, header))
+
+def _lees_air_lanes(pad: str, sheet_name: str, header: int | None = None):
     last_err = None; df=None; cols=None
-    for hdr in range(0,6):
+    for hdr in ([header] if header is not None else range(0,6)):
         try:
             df_try = pd.read_excel(pad, sheet_name=sheet_name, header=hdr)
             cols_try = _detect_cols_any(df_try, AIR_LANE_COLS)
@@ -1035,6 +1271,11 @@ def lees_air_lanes(pad: str, sheet_name: str):
 def resolve_air_input(inp: str, df: pd.DataFrame, cols: Dict[str,str]) -> str:
     s = (inp or "").strip()
     if _is_iata(s): return s.upper()
+    d = air_directory(df, cols)
+    if d is not None:
+        code = d.lookup(s)
+        if code is None: raise ValueError(f"Could not resolve IATA for '{inp}'.")
+        return code
     oc, ocode = cols.get("oport"), cols.get("ocode")
     dc, dcode = cols.get("dport"), cols.get("dcode")
     name2code = {}
@@ -1053,6 +1294,12 @@ def air_rates_for_lane(df: pd.DataFrame, cols: Dict[str,str], o_code: str, d_cod
     oc, dc = cols.get("ocode"), cols.get("dcode")
     if not oc or not dc: raise ValueError("AIR lanes sheet lacks IATA code columns.")
     o = o_code.strip().upper(); d = d_code.strip().upper()
+    if _lane_rates is not None:
+        lane = _lane_rates.air_table(df, cols).get((o, d))
+        if lane is None: raise LookupError(f"No AIR lane for {o} → {d}.")
+        rates = lane.brackets()
+        if not rates: raise LookupError("No AIR bracket rates filled for this lane.")
+        return rates
     sub = df[(df[oc].astype(str).str.upper()==o) & (df[dc].astype(str).str.upper()==d)]
     if sub.empty:
         sub = df[(df[oc].astype(str).str.upper()==d) & (df[dc].astype(str).str.upper()==o)]
@@ -1087,6 +1334,16 @@ def find_lcl_rate_per_cbm(df_services: pd.DataFrame, pol_code: str, pod_code: st
     pair1 = f"{pol_code}-{pod_code}".strip().upper()
     pair2 = f"{pod_code}-{pol_code}".strip().upper()
 
+    if _lane_rates is not None:
+        table = _lane_rates.lcl_service_table(df_services, COLS)
+        hits = [table[k] for k in (pair1, pair2) if k in table]
+        if not hits:
+            raise LookupError(f"LCL tarief niet gevonden voor lane {pair1} in tarieven sheet (PORT CODE).")
+        rate = pd.to_numeric(min(hits)[1], errors="coerce")
+        if pd.isna(rate):
+            raise LookupError(f"LCL tarief gevonden voor {pair1}, maar waarde is niet numeriek.")
+        return float(rate)
+
     m_type = df_services[tcol].astype(str).str.strip().str.casefold() == "freight"
     m_mode = df_services[mcol].astype(str).str.strip().str.casefold() == "lcl"
     pser   = df_services[pcol].astype(str).str.strip().str.upper()
@@ -1154,6 +1411,9 @@ def _detect_cols_any(df: pd.DataFrame, candidates: Dict[str, List[str]]) -> Dict
     return out
 
 def lees_dest_only_charges(pad: str, sheet_name: str = DEST_ONLY_SHEET):
+    return _from_ratebook(pad, ("dest_only", sheet_name), lambda: _lees_dest_only_charges(pad, sheet_name))
+
+def _lees_dest_only_charges(pad: str, sheet_name: str = DEST_ONLY_SHEET):
     xls = pd.ExcelFile(pad)
     if sheet_name not in xls.sheet_names:
         raise ValueError(f"Sheet '{sheet_name}' niet gevonden. Maak een tab '{sheet_name}' met de voorgestelde kolommen.")
@@ -2193,6 +2453,14 @@ class App(tk.Tk):
 
     def _run_for_selected_quotes(self, merge=False):
         """Generate PDFs for the quotes currently checked in the selection vars."""
+        # één geocode-context voor alle geselecteerde offertes (elk adres één keer)
+        self._geo_run = new_geo_context()
+        try:
+            return self._run_for_selected_quotes_inner(merge)
+        finally:
+            self._geo_run = None
+
+    def _run_for_selected_quotes_inner(self, merge=False):
         # snapshot current quote
         cur = getattr(self, "_active_quote", 0)
         # make sure UI state is saved for active quote
@@ -2971,6 +3239,30 @@ class App(tk.Tk):
             except Exception:
                 pass
 
+    def _destonly_inputs(self, inp, mode: str):
+        """Destination-only velden uit de UI in `inp` zetten (container / gross cbm / kg / override)."""
+        if mode == "FCL":
+            inp.dest_only_container = self.cmb_destonly_fcl.get().strip() if hasattr(self,"cmb_destonly_fcl") and self.cmb_destonly_fcl.winfo_exists() else "20FT"
+        elif mode == "LCL":
+            try:
+                inp.dest_only_gross_cbm = float((self.ent_destonly_gross.get() or "0").replace(",", "."))
+            except Exception:
+                try:
+                    inp.dest_only_gross_cbm = float(self.ent_volume.get().replace(",", ".")) * 1.2
+                except Exception:
+                    inp.dest_only_gross_cbm = 0.0
+        elif mode == "AIR":
+            try:
+                inp.dest_only_air_kg = float((self.ent_destonly_airkg.get() or "0").replace(",", "."))
+            except Exception:
+                inp.dest_only_air_kg = 0.0
+        try:
+            t = (self.ent_destonly_rate.get() or "").strip()
+            if t: inp.dest_only_rate = float(t.replace(",", "."))
+        except Exception:
+            inp.dest_only_rate = None
+        inp.dest_only_label = (self.var_destonly_label.get() or "").strip()
+
     def run(self, output_path: str | None = None):
         """Generate a PDF for the active quote.
         If output_path is provided, saves directly to that path (no Save-as dialog).
@@ -2986,360 +3278,52 @@ class App(tk.Tk):
         When output_path is provided, bypasses the Save-as dialog.
         """
         use_origin  = self.var_origin.get(); use_freight = self.var_freight.get(); use_dest = self.var_dest.get()
-        if not (use_origin or use_freight or use_dest):
-            messagebox.showwarning("Input", "Select at least one service (Origin / Freight / Destination)."); return
-
         origin_addr = self.ent_origin.get().strip(); dest_addr = self.ent_dest.get().strip()
-        if (use_origin or use_freight) and not origin_addr:
-            messagebox.showwarning("Input", "Enter an Origin location or untick related services."); return
-        if use_dest and not dest_addr:
-            messagebox.showwarning("Input", "Enter a Destination location or untick related services."); return
-
         mode = self.cmb_mode.get().strip().upper()
-        # Determine countries for origin/destination (skip origin when only Destination is selected)
-        try:
-            cc_o = None
-            if (use_origin or use_freight) and origin_addr:
-                (_o_ll, cc_o, _name_o) = geocode_country(origin_addr)
-            cc_d = None
-            if dest_addr:
-                (_d_ll, cc_d, _name_d) = geocode_country(dest_addr)
-        except Exception as e:
-            messagebox.showerror("Geocoding", f"Could not geocode country: {e}"); return
         try:
             volume_cbm = float(self.ent_volume.get().replace(",", ".").strip())
-            if volume_cbm <= 0: raise ValueError
         except ValueError:
-            messagebox.showwarning("Input", "Volume (m³) invalid or ≤ 0."); return
+            volume_cbm = float("nan")
 
         klant = self.ent_klant.get().strip() or None; ref = self.ent_ref.get().strip() or None
         excel = self.ent_excel.get().strip() or EXCEL_PAD; logo = self.ent_logo.get().strip() or None
         fcl_sheet_name = (getattr(self, 'ent_fclsheet', None).get().strip() if getattr(self, 'ent_fclsheet', None) else "")
         fcl_choice = self.cmb_fcl_choice.get().strip() if self.cmb_fcl_choice.winfo_exists() else "Auto (best price)"
 
+        try:
+            road_rate = float(self.ent_road_rate.get().replace(",", ".").strip())
+        except Exception:
+            road_rate = None
+        inp = QuoteInput(
+            mode=mode, origin=origin_addr, destination=dest_addr, volume_cbm=volume_cbm,
+            use_origin=bool(use_origin), use_freight=bool(use_freight), use_dest=bool(use_dest),
+            pol=self.ent_pol.get().strip(), pod=self.ent_pod.get().strip(),
+            excel_path=excel, fcl_sheet=fcl_sheet_name, fcl_choice=fcl_choice,
+            road_type=self.cmb_road_type.get(), road_rate=road_rate)
+        # eerst de invoer controleren (zoals vroeger), pas daarna naar de Excel vragen
+        geo = getattr(self, "_geo_run", None) or new_geo_context()
+        try:
+            check_quote_input(inp, geo)
+        except PricingError as e:
+            (messagebox.showwarning if e.kind == "warning" else messagebox.showerror)(e.title, e.message); return
+
         if not os.path.isfile(excel):
             messagebox.showwarning("File not found", f"Excel not found: {excel}\nPick the correct file now.")
             picked = filedialog.askopenfilename(title="Choose tarieven.xlsx", filetypes=[("Excel","*.xlsx *.xls")])
             if not picked: self.set_status("Cancelled: no Excel chosen."); return
             excel = picked; self.ent_excel.delete(0, tk.END); self.ent_excel.insert(0, excel)
+            inp.excel_path = excel
+        if use_dest and not use_origin and not use_freight:
+            self._destonly_inputs(inp, mode)
 
-        try: df = lees_services_sheet(excel, SERVICES_SHEET)
-        except Exception as e:
-            messagebox.showerror("Excel read error (services)", f"{e}"); return
-
-        # Distances to warehouse
-        okm = onote = None; dkm = dnote = None
-        if use_origin: okm, onote = afstand_km_via_warehouse(origin_addr, WAREHOUSE_LOCATION)
-        if use_dest:   dkm, dnote = afstand_km_via_warehouse(dest_addr, WAREHOUSE_LOCATION)
-
-        charges_rows = []
-        dest_only_rows = []
-        only_dest = (not use_origin) and (not use_freight) and use_dest
-        if only_dest and mode in ("FCL","LCL","AIR"):
-            try:
-                df_dest, dest_cols = lees_dest_only_charges(excel, DEST_ONLY_SHEET)
-            except Exception as e:
-                messagebox.showerror("Excel (DestOnlyCharges)", f"{e}"); return
-            try:
-                (_, cc_d, name_d) = geocode_country(dest_addr)
-                dest_country = ("Netherlands" if (cc_d=="nl" and name_d) else (name_d or "Netherlands"))
-            except Exception:
-                dest_country = "Netherlands"
-            container = None; gross_cbm_val = None; air_kg_val = None
-            if mode == "FCL":
-                container = self.cmb_destonly_fcl.get().strip() if hasattr(self,"cmb_destonly_fcl") and self.cmb_destonly_fcl.winfo_exists() else "20FT"
-            elif mode == "LCL":
-                try:
-                    gross_cbm_val = float((self.ent_destonly_gross.get() or "0").replace(",", "."))
-                except Exception:
-                    try:
-                        gross_cbm_val = float(self.ent_volume.get().replace(",", ".")) * 1.2
-                    except Exception:
-                        gross_cbm_val = 0.0
-            elif mode == "AIR":
-                try:
-                    air_kg_val = float((self.ent_destonly_airkg.get() or "0").replace(",", "."))
-                except Exception:
-                    air_kg_val = 0.0
-                # Fallback: if not provided, derive chargeable kg from volume (cbm * 167)
-                try:
-                    if not air_kg_val:
-                        vol_tmp = float((self.ent_volume.get() or "0").replace(",", "."))
-                        air_kg_val = round(vol_tmp * 167.0, 2)
-                except Exception:
-                    pass
-            try:
-                (cname, qty_val, qty_unit, rate_str, amt) = find_dest_only_rate(df_dest, dest_cols, dest_country, mode, container, gross_cbm_val, air_kg_val)
-            except Exception as e:
-                messagebox.showerror("Dest-only rates", f"{e}"); return
-            # override rate
-            override_rate = None
-            try:
-                t = (self.ent_destonly_rate.get() or "").strip()
-                if t: override_rate = float(t.replace(",", "."))
-            except Exception:
-                override_rate = None
-            if override_rate is not None:
-                if mode == "FCL":
-                    amt = override_rate
-                    rate_str = eur(override_rate)
-                elif mode == "LCL":
-                    amt = round(override_rate * (qty_val or 0.0), 2)
-                    rate_str = eur(override_rate) + " / cbm gross"
-                elif mode == "AIR":
-                    amt = round(override_rate * (qty_val or 0.0), 2)
-                    rate_str = eur(override_rate) + " / kg"
-            qty_disp = f"{qty_val:g} {qty_unit}" if qty_unit else (f"{qty_val:g}" if qty_val is not None else "-")
-            label_override = (self.var_destonly_label.get() or "").strip()
-            descr = label_override if label_override and label_override != "(auto)" else cname
-            dest_only_rows.append({"descr": descr, "qty": qty_disp, "rate": rate_str, "amount": amt})
-
-
-        # ========== ROAD logic ==========
-        if mode == "ROAD":
-            # Determine domestic vs international (only for the addresses we actually need)
-            try:
-                cc_o = cc_d = None
-                if (use_origin or use_freight) and origin_addr:
-                    (_, cc_o, _name_o) = geocode_country(origin_addr)
-                if (use_dest or use_freight) and dest_addr:
-                    (_, cc_d, _name_d) = geocode_country(dest_addr)
-                if use_freight and (not origin_addr or not dest_addr):
-                    raise ValueError("Both origin and destination required for road freight.")
-            except Exception as e:
-                messagebox.showerror("Geocoding", f"Could not geocode country: {e}"); return
-            is_domestic = (cc_o == "nl" and cc_d == "nl") if (cc_o and cc_d) else False
-
-            if is_domestic and use_origin and use_dest:
-                # One consolidated line: Domestic door-to-door services (ROAD)
-                try:
-                    p_origin = LineParams("Origin services", "Origin", origin_addr, "ROAD", volume_cbm, okm)
-                    row_o = match_service_rij(df, p_origin); amt_o = calc_service_prijs(row_o, volume_cbm)
-                    p_dest = LineParams("Destination services", "Destination", dest_addr, "ROAD", volume_cbm, dkm)
-                    row_d = match_service_rij(df, p_dest); amt_d = calc_service_prijs(row_d, volume_cbm)
-                    total_amt = round(amt_o + amt_d, 2)
-                except Exception as e:
-                    messagebox.showerror("Rates (ROAD)", f"Could not match ROAD origin/destination rows: {e}"); return
-
-                descr = f"Domestic door-to-door services (ROAD) {origin_addr} – {dest_addr}"
-                charges_rows.append({"descr": descr, "qty": "-", "rate": "-", "amount": total_amt})
-
-            else:
-                # International ROAD: individual origin/dest + a Road Freight line (if ticked)
-                if use_origin:
-                    try:
-                        p_origin = LineParams("Origin services", "Origin", origin_addr, "ROAD", volume_cbm, okm)
-                        row_o = match_service_rij_strict_op(df, p_origin) if cc_o != "nl" else match_service_rij(df, p_origin)
-                        amt_o = calc_service_prijs(row_o, volume_cbm)
-                        descr_o = f"Origin services (ROAD) {origin_addr}"
-                        if str(row_o[COLS["rate_type"]]).strip().upper() == "FLAT":
-                            charges_rows.append({"descr": descr_o, "qty": "1 flat", "rate": eur(float(row_o[COLS['flat']])), "amount": amt_o})
-                        else:
-                            charges_rows.append({"descr": descr_o, "qty": f"{volume_cbm:g} m³", "rate": f"{eur(float(row_o[COLS['rate_per_cbm']]))} / m³", "amount": amt_o})
-                    except Exception as e:
-                        messagebox.showerror("Rates (ROAD origin)", f"{e}"); return
-
-                if use_freight:
-                    try:
-                        km_between, note = road_distance_between_addrs(origin_addr, dest_addr)
-                        try:
-                            per_km = float(self.ent_road_rate.get().replace(",", ".").strip())
-                        except Exception:
-                            per_km = DEFAULT_ROAD_RATE_COMBINED if self.cmb_road_type.get() == "Combined" else DEFAULT_ROAD_RATE_DIRECT
-                        amt_f = round(km_between * per_km, 2)
-                        descr_f = f"Road freight ({self.cmb_road_type.get()}) {origin_addr} – {dest_addr}"
-                        charges_rows.append({"descr": descr_f, "qty": f"{km_between:.0f} km", "rate": f"{eur(per_km)} / km", "amount": amt_f})
-                    except Exception as e:
-                        messagebox.showerror("Road freight", f"Could not compute road distance:\n{e}"); return
-
-                if use_dest:
-                    try:
-                        p_dest = LineParams("Destination services", "Destination", dest_addr, "ROAD", volume_cbm, dkm)
-                        row_d = match_service_rij_strict_op(df, p_dest) if cc_d != "nl" else match_service_rij(df, p_dest)
-                        amt_d = calc_service_prijs(row_d, volume_cbm)
-                        descr_d = f"Destination services (ROAD) {dest_addr}"
-                        if str(row_d[COLS["rate_type"]]).strip().upper() == "FLAT":
-                            charges_rows.append({"descr": descr_d, "qty": "1 flat", "rate": eur(float(row_d[COLS['flat']])), "amount": amt_d})
-                        else:
-                            charges_rows.append({"descr": descr_d, "qty": f"{volume_cbm:g} m³", "rate": f"{eur(float(row_d[COLS['rate_per_cbm']]))} / m³", "amount": amt_d})
-                    except Exception as e:
-                        messagebox.showerror("Rates (ROAD destination)", f"{e}"); return
-
-        # ========== Non-ROAD logic ==========
-        else:
-            if use_origin:
-                try:
-                    p_origin = LineParams("Origin services", "Origin", origin_addr, mode, volume_cbm, okm)
-                    row_o = match_service_rij_strict_op(df, p_origin) if cc_o != "nl" else match_service_rij(df, p_origin)
-                    amt_o = calc_service_prijs(row_o, volume_cbm)
-                    descr_o = f"Origin services ({row_o[COLS['mode']]}) {origin_addr}"
-                    if str(row_o[COLS["rate_type"]]).strip().upper() == "FLAT":
-                        charges_rows.append({"descr": descr_o, "qty": "1 flat", "rate": eur(float(row_o[COLS['flat']])), "amount": amt_o})
-                    else:
-                        charges_rows.append({"descr": descr_o, "qty": f"{volume_cbm:g} m³", "rate": f"{eur(float(row_o[COLS['rate_per_cbm']]))} / m³", "amount": amt_o})
-                except Exception as e:
-                    messagebox.showerror("Rates (Origin)", f"{e}"); return
-
-            if use_freight:
-                if mode == "LCL":
-                    pol_in = self.ent_pol.get().strip(); pod_in = self.ent_pod.get().strip()
-                    if not pol_in or not pod_in:
-                        messagebox.showwarning("Input", "Enter both POL and POD (code or name) or untick Freight."); return
-                    try:
-                        if not fcl_sheet_name:
-                            auto_name = auto_find_fcl_lanes_sheet(excel)
-                            df_lanes = lees_fcl_lanes(excel, auto_name)
-                        else:
-                            df_lanes = lees_fcl_lanes(excel, fcl_sheet_name)
-                    except Exception as e:
-                        messagebox.showerror("Excel (lanes)", f"{e}"); return
-                    try:
-                        pol = resolve_port_input(pol_in, df_lanes)
-                        pod = resolve_port_input(pod_in, df_lanes)
-                    except Exception as e:
-                        messagebox.showerror("POL/POD", str(e)); return
-                    code2name = build_code_to_name(df_lanes); pol_name = code2name.get(pol, pol); pod_name = code2name.get(pod, pod)
-                    try:
-                        # try to get from lanes sheet first
-                        rate_per_cbm = None
-                        if "RATE_LCL_CBM" in df_lanes.columns:
-                            pair = df_lanes[((df_lanes["OPORT_CODE"]==pol) & (df_lanes["DPORT_CODE"]==pod)) | ((df_lanes["OPORT_CODE"]==pod) & (df_lanes["DPORT_CODE"]==pol))]
-                            if not pair.empty:
-                                import pandas as _pd
-                                val = _pd.to_numeric(pair.iloc[0].get("RATE_LCL_CBM"), errors="coerce")
-                                if not _pd.isna(val):
-                                    rate_per_cbm = float(val)
-                        if rate_per_cbm is None:
-                            rate_per_cbm = find_lcl_rate_per_cbm(df, pol, pod)
-                    except Exception as e:
-                        messagebox.showerror("Rates (LCL)", str(e)); return
-                    gross_cbm = round(volume_cbm * 1.2, 4)
-                    amount = round(gross_cbm * rate_per_cbm, 2)
-                    descr = f"Freight (LCL) {pol_name} - {pod_name}"
-                    charges_rows.append({
-                        "descr": descr,
-                        "qty": f"{gross_cbm:.2f} cbm gross",
-                        "rate": f"{eur(rate_per_cbm)} / cbm gross",
-                        "amount": amount
-                    })
-                elif mode == "AIR":
-                    pol_in = self.ent_pol.get().strip(); pod_in = self.ent_pod.get().strip()
-                    if not pol_in or not pod_in:
-                        messagebox.showwarning("Input", "Enter both Origin and Destination airport (IATA code or name) or untick Freight."); return
-                    # Read AIR sheet (auto if empty)
-                    try:
-                        air_sheet = AIR_SHEET.strip() if "AIR_SHEET" in globals() else ""
-                        if not air_sheet:
-                            auto_name = air_auto_sheet(excel)
-                            df_air, air_cols = lees_air_lanes(excel, auto_name)
-                            messagebox.showinfo("AIR lanes", f"Auto-selected sheet: ‘{auto_name}’.")
-                        else:
-                            try:
-                                df_air, air_cols = lees_air_lanes(excel, air_sheet)
-                            except Exception as e:
-                                if "Worksheet named" in str(e) or "not found" in str(e).lower():
-                                    auto_name = air_auto_sheet(excel)
-                                    df_air, air_cols = lees_air_lanes(excel, auto_name)
-                                    messagebox.showinfo("AIR lanes", f"Sheet ‘{air_sheet}’ not found. Automatically used ‘{auto_name}’.")
-                                else:
-                                    raise
-                    except Exception as e:
-                        messagebox.showerror("Excel (AIR lanes)", f"{e}"); return
-                    # Resolve IATA
-                    try:
-                        pol = resolve_air_input(pol_in, df_air, air_cols)
-                        pod = resolve_air_input(pod_in, df_air, air_cols)
-                    except Exception as e:
-                        messagebox.showerror("AIR IATA", str(e)); return
-                    if (pol != pol_in) or (pod != pod_in):
-                        messagebox.showinfo("AIR lanes", f"Input converted to codes: ORG={pol_in}→{pol}, DST={pod_in}→{pod}")
-                    # ACW calc
-                    try:
-                        vol = float(self.ent_volume.get().replace(",", "."))
-                    except Exception:
-                        vol = 0.0
-                    acw = max(100.0, math.ceil(max(0.0, vol) * 1.2 * 167.0))
-                    try:
-                        rates = air_rates_for_lane(df_air, air_cols, pol, pod)
-                    except Exception as e:
-                        messagebox.showerror("AIR lane not found", str(e)); return
-                    brk_key, rate_per_kg = pick_air_rate(rates, acw)
-                    amount = round(acw * rate_per_kg, 2)
-                    descr = f"Freight (AIR) {pol} - {pod}"
-                    charges_rows.append({
-                        "descr": descr,
-                        "qty": f"{acw:.0f} kg (charg.)",
-                        "rate": f"{eur(rate_per_kg)} / kg",
-                        "amount": amount
-                    })
-
-                elif mode == "FCL":
-                    pol_in = self.ent_pol.get().strip(); pod_in = self.ent_pod.get().strip()
-                    if not pol_in or not pod_in:
-                        messagebox.showwarning("Input", "Enter both POL and POD (code or name) or untick Freight."); return
-                    try:
-                        if not fcl_sheet_name:
-                            auto_name = auto_find_fcl_lanes_sheet(excel)
-                            df_lanes = lees_fcl_lanes(excel, auto_name)
-                            messagebox.showinfo("FCL lanes", f"Auto-selected sheet: ‘{auto_name}’.")
-                        else:
-                            try:
-                                df_lanes = lees_fcl_lanes(excel, fcl_sheet_name)
-                            except Exception as e:
-                                if "Worksheet named" in str(e) or "not found" in str(e).lower():
-                                    auto_name = auto_find_fcl_lanes_sheet(excel)
-                                    df_lanes = lees_fcl_lanes(excel, auto_name)
-                                    messagebox.showinfo("FCL lanes", f"Sheet ‘{fcl_sheet_name}’ not found. Automatically used ‘{auto_name}’.")
-                                else: raise
-                    except Exception as e:
-                        messagebox.showerror("Excel read error (FCL lanes)", f"{e}"); return
-
-                    try:
-                        pol = resolve_port_input(pol_in, df_lanes)
-                        pod = resolve_port_input(pod_in, df_lanes)
-                    except Exception as e:
-                        messagebox.showerror("POL/POD not recognised", str(e)); return
-                    if (pol != pol_in) or (pod != pod_in):
-                        messagebox.showinfo("FCL lanes", f"Input converted to codes: POL={pol_in}→{pol}, POD={pod_in}→{pod}")
-
-                    try: rates = fcl_rates_for_lane(df_lanes, pol, pod)
-                    except Exception as e:
-                        messagebox.showerror("Lane not found", str(e)); return
-
-                    code2name = build_code_to_name(df_lanes); pol_name = code2name.get(pol, pol); pod_name = code2name.get(pod, pod)
-                    choice = fcl_choice.upper()
-                    if choice.startswith("AUTO"):
-                        combo = choose_fcl_combo(volume_cbm, rates)
-                        for ctype in ["40HQ","40FT","20FT"]:
-                            n = combo.get(ctype, 0)
-                            if n > 0:
-                                r = rates[ctype]; descr = f"Freight (FCL) {pol_name} - {pod_name}"
-                                qty_text = f"{n} × {PRETTY_TYPE.get(ctype, ctype)}"
-                                charges_rows.append({"descr": descr, "qty": qty_text, "rate": f"{eur(r)} / container", "amount": n*r})
-                    else:
-                        if choice not in rates:
-                            messagebox.showerror("Container not available", f"{choice} has no rate for this lane."); return
-                        cap = FCL_CAPACITY.get(choice, 9999)
-                        n = math.ceil(volume_cbm / cap) if volume_cbm > 0 else 1
-                        r = rates[choice]; descr = f"Freight (FCL) {pol_name} - {pod_name}"
-                        qty_text = f"{n} × {PRETTY_TYPE.get(choice, choice)}"
-                        charges_rows.append({"descr": descr, "qty": qty_text, "rate": f"{eur(r)} / container", "amount": n*r})
-
-            if use_dest:
-                try:
-                    p_dest = LineParams("Destination services", "Destination", dest_addr, mode, volume_cbm, dkm)
-                    row_d = match_service_rij_strict_op(df, p_dest) if cc_d != "nl" else match_service_rij(df, p_dest)
-                    amt_d = calc_service_prijs(row_d, volume_cbm)
-                    descr_d = f"Destination services ({row_d[COLS['mode']]}) {dest_addr}"
-                    if str(row_d[COLS["rate_type"]]).strip().upper() == "FLAT":
-                        charges_rows.append({"descr": descr_d, "qty": "1 flat", "rate": eur(float(row_d[COLS['flat']])), "amount": amt_d})
-                    else:
-                        charges_rows.append({"descr": descr_d, "qty": f"{volume_cbm:g} m³", "rate": f"{eur(float(row_d[COLS['rate_per_cbm']]))} / m³", "amount": amt_d})
-                except Exception as e:
-                    messagebox.showerror("Rates (Destination)", f"{e}"); return
-
-        if not charges_rows:
-            messagebox.showwarning("Input", "Nothing to show. Tick at least one service."); return
+        try:
+            result = price_quote(inp, geo)
+        except PricingError as e:
+            for title, text in e.notices: messagebox.showinfo(title, text)
+            (messagebox.showwarning if e.kind == "warning" else messagebox.showerror)(e.title, e.message); return
+        for title, text in result.notices: messagebox.showinfo(title, text)
+        charges_rows = result.charges_rows; dest_only_rows = result.dest_only_rows
+        okm, onote, dkm, dnote = result.origin_km, result.origin_km_note, result.dest_km, result.dest_km_note
 
         
         
@@ -3517,8 +3501,23 @@ class App(tk.Tk):
 _GEOCACHE = {}
 _GEOCACHE_FILE = os.path.join(os.path.abspath(os.path.dirname(sys.argv[0] or __file__)), "geocache.json")
 
+# Voorkeur: geocode_cache (SQLite + LRU, gedeeld met de API); geocache.json alleen als dat niet laadt
+try:
+    import geocode_cache as _GEOSTORE
+except Exception:
+    _GEOSTORE = None
+
 def _cache_load():
     global _GEOCACHE
+    if _GEOSTORE is not None:
+        # eenmalig het oude geocache.json overnemen, daarna hernoemen
+        try:
+            if os.path.isfile(_GEOCACHE_FILE):
+                _GEOSTORE.import_json(_GEOCACHE_FILE)
+                os.replace(_GEOCACHE_FILE, _GEOCACHE_FILE + ".migrated")
+        except Exception:
+            pass
+        return
     try:
         if os.path.isfile(_GEOCACHE_FILE):
             with open(_GEOCACHE_FILE, "r", encoding="utf-8") as f:
@@ -3533,6 +3532,23 @@ def _cache_save():
     except Exception:
         pass
 
+def _cache_get(key):
+    if _GEOSTORE is not None:
+        try:
+            return _GEOSTORE.get(key)
+        except Exception:
+            pass
+    return _GEOCACHE.get(key)
+
+def _cache_put(key, lat, lon, raw, address):
+    if _GEOSTORE is not None:
+        try:
+            _GEOSTORE.put(key, lat, lon, raw=raw, address=address); return
+        except Exception:
+            pass
+    _GEOCACHE[key] = {"lat": float(lat), "lon": float(lon), "raw": raw, "address": address}
+    _cache_save()
+
 _cache_load()
 
 class _LocObj:
@@ -3542,25 +3558,33 @@ class _LocObj:
         self.raw = raw or {}
         self.address = address or ""
 
-def geocode_raw(addr: str):
+_GEOLOCATORS = {}
+
+def _geolocator(ua, timeout):
+    # één Nominatim-instantie per (user agent, timeout) i.p.v. per aanroep
     from geopy.geocoders import Nominatim
+    g = _GEOLOCATORS.get((ua, timeout))
+    if g is None:
+        g = _GEOLOCATORS[(ua, timeout)] = Nominatim(user_agent=ua, timeout=timeout)
+    return g
+
+def geocode_raw(addr: str):
     key = (addr or "").strip()
     if not key:
         return None
-    hit = _GEOCACHE.get(key)
+    hit = _cache_get(key)
     if hit and isinstance(hit, dict) and "lat" in hit and "lon" in hit:
         return _LocObj(hit["lat"], hit["lon"], raw=hit.get("raw", {}), address=hit.get("address", key))
     timeout = float(os.getenv("GEOCODE_TIMEOUT", "12"))
     ua = os.getenv("GEOCODE_UA", "voerman_quote_app/4.4 (contact: info@voerman.com)")
-    geolocator = Nominatim(user_agent=ua, timeout=timeout)
+    geolocator = _geolocator(ua, timeout)
     last_err = None
     for attempt in range(3):
         try:
             loc = geolocator.geocode(key, addressdetails=True, timeout=timeout)
             if loc:
                 raw = getattr(loc, "raw", {})
-                _GEOCACHE[key] = {"lat": float(loc.latitude), "lon": float(loc.longitude), "raw": raw, "address": getattr(loc, "address", key)}
-                _cache_save()
+                _cache_put(key, loc.latitude, loc.longitude, raw, getattr(loc, "address", key))
                 return loc
             last_err = RuntimeError("No result")
         except Exception as e:
@@ -3569,8 +3593,7 @@ def geocode_raw(addr: str):
     if "nootdorp" in key.lower():
         lat, lon = 52.051, 4.396
         raw = {"address": {"country_code": "nl", "country": "Netherlands"}}
-        _GEOCACHE[key] = {"lat": lat, "lon": lon, "raw": raw, "address": "Nootdorp, Netherlands"}
-        _cache_save()
+        _cache_put(key, lat, lon, raw, "Nootdorp, Netherlands")
         return _LocObj(lat, lon, raw=raw, address="Nootdorp, Netherlands")
     return None
 
@@ -3846,6 +3869,134 @@ def geocode_country(addr: str):
 def main():app = App(); app.mainloop()
 
 
+# --- PDF render-template per merk (stijlen, kopblok, logo, kolombreedtes) ---
+# Eén keer per proces opgebouwd; per PDF worden alleen de variabele regels opgemaakt.
+# Stijlen/TableStyles worden alleen gelezen tijdens het renderen en zijn dus deelbaar.
+PDF_TEMPLATE_CACHE = True
+_PDF_TEMPLATES: Dict[tuple, "_PdfTemplate"] = {}
+_PDF_TEMPLATES_LOCK = threading.Lock()
+
+class _LogoFlowable(Flowable if REPORTLAB_OK else object):
+    """Logo via een per merk gedeelde ImageReader: het bestand wordt één keer gelezen en
+    gedecodeerd, tekenen gaat via de publieke canvas.drawImage."""
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.drawWidth, self.drawHeight = width, height
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask="auto")
+
+class _PdfTemplate:
+    LEFT_M = 18*mm if REPORTLAB_OK else 0.0
+    RIGHT_M = 18*mm if REPORTLAB_OK else 0.0
+
+    def __init__(self, name: str, addr: str, email: str, tel: str, logo_path: str | None, cache_logo: bool = True):
+        styles = getSampleStyleSheet()
+        self.style_title = styles["Title"]
+        self.style_small = styles["Normal"]; self.style_small.fontSize = 9; self.style_small.wordWrap = "CJK"
+        self.style_norm = styles["Normal"]; self.style_norm.wordWrap = "CJK"
+        self.content_w = cw = A4[0] - self.LEFT_M - self.RIGHT_M
+        # logo één keer inlezen, schalen en decoderen
+        self.logo_path = logo_path; self.logo_size = None; self.logo_reader = None
+        if logo_path and os.path.exists(logo_path):
+            img = _logo_flowable(logo_path, max_w_mm=60, max_h_mm=24)
+            if img is not None:
+                self.logo_size = (img.drawWidth, img.drawHeight)
+                if cache_logo:
+                    try:
+                        self.logo_reader = ImageReader(logo_path); self.logo_reader.getRGBData()
+                    except Exception:
+                        self.logo_reader = None
+        self.company_html = f"<b>{escape(name)}</b><br/>{escape(addr)}<br/>{escape(email)} · {escape(tel)}"
+        self.ts_top = TableStyle([("VALIGN",(0,0),(-1,-1),"TOP")])
+        self.ts_title = TableStyle([("ALIGN",(0,0),(-1,-1),"RIGHT")])
+        self.ts_details = TableStyle([
+            ("GRID",(0,0),(-1,-1),0.25,colors.lightgrey),
+            ("BACKGROUND",(0,0),(-1,0),colors.whitesmoke),
+            ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
+            ("FONTSIZE",(0,0),(-1,-1),9),
+            ("VALIGN",(0,0),(-1,-1),"TOP"),
+            ("ALIGN",(0,0),(-1,-1),"LEFT"),
+        ])
+        self.ts_job = TableStyle([
+            ("GRID",(0,0),(-1,-1),0.25,colors.lightgrey),
+            ("BACKGROUND",(0,0),(-1,0),colors.whitesmoke),
+            ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
+            ("FONTSIZE",(0,0),(-1,-1),9),
+            ("VALIGN",(0,0),(-1,-1),"TOP"),
+            ("LEFTPADDING",(0,0),(-1,-1),6),
+            ("RIGHTPADDING",(0,0),(-1,-1),6),
+        ])
+        ts = [
+            ("BACKGROUND",(0,0),(-1,0),colors.lightgrey),
+            ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
+            ("GRID",(0,0),(-1,-2),0.25,colors.lightgrey),
+            ("BOX",(0,0),(-1,-2),0.25,colors.grey),
+        ]
+        pad = [("LEFTPADDING",(0,0),(-1,-1),6), ("RIGHTPADDING",(0,0),(-1,-1),6)]
+        self.ts_charges = {
+            True: TableStyle(ts + [("ALIGN",(1,1),(1,-2),"RIGHT"), ("ALIGN",(2,1),(2,-2),"RIGHT"), ("ALIGN",(3,1),(3,-1),"RIGHT"), ("RIGHTPADDING",(3,1),(3,-1),6)] + pad),
+            False: TableStyle(ts + [("ALIGN",(1,1),(1,-2),"RIGHT"), ("ALIGN",(2,1),(2,-1),"RIGHT"), ("RIGHTPADDING",(2,1),(2,-1),6)] + pad),
+        }
+        self.ts_dest = TableStyle([
+            ("BACKGROUND",(0,0),(-1,0),colors.lightgrey),
+            ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
+            ("GRID",(0,0),(-1,-1),0.25,colors.lightgrey),
+            ("BOX",(0,0),(-1,-1),0.25,colors.grey),
+            ("LEFTPADDING",(0,0),(-1,-1),6), ("RIGHTPADDING",(0,0),(-1,-1),6),
+            ("ALIGN",(2,1),(2,-1),"RIGHT"), ("RIGHTPADDING",(2,1),(2,-1),6),
+        ])
+        self.ts_vat = TableStyle([
+            ("ALIGN",        (1, 0), (1, -1), "RIGHT"),
+            ("LEFTPADDING",  (0, 0), (-1, -1), 6),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+            ("LINEABOVE",    (0, 0), (-1, 0), 0.25, colors.HexColor("#BFBFBF")),
+            ("LINEABOVE",    (0, 2), (-1, 2), 0.75, colors.black),
+            ("BACKGROUND",   (0, 2), (-1, 2), colors.HexColor("#F2F2F2")),
+            ("FONTNAME",     (0, 2), (-1, 2), "Helvetica-Bold"),
+        ])
+        self.col_widths = {True: [0.55*cw, 0.15*cw, 0.15*cw, 0.15*cw], False: [0.62*cw, 0.15*cw, 0.23*cw]}
+        self.col_widths_dest = {True: [cw*0.56, cw*0.18, cw*0.26], False: [cw*0.62, cw*0.18, cw*0.20]}
+
+    def header(self):
+        """Kop (logo + bedrijfsblok + titel) als nieuwe flowables; platypus-objecten
+        houden layout-state bij en worden daarom niet tussen PDF's gedeeld."""
+        cw = self.content_w
+        left_stack = []
+        if self.logo_reader is not None:
+            left_stack.append([_LogoFlowable(self.logo_reader, *self.logo_size)])
+        elif self.logo_size is not None:
+            left_stack.append([Image(self.logo_path, width=self.logo_size[0], height=self.logo_size[1])])
+        left_stack.append([Paragraph(self.company_html, self.style_small)])
+        left_tbl = Table(left_stack, colWidths=[70*mm]); left_tbl.setStyle(self.ts_top)
+        title_tbl = Table([[Paragraph("<b>Cost Estimate</b>", self.style_title)]], colWidths=[cw - 70*mm - 10*mm])
+        title_tbl.setStyle(self.ts_title)
+        header = Table([[left_tbl, title_tbl]], colWidths=[70*mm, cw - 70*mm])
+        header.setStyle(self.ts_top)
+        return header
+
+def _pdf_template(name: str, addr: str, email: str, tel: str, logo_path: str | None) -> _PdfTemplate:
+    """Template voor dit merk; een gewijzigd logo-bestand (mtime) geeft een nieuwe."""
+    try:
+        logo_sig = os.stat(logo_path).st_mtime_ns if logo_path else None
+    except OSError:
+        logo_sig = None
+    key = (name, addr, email, tel, logo_path or "", logo_sig)
+    if not PDF_TEMPLATE_CACHE:   # zoals vroeger: alles per PDF opnieuw
+        return _PdfTemplate(name, addr, email, tel, logo_path, cache_logo=False)
+    t = _PDF_TEMPLATES.get(key)
+    if t is None:
+        with _PDF_TEMPLATES_LOCK:
+            t = _PDF_TEMPLATES.get(key)
+            if t is None:
+                t = _PDF_TEMPLATES[key] = _PdfTemplate(name, addr, email, tel, logo_path)
+    return t
+
+
 def maak_pdf_voerman_style(
     save_path, charges_rows: List[dict], client_name=None, so_number=None,
     debtor_number=None, debtor_vat=None, payment_term="14 days", vat_memo="Prices excl. VAT",
@@ -3863,11 +4014,9 @@ def maak_pdf_voerman_style(
     if not REPORTLAB_OK:
         raise RuntimeError("ReportLab is niet geïnstalleerd. Installeer met: pip install reportlab")
 
-    styles = getSampleStyleSheet()
-    style_title = styles["Title"]
-    style_small = styles["Normal"]; style_small.fontSize = 9; style_small.wordWrap = "CJK"
-    style_norm  = styles["Normal"]; style_norm.wordWrap  = "CJK"
-    style_small2 = style_small
+    tpl = _pdf_template(company_name or BEDRIJFSNAAM, company_addr or BEDRIJF_ADRES,
+                        company_email or BEDRIJF_EMAIL, company_tel or BEDRIJF_TEL, logo_path)
+    style_small = tpl.style_small; style_norm = tpl.style_norm; style_small2 = style_small
 
     def _val(v):
         try:
@@ -3907,28 +4056,13 @@ def maak_pdf_voerman_style(
     vat_rate_val = _num(vat_rate, 21.0)
     vat_gate = _bool(vat_applies) and _bool(show_vat)
 
-    LEFT_M = 18*mm; RIGHT_M = 18*mm
-    PAGE_W = A4[0]; content_w = PAGE_W - LEFT_M - RIGHT_M
+    content_w = tpl.content_w
 
-    doc = SimpleDocTemplate(save_path, pagesize=A4, leftMargin=LEFT_M, rightMargin=RIGHT_M, topMargin=16*mm, bottomMargin=16*mm)
+    doc = SimpleDocTemplate(save_path, pagesize=A4, leftMargin=tpl.LEFT_M, rightMargin=tpl.RIGHT_M, topMargin=16*mm, bottomMargin=16*mm)
     story = []
 
     # Header
-    img = _logo_flowable(logo_path, max_w_mm=60, max_h_mm=24) if (logo_path and os.path.exists(logo_path)) else None
-    company_block = Paragraph(f"<b>{escape(_name)}</b><br/>{escape(_addr)}<br/>{escape(_email)} · {escape(_tel)}", style_small)
-
-    left_stack = []
-    if img is not None: left_stack.append([img])
-    left_stack.append([company_block])
-    left_tbl = Table(left_stack, colWidths=[70*mm])
-    left_tbl.setStyle(TableStyle([("VALIGN",(0,0),(-1,-1),"TOP")]))
-
-    title_tbl = Table([[Paragraph("<b>Cost Estimate</b>", style_title)]], colWidths=[content_w - 70*mm - 10*mm])
-    title_tbl.setStyle(TableStyle([("ALIGN",(0,0),(-1,-1),"RIGHT")]))
-
-    header = Table([[left_tbl, title_tbl]], colWidths=[70*mm, content_w - 70*mm])
-    header.setStyle(TableStyle([("VALIGN",(0,0),(-1,-1),"TOP")]))
-    story.append(header); story.append(Spacer(1,6))
+    story.append(tpl.header()); story.append(Spacer(1,6))
 
     # Right detail box
     details_right = Table([
@@ -3939,18 +4073,11 @@ def maak_pdf_voerman_style(
         ["Payment term", _val(payment_term)],
         ["VAT memo", "Prices incl. VAT" if vat_gate else _val(vat_memo)],
     ], colWidths=[40*mm, 45*mm])
-    details_right.setStyle(TableStyle([
-        ("GRID",(0,0),(-1,-1),0.25,colors.lightgrey),
-        ("BACKGROUND",(0,0),(-1,0),colors.whitesmoke),
-        ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
-        ("FONTSIZE",(0,0),(-1,-1),9),
-        ("VALIGN",(0,0),(-1,-1),"TOP"),
-        ("ALIGN",(0,0),(-1,-1),"LEFT"),
-    ]))
+    details_right.setStyle(tpl.ts_details)
 
     left_par = Paragraph("<b>Account / Partner</b><br/>" + escape(_val(client_name)).replace("\\n", "<br/>"), style_norm)
     top_tbl = Table([[left_par, details_right]], colWidths=[content_w - 90*mm, 85*mm])
-    top_tbl.setStyle(TableStyle([("VALIGN",(0,0),(-1,-1),"TOP")]))
+    top_tbl.setStyle(tpl.ts_top)
     story.append(top_tbl); story.append(Spacer(1,10))
 
     # Job summary
@@ -3958,24 +4085,15 @@ def maak_pdf_voerman_style(
         ["Job mode", _val(job_mode), "Volume", f"{float(volume_cbm):.2f} m³"],
         ["Origin", _val(origin_addr) if origin_addr else "-", "Destination", _val(dest_addr) if dest_addr else "-"],
     ], colWidths=[80*mm, 30*mm, 34*mm, 30*mm])
-    job_tbl.setStyle(TableStyle([
-        ("GRID",(0,0),(-1,-1),0.25,colors.lightgrey),
-        ("BACKGROUND",(0,0),(-1,0),colors.whitesmoke),
-        ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
-        ("FONTSIZE",(0,0),(-1,-1),9),
-        ("VALIGN",(0,0),(-1,-1),"TOP"),
-        ("LEFTPADDING",(0,0),(-1,-1),6),
-        ("RIGHTPADDING",(0,0),(-1,-1),6),
-    ]))
+    job_tbl.setStyle(tpl.ts_job)
     job_tbl.hAlign = "LEFT"
     story.append(job_tbl); story.append(Spacer(1,8))
 
     # Charges
+    col_widths = tpl.col_widths[bool(show_rates)]
     if show_rates:
-        col_widths = [0.55*content_w, 0.15*content_w, 0.15*content_w, 0.15*content_w]
         table_data = [["Charge", "Quantity", "Estimate Rate", "Amount Total"]]
     else:
-        col_widths = [0.62*content_w, 0.15*content_w, 0.23*content_w]
         table_data = [["Charge", "Quantity", "Amount Total"]]
     total_sum = 0.0
     for r in charges_rows:
@@ -4003,18 +4121,7 @@ def maak_pdf_voerman_style(
 
     charges_tbl = Table(table_data, colWidths=col_widths, repeatRows=1)
     charges_tbl.hAlign = 'LEFT'
-    ts = [
-        ("BACKGROUND",(0,0),(-1,0),colors.lightgrey),
-        ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
-        ("GRID",(0,0),(-1,-2),0.25,colors.lightgrey),
-        ("BOX",(0,0),(-1,-2),0.25,colors.grey),
-    ]
-    if show_rates:
-        ts += [("ALIGN",(1,1),(1,-2),"RIGHT"), ("ALIGN",(2,1),(2,-2),"RIGHT"), ("ALIGN",(3,1),(3,-1),"RIGHT"), ("RIGHTPADDING",(3,1),(3,-1),6)]
-    else:
-        ts += [("ALIGN",(1,1),(1,-2),"RIGHT"), ("ALIGN",(2,1),(2,-1),"RIGHT"), ("RIGHTPADDING",(2,1),(2,-1),6)]
-    ts += [("LEFTPADDING",(0,0),(-1,-1),6), ("RIGHTPADDING",(0,0),(-1,-1),6)]
-    charges_tbl.setStyle(TableStyle(ts))
+    charges_tbl.setStyle(tpl.ts_charges[bool(show_rates)])
     story.append(charges_tbl); story.append(Spacer(1,10))
 
     # Destination-only charges
@@ -4033,18 +4140,9 @@ def maak_pdf_voerman_style(
                 total2 += float(amount or 0.0)
             except Exception:
                 pass
-        col_widths2 = [content_w*0.56, content_w*0.18, content_w*0.26] if show_rates else [content_w*0.62, content_w*0.18, content_w*0.20]
-        dest_tbl = Table(t2, colWidths=col_widths2, repeatRows=1)
+        dest_tbl = Table(t2, colWidths=tpl.col_widths_dest[bool(show_rates)], repeatRows=1)
         dest_tbl.hAlign = 'LEFT'
-        ts2 = [
-            ("BACKGROUND",(0,0),(-1,0),colors.lightgrey),
-            ("FONTNAME",(0,0),(-1,0),"Helvetica-Bold"),
-            ("GRID",(0,0),(-1,-1),0.25,colors.lightgrey),
-            ("BOX",(0,0),(-1,-1),0.25,colors.grey),
-            ("LEFTPADDING",(0,0),(-1,-1),6), ("RIGHTPADDING",(0,0),(-1,-1),6),
-        ]
-        ts2 += [("ALIGN",(2,1),(2,-1),"RIGHT"), ("RIGHTPADDING",(2,1),(2,-1),6)]
-        dest_tbl.setStyle(TableStyle(ts2))
+        dest_tbl.setStyle(tpl.ts_dest)
         story.append(dest_tbl); story.append(Spacer(1,10))
 
     # VAT section
@@ -4068,15 +4166,7 @@ def maak_pdf_voerman_style(
         ]
         amt_col_w = (0.15 if show_rates else 0.23) * content_w
         vat_tbl = Table(vat_data, colWidths=[content_w - amt_col_w, amt_col_w])
-        vat_tbl.setStyle(TableStyle([
-            ("ALIGN",        (1, 0), (1, -1), "RIGHT"),
-            ("LEFTPADDING",  (0, 0), (-1, -1), 6),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-            ("LINEABOVE",    (0, 0), (-1, 0), 0.25, colors.HexColor("#BFBFBF")),
-            ("LINEABOVE",    (0, 2), (-1, 2), 0.75, colors.black),
-            ("BACKGROUND",   (0, 2), (-1, 2), colors.HexColor("#F2F2F2")),
-            ("FONTNAME",     (0, 2), (-1, 2), "Helvetica-Bold"),
-        ]))
+        vat_tbl.setStyle(tpl.ts_vat)
         story.append(Spacer(1, 10))
         story.append(vat_tbl)
 
@@ -4094,6 +4184,36 @@ def maak_pdf_voerman_style(
     doc.build(story)
 
 
+# --- public API: GUI-vrije prijsberekening (engine/pricing_engine.py) ---
+class _StudioLib:
+    """Helpers van deze module voor de prijsengine; leest globals() bij gebruik,
+    zodat latere overrides (bv. robuuste geocoding) meetellen."""
+    def __getattr__(self, name):
+        try:
+            return globals()[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+_STUDIO_LIB = _StudioLib()
+
+def price_quote(inp, geo=None) -> "PriceResult":
+    """Kostenregels voor een QuoteInput, zonder Tk/messageboxen. Gooit PricingError.
+    geo: GeoContext van new_geo_context() om geocodes te delen tussen aanroepen."""
+    if _engine_price is None:
+        raise RuntimeError("engine/pricing_engine.py niet gevonden")
+    return _engine_price(inp, _STUDIO_LIB, geo)
+
+def check_quote_input(inp, geo=None) -> None:
+    """Alleen de invoercontrole van price_quote (zonder Excel). Gooit PricingError."""
+    if _engine_check is None:
+        raise RuntimeError("engine/pricing_engine.py niet gevonden")
+    _engine_check(inp, _STUDIO_LIB, geo)
+
+def new_geo_context():
+    """Eén geocode-/afstandscontext voor een run (meerdere offertes of modes)."""
+    return GeoContext(_STUDIO_LIB) if GeoContext is not None else None
+
+
 if __name__ == '__main__':
     main()
 # --- public API for headless integration ---
@@ -35,7 +35,7 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
 
 # Routers
 try:
-    from routers import ingest, extract, pricing, emailer, accept, messages, pipeline
+    from routers import ingest, extract, pricing, emailer, accept, messages, pipeline, ratebook, render, events, geo
 except Exception as _e:
     # Fallback: load routers individually by path
     ingest = _import_local("routers.ingest", os.path.join("routers","ingest.py"))
@@ -45,6 +45,10 @@ except Exception as _e:
     accept = _import_local("routers.accept", os.path.join("routers","accept.py"))
     messages = _import_local("routers.messages", os.path.join("routers","messages.py"))
     pipeline = _import_local("routers.pipeline", os.path.join("routers","pipeline.py"))
+    ratebook = _import_local("routers.ratebook", os.path.join("routers","ratebook.py"))
+    render = _import_local("routers.render", os.path.join("routers","render.py"))
+    events = _import_local("routers.events", os.path.join("routers","events.py"))
+    geo = _import_local("routers.geo", os.path.join("routers","geo.py"))
 
 app.include_router(ingest.router, prefix="/ingest", tags=["ingest"])  # /ingest/test
 app.include_router(extract.router, prefix="/extract", tags=["extract"]) # /extract
@@ -52,6 +56,10 @@ app.include_router(pricing.router, prefix="", tags=["pricing"])         # /quote
 app.include_router(emailer.router, prefix="/email", tags=["email"])     # /email/preview, /email/send
 app.include_router(messages.router, prefix="", tags=["messages"])       # /messages, /messages/{id}
 app.include_router(pipeline.router, prefix="", tags=["pipeline"])       # /pipeline/generate, /pipeline/send
+app.include_router(ratebook.router, prefix="", tags=["ratebook"])       # /ratebook, /ratebook/reload
+app.include_router(render.router, prefix="", tags=["render"])           # /render/metrics, /render/warmup
+app.include_router(events.router, prefix="", tags=["events"])           # /events/stream (SSE)
+app.include_router(geo.router, prefix="", tags=["geo"])                 # /geocode/*, /distances/*
 
 # Static: serve /out for previews
 OUT_DIR = os.environ.get("OUT_DIR","out")
@@ -67,3 +75,30 @@ def dashboard():
 
 @app.get("/health")
 def health(): return {"ok": True}
+
+# Studio-module en PDF-workers vooraf laden zodat de eerste /quote niet op de exec wacht
+@app.on_event("startup")
+def _warm_studio():
+    if os.environ.get("STUDIO_WARMUP", "1").strip().lower() in ("1", "true", "yes", "on"):
+        import threading
+        from studio_adapter import warm_up
+        import pdf_service
+        def _warm():
+            warm_up()
+            try: pdf_service.get_service().warm_up()
+            except Exception: pass
+        threading.Thread(target=_warm, name="studio-warmup", daemon=True).start()
+
+# Job-workers (POST /pipeline/jobs); PIPELINE_WORKERS=0 = alleen inplannen, een ander proces voert uit
+@app.on_event("startup")
+def _start_jobs():
+    import jobs
+    jobs.get_runner().start()
+
+@app.on_event("shutdown")
+def _stop_render_pool():
+    import jobs, pdf_service, email_service
+    jobs.get_runner().stop()
+    email_service.close_pools()
+    pdf_service.get_service().shutdown()
+    storage.close_all()
@@ -0,0 +1,145 @@
+# distance_cache.py
+"""
+Afstanden zonder routing-roundtrip.
+
+1) Routecache: SQLite-tabel `distances` (via storage) met een LRU ervoor.
+   Sleutel = coördinatenpaar afgerond op DISTANCE_ROUND_DECIMALS (standaard 3,
+   ±100 m), symmetrisch: A→B en B→A delen één regel. Alleen echte routes
+   (OpenRouteService) gaan erin; de geodesische schatting is goedkoper dan een
+   lookup. Regels ouder dan DISTANCE_TTL_DAYS (standaard 365; 0 = nooit) tellen
+   als miss.
+
+2) Warehouse-tabel: vooraf berekende afstanden van het warehouse naar elke
+   Operation-plaats uit de services-sheet plus de plaatsen uit de offline
+   plaatsentabel (engine/data/cities.csv) van het warehouse-land. Een offerte
+   voor een bekende plaats ("Den Haag", "Berlin") heeft dan geocode noch
+   route nodig voor de afstandsband in match_service_rij. Opbouwen met
+   build_warehouse_table() (of POST /distances/warehouse/rebuild).
+"""
+from __future__ import annotations
+import os, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import storage, geocode_cache
+
+def _env(k: str, d: str = "") -> str: return os.getenv(k, d)
+
+LatLon = Tuple[float, float]
+
+_LRU: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_WH: Dict[str, Dict[str, Tuple[float, str]]] = {}   # warehouse-sleutel → {plaats-sleutel: (km, note)}
+_LOCK = threading.Lock()
+_READY = False
+_STATS = {"hits_memory": 0, "hits_db": 0, "misses": 0, "writes": 0, "warehouse_hits": 0, "warehouse_misses": 0}
+
+def _ttl() -> float:
+    return float(_env("DISTANCE_TTL_DAYS", "365")) * 86400
+
+def _lru_max() -> int:
+    return int(_env("DISTANCE_LRU_SIZE", "8192"))
+
+def _ensure_db():
+    global _READY
+    if not _READY:
+        storage.init_db(); _READY = True
+
+def _pt(p: LatLon) -> str:
+    d = int(_env("DISTANCE_ROUND_DECIMALS", "3"))
+    return f"{float(p[0]):.{d}f},{float(p[1]):.{d}f}"
+
+def pair_key(a: LatLon, b: LatLon) -> str:
+    return "|".join(sorted((_pt(a), _pt(b))))
+
+def get(a: LatLon, b: LatLon) -> Optional[Tuple[float, str]]:
+    """(km, toelichting) of None (onbekend of verlopen)."""
+    key = pair_key(a, b)
+    with _LOCK:
+        hit = _LRU.get(key)
+        if hit is not None:
+            _LRU.move_to_end(key); _STATS["hits_memory"] += 1
+            return hit
+    _ensure_db()
+    ttl = _ttl()
+    hit = storage.distance_get(key, time.time() - ttl if ttl > 0 else None)
+    with _LOCK:
+        if hit is None:
+            _STATS["misses"] += 1; return None
+        _STATS["hits_db"] += 1
+    _remember(key, hit)
+    return hit
+
+def _remember(key: str, value: Tuple[float, str]):
+    with _LOCK:
+        _LRU[key] = value; _LRU.move_to_end(key)
+        while len(_LRU) > _lru_max(): _LRU.popitem(last=False)
+
+def put(a: LatLon, b: LatLon, km: float, note: str):
+    key = pair_key(a, b)
+    _ensure_db()
+    storage.distance_put_many([(key, km, note)])
+    _remember(key, (float(km), note))
+    with _LOCK: _STATS["writes"] += 1
+
+
+# ---- warehouse-tabel ----
+def warehouse_key(wh: LatLon) -> str:
+    return _pt(wh)
+
+def _wh_table(wh: LatLon) -> Dict[str, Tuple[float, str]]:
+    k = warehouse_key(wh)
+    with _LOCK:
+        t = _WH.get(k)
+    if t is None:
+        _ensure_db()
+        t = {r["place_key"]: (r["km"], r["note"]) for r in storage.warehouse_distances_list(k)}
+        with _LOCK: _WH[k] = t
+    return t
+
+def warehouse_km(place: str, wh: LatLon) -> Optional[Tuple[float, str]]:
+    """(km, toelichting) als `place` (genormaliseerd) in de warehouse-tabel staat, anders None."""
+    hit = _wh_table(wh).get(geocode_cache.normalize(place))
+    with _LOCK: _STATS["warehouse_hits" if hit else "warehouse_misses"] += 1
+    return hit
+
+def warehouse_rows(wh: LatLon) -> List[Dict[str, Any]]:
+    _ensure_db()
+    return storage.warehouse_distances_list(warehouse_key(wh))
+
+def operation_places(lib, excel_path: Optional[str] = None) -> List[str]:
+    df = lib.lees_services_sheet(excel_path or lib.EXCEL_PAD, lib.SERVICES_SHEET)
+    return sorted({str(x).strip() for x in df[lib.COLS["operation"]].dropna() if str(x).strip() and str(x).strip().lower() != "nan"})
+
+def build_warehouse_table(lib, excel_path: Optional[str] = None, areas: Optional[Iterable[str]] = None,
+                          provider=None, **batch_kw) -> Dict[str, Any]:
+    """Warehouse-tabel (opnieuw) opbouwen: geocoden via geocoder.geocode_batch, afstanden via
+    lib.distances_from_coords (ORS-matrix, anders geodesisch)."""
+    import geocoder
+    from engine import gazetteer
+    t0 = time.perf_counter()
+    wh = tuple(lib.WAREHOUSE_COORDS)
+    if areas is None:
+        areas = gazetteer.places_in(_env("WAREHOUSE_COUNTRY", "nl"))
+    places: Dict[str, Tuple[str, str]] = {}   # plaats-sleutel → (naam, soort); operation wint
+    for p in operation_places(lib, excel_path):
+        places.setdefault(geocode_cache.normalize(p), (p, "operation"))
+    for p in areas:
+        if geocode_cache.normalize(p): places.setdefault(geocode_cache.normalize(p), (p, "area"))
+    names = [n for n, _ in places.values()]
+    res = geocoder.geocode_batch(names, provider, **batch_kw)
+
+    found = [(key, name, kind, (e["lat"], e["lon"])) for key, (name, kind) in places.items() for e in [res.results.get(name)] if e]
+    if hasattr(lib, "distances_from_coords"):   # één ORS-matrix (in blokken) i.p.v. een route per plaats
+        kms = lib.distances_from_coords(wh, [ll for *_x, ll in found])
+    else:
+        kms = [lib.distance_between_coords(ll, wh) for *_x, ll in found]
+    rows: List[Dict[str, Any]] = [{"place_key": key, "place": name, "kind": kind, "lat": ll[0], "lon": ll[1], "km": round(float(km), 3), "note": note}
+                                  for (key, name, kind, ll), (km, note) in zip(found, kms)]
+    _ensure_db()
+    storage.warehouse_distances_replace(warehouse_key(wh), rows)
+    with _LOCK: _WH.pop(warehouse_key(wh), None)
+    return {"warehouse": warehouse_key(wh), "places": len(places), "rows": len(rows),
+            "not_found": len(places) - len(rows), "geocode": res.summary(), "seconds": round(time.perf_counter() - t0, 3)}
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        return dict(_STATS, memory=len(_LRU), lru_max=_lru_max(), warehouse_tables={k: len(v) for k, v in _WH.items()})
@@ -1,4 +1,4 @@
-import os, smtplib, mimetypes, hmac, hashlib, time
+import os, smtplib, ssl, mimetypes, hmac, hashlib, threading, time, uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
@@ -38,11 +38,23 @@ def render_preview(language: str, options, customer_name, questions, signoff, qu
     html = tpl.render(language=language, options=options, customer_name=customer_name, questions=questions, signoff=signoff, quote_id=quote_id)
     return html
 
-def send_via_smtp(to_addr: str, subject: str, html: str, attachments=None):
-    host = _env('SMTP_HOST'); port = int(_env('SMTP_PORT','587')); user = _env('SMTP_USER'); pwd = _env('SMTP_PASS')
-    from_addr = _env('FROM_EMAIL', user or 'no-reply@example.com')
-    if not host or not user or not pwd:
-        return {'ok': False, 'info': 'SMTP not configured in .env'}
+# --- SMTP: langlevende verbindingen + uitgaande wachtrij ---------------------
+# Eén verbinding = één keer connect + STARTTLS + login; daarna gaan de mails over
+# dezelfde verbinding. Wegvallen (timeout, 421, reset) = opnieuw verbinden en
+# het bericht één keer opnieuw proberen. queue_email() zet de mail in de
+# jobs-tabel (kind "email.send"): de HTTP-aanroep krijgt direct een send_id en
+# tijdelijke fouten (4xx, geen verbinding) worden later opnieuw geprobeerd.
+
+def _smtp_config():
+    user = _env('SMTP_USER')
+    return {'host': _env('SMTP_HOST'), 'port': int(_env('SMTP_PORT', '587')), 'user': user, 'pwd': _env('SMTP_PASS'),
+            'security': _env('SMTP_SECURITY', 'starttls').lower(), 'from_addr': _env('FROM_EMAIL', user or 'no-reply@example.com')}
+
+def _configured(cfg) -> bool:
+    # zonder login alleen als SMTP_SECURITY=none (lokale relay/test-server)
+    return bool(cfg['host'] and ((cfg['user'] and cfg['pwd']) or cfg['security'] == 'none'))
+
+def build_message(from_addr: str, to_addr: str, subject: str, html: str, attachments=None) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg['From'] = from_addr; msg['To'] = to_addr; msg['Subject'] = subject
     msg.attach(MIMEText(html, 'html', 'utf-8'))
@@ -56,15 +68,148 @@ def send_via_smtp(to_addr: str, subject: str, html: str, attachments=None):
             msg.attach(part)
         except Exception:
             pass
+    return msg
+
+def _connection_lost(e: Exception) -> bool:
+    if isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)): return True
+    if isinstance(e, smtplib.SMTPResponseException): return e.smtp_code == 421
+    return isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)
+
+def is_transient(e: Exception) -> bool:
+    """Later opnieuw proberen zinvol? Verbindingsfouten en 4xx-antwoorden wel, 5xx (adres, login) niet."""
+    if _connection_lost(e): return True
+    if isinstance(e, smtplib.SMTPResponseException): return 400 <= e.smtp_code < 500
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return bool(e.recipients) and all(400 <= code < 500 for code, _m in e.recipients.values())
+    return False
+
+
+class SmtpPool:
+    """Max `size` SMTP-verbindingen, hergebruikt tussen mails (ook tussen threads)."""
+
+    def __init__(self, host, port, user=None, pwd=None, security='starttls', size=None, timeout=None, max_per_conn=None, noop_after=None):
+        self.host, self.port, self.user, self.pwd, self.security = host, int(port), user, pwd, security
+        self.timeout = float(timeout if timeout is not None else _env('SMTP_TIMEOUT', '30'))
+        self.max_per_conn = int(max_per_conn if max_per_conn is not None else _env('SMTP_MAX_PER_CONNECTION', '100'))
+        self.noop_after = float(noop_after if noop_after is not None else _env('SMTP_NOOP_AFTER', '30'))
+        self._slots = threading.BoundedSemaphore(max(1, int(size if size is not None else _env('SMTP_POOL_SIZE', '2'))))
+        self._idle = []   # [smtp, laatst gebruikt (monotonic), aantal verzonden]
+        self._lock = threading.Lock()
+        self._stats = {'connects': 0, 'reconnects': 0, 'sent': 0, 'errors': 0}
+
+    def _count(self, k):
+        with self._lock: self._stats[k] += 1
+
+    def _connect(self):
+        ctx = ssl.create_default_context()
+        if self.security == 'ssl':
+            s = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ctx)
+        else:
+            s = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == 'starttls': s.starttls(context=ctx)
+        try:
+            if self.user: s.login(self.user, self.pwd)
+        except Exception:
+            self._quit(s); raise
+        self._count('connects')
+        return [s, time.monotonic(), 0]
+
+    @staticmethod
+    def _quit(s):
+        try: s.quit()
+        except Exception:
+            try: s.close()
+            except Exception: pass
+
+    def _checkout(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is not None and time.monotonic() - conn[1] > self.noop_after:
+            try: alive = conn[0].noop()[0] == 250   # server kan een stille verbinding hebben gesloten
+            except Exception: alive = False
+            if not alive:
+                self._quit(conn[0]); conn = None; self._count('reconnects')
+        return conn or self._connect()
+
+    def _checkin(self, conn):
+        conn[1] = time.monotonic(); conn[2] += 1
+        if conn[2] >= self.max_per_conn:
+            self._quit(conn[0]); return
+        with self._lock: self._idle.append(conn)
+
+    def send(self, from_addr: str, to_addrs, msg: str):
+        """Eén bericht; gooit de smtplib-fout als het (ook na opnieuw verbinden) niet lukt."""
+        with self._slots:
+            conn = self._checkout()
+            try:
+                conn[0].sendmail(from_addr, to_addrs, msg)
+            except Exception as e:
+                self._count('errors')
+                if not _connection_lost(e):
+                    try: conn[0].rset(); self._idle_back(conn)   # bericht-fout: verbinding blijft bruikbaar
+                    except Exception: self._quit(conn[0])
+                    raise
+                self._quit(conn[0]); self._count('reconnects')
+                conn = self._connect()
+                try: conn[0].sendmail(from_addr, to_addrs, msg)
+                except Exception:
+                    self._quit(conn[0]); raise
+            self._checkin(conn); self._count('sent')
+
+    def _idle_back(self, conn):
+        with self._lock: self._idle.append(conn)
+
+    def close(self):
+        with self._lock: idle, self._idle = self._idle, []
+        for conn in idle: self._quit(conn[0])
+
+    def stats(self):
+        with self._lock: return dict(self._stats, idle=len(self._idle))
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_pool(cfg=None) -> SmtpPool:
+    """Gedeelde pool per (host, port, user, security) uit .env."""
+    cfg = cfg or _smtp_config()
+    key = (cfg['host'], cfg['port'], cfg['user'], cfg['security'])
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = SmtpPool(cfg['host'], cfg['port'], cfg['user'], cfg['pwd'], cfg['security'])
+        return pool
+
+def close_pools():
+    with _POOLS_LOCK: pools = list(_POOLS.values())
+    for p in pools: p.close()
+
+def send_message(to_addr: str, subject: str, html: str, attachments=None):
+    """Direct versturen via de pool; gooit de smtplib-fout (zie is_transient)."""
+    cfg = _smtp_config()
+    if not _configured(cfg):
+        raise RuntimeError('SMTP not configured in .env')
+    msg = build_message(cfg['from_addr'], to_addr, subject, html, attachments)
+    get_pool(cfg).send(cfg['from_addr'], [to_addr], msg.as_string())
+
+def send_via_smtp(to_addr: str, subject: str, html: str, attachments=None):
+    if not _configured(_smtp_config()):
+        return {'ok': False, 'info': 'SMTP not configured in .env'}
     try:
-        with smtplib.SMTP(host, port) as s:
-            s.starttls()
-            s.login(user, pwd)
-            s.sendmail(from_addr, [to_addr], msg.as_string())
+        send_message(to_addr, subject, html, attachments)
         return {'ok': True, 'info': 'sent'}
     except Exception as e:
         return {'ok': False, 'info': str(e)}
 
+def queue_email(to_addr: str, subject: str, html: str, attachments=None, meta=None):
+    """Mail in de uitgaande wachtrij; {'ok', 'info', 'send_id'} (send_id = job-id, status via storage.get_job)."""
+    if not _configured(_smtp_config()):
+        return {'ok': False, 'info': 'SMTP not configured in .env', 'send_id': None}
+    import jobs
+    job, _created = jobs.enqueue('email.send', uuid.uuid4().hex, {'to': to_addr, 'subject': subject, 'html': html,
+                                                                  'attachments': list(attachments or []), 'meta': meta or {}})
+    return {'ok': True, 'info': 'queued', 'send_id': job['id']}
+
 # --- Token helpers used by routers/accept.py -------------------------------
 
 def _sign(data: str, ttl: int = 7*24*3600) -> str:
@@ -0,0 +1,222 @@
+# engine/gazetteer.py
+"""
+Offline land-bepaling uit adrestekst, zonder geocoder-roundtrip.
+
+Bronnen: landnamen en ISO-codes uit pycountry (als die er is), synoniemen en
+exoniemen (NL/DE/FR, plus de _COUNTRY_SYNONYMS van de Studio via
+`extra_synonyms`), een meegeleverde plaatsentabel (engine/data/cities.csv),
+deelstaten/provincies van US/CA/AU en herkenbare postcodes (NL, UK, CA, PL, ...).
+
+Elk gevonden spoor geeft een verzameling kandidaat-landen:
+- sterk: een komma-deel dat een landnaam/alpha-3 is, of waar het laatste deel op eindigt
+- 2-letter code (", DE", ", NL"): het land en/of een US-deelstaat (", NY", ", GA"; ook
+  "NY 12303"); moet kloppen met plaats/postcode, anders None
+- zwak: plaatsen, deelstaten, postcodes; een landnaam binnen een straat- of plaatsnaam telt niet
+Een landnaam wint, tenzij een deelstaat of code hem tegenspreekt ("Holland, Michigan").
+resolve_country() geeft alleen een antwoord als dat eenduidig is; anders None
+en beslist de geocoder.
+"""
+from __future__ import annotations
+import csv, os, re, threading, unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.csv")
+
+# landnamen die ook iets anders betekenen (US-staat, eiland, ...): alleen zwak bewijs
+_AMBIGUOUS_NAMES = {"georgia", "jersey", "guernsey", "man", "chad", "jordan", "niger", "wales"}
+
+# exoniemen/afkortingen → alpha-2 (gevouwen: geen accenten, kleine letters)
+_SYNONYMS = {
+    "nederland": "nl", "holland": "nl", "the netherlands": "nl", "netherlands": "nl", "niederlande": "nl", "pays bas": "nl",
+    "belgie": "be", "belgique": "be", "belgien": "be",
+    "duitsland": "de", "deutschland": "de", "allemagne": "de",
+    "frankrijk": "fr", "frankreich": "fr",
+    "engeland": "gb", "england": "gb", "scotland": "gb", "schotland": "gb", "wales": "gb", "northern ireland": "gb",
+    "great britain": "gb", "groot brittannie": "gb", "verenigd koninkrijk": "gb", "uk": "gb", "u k": "gb", "britain": "gb",
+    "spanje": "es", "espana": "es", "spanien": "es", "espagne": "es",
+    "italie": "it", "italia": "it", "italien": "it",
+    "oostenrijk": "at", "osterreich": "at", "autriche": "at",
+    "zwitserland": "ch", "schweiz": "ch", "suisse": "ch", "svizzera": "ch",
+    "zweden": "se", "sverige": "se", "schweden": "se", "noorwegen": "no", "norge": "no", "norwegen": "no",
+    "denemarken": "dk", "danmark": "dk", "danemark": "dk", "suomi": "fi", "finnland": "fi",
+    "polen": "pl", "polska": "pl", "tsjechie": "cz", "tschechien": "cz", "cesko": "cz", "czech republic": "cz",
+    "griekenland": "gr", "hellas": "gr", "griechenland": "gr", "ierland": "ie", "eire": "ie", "irland": "ie",
+    "luxemburg": "lu", "hongarije": "hu", "ungarn": "hu", "magyarorszag": "hu", "roemenie": "ro", "rumanien": "ro",
+    "bulgarije": "bg", "kroatie": "hr", "hrvatska": "hr", "kroatien": "hr", "slowakije": "sk", "slowakei": "sk",
+    "slovenie": "si", "slowenien": "si", "litouwen": "lt", "letland": "lv", "estland": "ee", "ijsland": "is",
+    "portugal": "pt", "cyprus": "cy", "malta": "mt",
+    "verenigde staten": "us", "usa": "us", "u s a": "us", "u s": "us", "united states of america": "us", "vereinigte staaten": "us", "etats unis": "us",
+    "canada": "ca", "kanada": "ca", "australie": "au", "australien": "au", "nieuw zeeland": "nz", "neuseeland": "nz",
+    "zuid afrika": "za", "sudafrika": "za", "verenigde arabische emiraten": "ae", "uae": "ae", "emirates": "ae",
+    "turkije": "tr", "turkei": "tr", "turkiye": "tr", "rusland": "ru", "russland": "ru", "russia": "ru",
+    "zuid korea": "kr", "south korea": "kr", "sudkorea": "kr", "brazilie": "br", "brasil": "br", "brasilien": "br",
+    "mexiko": "mx", "japon": "jp", "saudi arabie": "sa", "saudi arabia": "sa", "egypte": "eg", "agypten": "eg",
+    "marokko": "ma", "maroc": "ma", "singapur": "sg", "hongkong": "hk", "taiwan": "tw", "vietnam": "vn", "iran": "ir",
+}
+
+# herkenbare postcodes (op gevouwen tekst met leestekens)
+_POSTCODES: List[Tuple["re.Pattern[str]", str]] = [
+    (re.compile(r"\b[1-9]\d{3} ?(?!sa|sd|ss)[a-z]{2}\b"), "nl"),
+    (re.compile(r"\b(?:[a-z]{1,2}\d[a-z\d]?) ?\d[a-z]{2}\b"), "gb"),
+    (re.compile(r"\b[abceghj-nprstvxy]\d[a-z] ?\d[a-z]\d\b"), "ca"),
+    (re.compile(r"\b\d{2}-\d{3}\b"), "pl"),
+    (re.compile(r"\b\d{4}-\d{3}\b"), "pt"),
+    (re.compile(r"\b\d{3}-\d{4}\b"), "jp"),
+    (re.compile(r"\b\d{5}-\d{3}\b"), "br"),
+]
+
+
+def fold(s: str) -> str:
+    """Accenten weg, kleine letters (zoals _canon_country in de Studio)."""
+    s = unicodedata.normalize("NFD", str(s or ""))
+    return "".join(c for c in s if unicodedata.category(c) != "Mn").casefold()
+
+def _words(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", fold(s)).strip()
+
+
+class _Index:
+    def __init__(self, extra_synonyms: Optional[Dict[str, str]] = None):
+        self.names: Dict[str, str] = {}          # gevouwen naam → alpha-2 (lower)
+        self.alpha2: Set[str] = set(); self.alpha3: Dict[str, str] = {}
+        self.display: Dict[str, str] = {}        # alpha-2 → weergavenaam
+        self.places: Dict[str, Dict[str, bool]] = {}   # plaats/deelstaat → {cc: primair}
+        self.us_states: Set[str] = set()         # "ny", "ca", ...: ook zonder ISO-code US-bewijs
+        self.subdivisions: Set[str] = set()      # deelstaat/provincie-namen (US/CA/AU)
+        self.max_words = 1
+        try:
+            import pycountry
+            for c in pycountry.countries:
+                cc = c.alpha_2.lower(); self.alpha2.add(cc); self.alpha3[c.alpha_3.lower()] = cc
+                name = getattr(c, "common_name", None) or c.name
+                self.display[cc] = name
+                for n in (c.name, getattr(c, "common_name", None), getattr(c, "official_name", None)):
+                    if n: self.names.setdefault(_words(n), cc)
+            for sub in pycountry.subdivisions:
+                if sub.country_code in ("US", "CA", "AU") and sub.type in ("State", "Province", "Territory", "District"):
+                    self._place(sub.name, sub.country_code.lower(), True); self.subdivisions.add(_words(sub.name))
+                    if sub.country_code == "US": self.us_states.add(sub.code.split("-")[1].lower())
+        except Exception:
+            for cc, n in {"nl": "Netherlands", "be": "Belgium", "de": "Germany", "fr": "France", "gb": "United Kingdom",
+                          "us": "United States", "ca": "Canada", "es": "Spain", "it": "Italy", "ch": "Switzerland"}.items():
+                self.alpha2.add(cc); self.display[cc] = n; self.names[_words(n)] = cc
+        for k, cc in _SYNONYMS.items(): self.names[_words(k)] = cc
+        for k, canon in (extra_synonyms or {}).items():   # Studio: tekst → canonieke landnaam
+            cc = self.names.get(_words(canon))
+            if cc: self.names[_words(k)] = cc
+        self.display.update({"nl": "Netherlands", "us": "United States", "gb": "United Kingdom"})
+        try:
+            with open(_DATA, "r", encoding="utf-8", newline="") as f:
+                for r in csv.DictReader(f):
+                    self._place(r["city"], r["country_code"].strip().lower(), str(r.get("primary", "1")).strip() != "0")
+        except OSError:
+            pass
+        self.max_words = max([len(k.split()) for k in list(self.places) + list(self.names)] + [1])
+
+    def _place(self, name: str, cc: str, primary: bool):
+        k = _words(name)
+        if k: self.places.setdefault(k, {})[cc] = self.places.get(k, {}).get(cc, False) or primary
+
+    def _ngrams(self, words: List[str]) -> Iterable[str]:
+        for n in range(min(self.max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                yield " ".join(words[i:i + n])
+
+    def _code(self, c: str) -> Set[str]:
+        """Kandidaten voor een 2-letter code: land en/of US-deelstaat ("CA" = Canada of California)."""
+        return ({c} if c in self.alpha2 else set()) | ({"us"} if c in self.us_states else set())
+
+    def resolve(self, text: str) -> Optional[str]:
+        parts = [_words(p) for p in re.split(r"[,;\n/]+", str(text or ""))]
+        parts = [p for p in parts if p]
+        if not parts: return None
+        strong: Set[str] = set(); codes: List[Set[str]] = []; weak: List[Dict[str, bool]] = []
+        subs: List[Dict[str, bool]] = []   # hele deel is een deelstaat ("Michigan"): mag een landnaam tegenspreken
+        support: List[Dict[str, bool]] = []   # hele deel is een plaats/deelstaat, of een postcode
+        last = parts[-1].split()
+        for i, p in enumerate(parts):
+            if p in self.names and p not in _AMBIGUOUS_NAMES: strong.add(self.names[p]); continue
+            if p in self.alpha3 and len(parts) > 1: strong.add(self.alpha3[p]); continue
+            if len(p) == 2 and self._code(p): codes.append(self._code(p)); continue
+            if re.fullmatch(r"[a-z]{2} \d{5}(?: \d{4})?", p) and p[:2] in self.us_states: codes.append({"us"}); continue   # "NY 12303"
+            if i == len(parts) - 1 and len(last) > 1:
+                # "2631 AB Nootdorp Nederland", "Houston TX"
+                for n in range(min(self.max_words, len(last) - 1), 0, -1):
+                    tail = " ".join(last[-n:])
+                    if tail in self.names and tail not in _AMBIGUOUS_NAMES: strong.add(self.names[tail]); break
+                else:
+                    # alleen als hoofdletters in de invoer ("Amsterdam NL", niet "rue de la")
+                    if self._code(last[-1]) and not re.search(r"\d", last[-2]) and re.search(rf"\b{last[-1].upper()}\W*$", str(text)):
+                        codes.append(self._code(last[-1]))
+                    elif re.fullmatch(r"\d{5}", last[-1]) and last[-2] in self.us_states and re.search(rf"\b{last[-2].upper()}\W+\d", str(text)):
+                        codes.append({"us"})   # "Rotterdam NY 12303"
+            seen: Set[str] = set()
+            for g in self._ngrams(p.split()):
+                if g in seen: continue
+                if g in self.places:   # "Georgia": deelstaat én land
+                    ev = dict(self.places[g])
+                    if g == p and g in self.names: ev.setdefault(self.names[g], True)
+                    weak.append(ev); seen.update(g.split())
+                    if g == p: support.append(ev)
+                    if g == p and g in self.subdivisions: subs.append(ev)
+                # een landnaam binnen een straat- of plaatsnaam ("Canada Square", "Jersey City",
+                # "India Street") is geen bewijs; een heel deel met een landnaam is hierboven al sterk
+        folded = fold(text)
+        for rx, cc in _POSTCODES:
+            if rx.search(folded): weak.append({cc: True}); support.append({cc: True})
+
+        if len(strong) > 1: return None
+        if strong:
+            cc = strong.pop()
+            # "Holland, Michigan", "Holland, MI": deelstaat of code spreekt de landnaam tegen → geocoder
+            return None if any(cc not in s for s in subs) or any(cc not in c for c in codes) else cc
+        hint: Optional[Set[str]] = None
+        for w in weak:
+            hint = set(w) if hint is None else hint & set(w)
+        if codes:
+            # code moet kloppen met plaats/postcode ("Cambridge, MA" → us; "Zwolle, PA", "Berlin, CT" → None)
+            cand = codes[-1] if hint is None else codes[-1] & hint
+            if len(cand) == 1: return next(iter(cand))
+            prim = {cc for cc in cand if weak and all(w.get(cc, False) for w in weak)}   # "Berlin, DE": niet Delaware
+            return next(iter(prim)) if len(prim) == 1 else None
+        if not hint: return None
+        if len(hint) == 1:
+            cc = next(iter(hint))
+            # niet-primair voor een plaats die elders primair is (London → CA) alleen met eigen steun ("London, Ontario")
+            elsewhere = any(not w.get(cc, False) and any(w.values()) for w in weak)
+            return None if elsewhere and not any(s.get(cc, False) for s in support) else cc
+        prim = {cc for cc in hint if all(w.get(cc, False) for w in weak)}   # overal primair (London → GB)
+        return next(iter(prim)) if len(prim) == 1 else None
+
+
+_INDEXES: Dict[tuple, _Index] = {}
+_LOCK = threading.Lock()
+
+def _index(extra_synonyms: Optional[Dict[str, str]] = None) -> _Index:
+    key = tuple(sorted((extra_synonyms or {}).items()))
+    ix = _INDEXES.get(key)
+    if ix is None:
+        with _LOCK:
+            ix = _INDEXES.get(key)
+            if ix is None: ix = _INDEXES[key] = _Index(extra_synonyms)
+    return ix
+
+def resolve_country(text: str, extra_synonyms: Optional[Dict[str, str]] = None) -> Optional[Tuple[str, str]]:
+    """(alpha-2 in kleine letters, landnaam) als de tekst eenduidig is, anders None."""
+    ix = _index(extra_synonyms)
+    cc = ix.resolve(text)
+    return (cc, ix.display.get(cc, cc.upper())) if cc else None
+
+def places_in(cc: str, primary_only: bool = True) -> List[str]:
+    """Plaatsnamen uit de meegeleverde tabel voor één land (bv. voor de warehouse-afstandstabel)."""
+    out: List[str] = []; seen: Set[str] = set()
+    try:
+        with open(_DATA, "r", encoding="utf-8", newline="") as f:
+            for r in csv.DictReader(f):
+                k = _words(r["city"])
+                if r["country_code"].strip().lower() != cc.lower() or k in seen: continue
+                if primary_only and str(r.get("primary", "1")).strip() == "0": continue
+                seen.add(k); out.append(r["city"])
+    except OSError:
+        pass
+    return out
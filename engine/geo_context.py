@@ -0,0 +1,119 @@
+# engine/geo_context.py
+"""
+Geocodes en afstanden per run (één offerte, alle modes van een offerte, of een
+batch offertes): elk adres wordt één keer opgezocht, ook als meerdere threads
+het tegelijk vragen. Het warehouse (lib.WAREHOUSE_LOCATION) staat vast op
+lib.WAREHOUSE_COORDS en wordt nooit gegeocodeerd.
+
+Fouten worden ook onthouden: een onvindbaar adres kost de retries van de
+geocoder maar één keer per run.
+
+Alleen het land nodig (btw, binnenland/buitenland)? country() vraagt eerst de
+offline index (engine/gazetteer.py) en gaat alleen bij twijfel naar de geocoder;
+GEO_COUNTRY_INDEX=0 zet dat uit. warehouse_km() idem met de vooraf berekende
+warehouse-tabel (distance_cache.py). prefetch() haalt de routes van één offerte
+(origin→warehouse, destination→warehouse, origin→destination) gelijktijdig op.
+"""
+from __future__ import annotations
+import os, re, threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Tuple
+from engine import gazetteer
+
+LatLon = Tuple[float, float]
+
+
+def _key(addr: str) -> str:
+    return re.sub(r"\s+", " ", str(addr or "").strip()).casefold()
+
+
+class GeoContext:
+    def __init__(self, lib):
+        self.lib = lib
+        self._lock = threading.Lock()
+        self._memo: Dict[Tuple[str, ...], Future] = {}
+        self._stats = {"lookups": 0, "resolved": 0, "offline_country": 0, "warehouse_table": 0, "prefetched": 0}
+        self._offline = os.getenv("GEO_COUNTRY_INDEX", "1").strip().lower() not in ("0", "false", "no", "off")
+        wh = getattr(lib, "WAREHOUSE_COORDS", None)
+        if wh:   # vast punt: (lat, lon) + land
+            self._pin(("geo", _key(lib.WAREHOUSE_LOCATION)), ((float(wh[0]), float(wh[1])), "nl", "Netherlands"))
+
+    def _pin(self, key, value):
+        f: Future = Future(); f.set_result(value); self._memo[key] = f
+
+    def _once(self, key: Tuple[str, ...], fn: Callable[[], Any]):
+        with self._lock:
+            self._stats["lookups"] += 1
+            f = self._memo.get(key); owner = f is None
+            if owner:
+                f = self._memo[key] = Future(); self._stats["resolved"] += 1
+        if owner:
+            try: f.set_result(fn())
+            except BaseException as e: f.set_exception(e)
+        return f.result()
+
+    # ---- geocoding ----
+    def geocode_country(self, addr: str) -> Tuple[LatLon, str, str]:
+        """((lat, lon), landcode, landnaam), zoals lib.geocode_country."""
+        return self._once(("geo", _key(addr)), lambda: self.lib.geocode_country(addr))
+
+    def geocode(self, addr: str) -> LatLon:
+        return self.geocode_country(addr)[0]
+
+    def country(self, addr: str) -> Tuple[str, str]:
+        """(landcode, landnaam): offline index, bij twijfel lib.geocode_country."""
+        def _resolve():
+            hit = gazetteer.resolve_country(addr, getattr(self.lib, "_COUNTRY_SYNONYMS", None)) if self._offline else None
+            if hit:
+                with self._lock: self._stats["offline_country"] += 1
+                return hit
+            _ll, cc, name = self.geocode_country(addr)
+            return cc, name
+        return self._once(("cc", _key(addr)), _resolve)
+
+    # ---- afstanden ----
+    def road_km(self, a_addr: str, b_addr: str) -> Tuple[float, str]:
+        """(km, toelichting) tussen twee adressen, zoals lib.road_distance_between_addrs."""
+        return self._once(("km", _key(a_addr), _key(b_addr)),
+                          lambda: self.lib.distance_between_coords(self.geocode(a_addr), self.geocode(b_addr)))
+
+    def warehouse_km(self, addr: str) -> Tuple[float, str]:
+        """(km, toelichting) van adres naar het warehouse, zoals lib.afstand_km_via_warehouse:
+        eerst de warehouse-tabel (bekende plaats: geen geocode, geen route)."""
+        table = getattr(self.lib, "warehouse_table_km", None)
+        def _resolve():
+            hit = table(addr) if table else None
+            if hit:
+                with self._lock: self._stats["warehouse_table"] += 1
+                return hit
+            return self.road_km(addr, self.lib.WAREHOUSE_LOCATION)
+        return self._once(("wh", _key(addr)), _resolve)
+
+    def prefetch(self, warehouse: Iterable[str] = (), road: Iterable[Tuple[str, str]] = ()) -> None:
+        """Afstanden van één offerte vooraf ophalen: warehouse_km voor de adressen in `warehouse`,
+        road_km voor de paren in `road`. Geocodes na elkaar (Nominatim: 1/s), de routes daarna
+        gelijktijdig via lib.distances_between_coords_many. Fouten komen pas bij de echte aanroep."""
+        many = getattr(self.lib, "distances_between_coords_many", None)
+        if many is None: return
+        wh = self.lib.WAREHOUSE_LOCATION
+        table = getattr(self.lib, "warehouse_table_km", None)
+        legs = [(("km", _key(a), _key(wh)), a, wh) for a in dict.fromkeys(warehouse) if not (table and table(a))]
+        legs += [(("km", _key(a), _key(b)), a, b) for a, b in dict.fromkeys(road)]
+        with self._lock:
+            legs = [l for l in legs if l[0] not in self._memo]
+        coords: Dict[str, Any] = {}
+        for x in dict.fromkeys(p for _k, a, b in legs for p in (a, b)):
+            try: coords[x] = self.geocode(x)
+            except Exception: coords[x] = None
+        legs = [(k, coords[a], coords[b]) for k, a, b in legs if coords[a] and coords[b]]
+        if len(legs) < 2: return   # één route: gewoon bij de aanroep
+        try:
+            kms = many([(ca, cb) for _k, ca, cb in legs])
+        except Exception:
+            return
+        with self._lock:
+            for (k, _a, _b), v in zip(legs, kms):
+                if k not in self._memo: self._pin(k, v); self._stats["prefetched"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock: return dict(self._stats)
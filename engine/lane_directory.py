@@ -0,0 +1,96 @@
+# engine/lane_directory.py
+"""
+Naam → code opzoeking voor havens (UN/LOCODE) en luchthavens (IATA).
+
+Een LaneDirectory wordt één keer per lanes-frame opgebouwd (de frames komen
+uit de rate-book cache, dus één keer per geladen tarievenbestand) en daarna
+door FCL, LCL en AIR gedeeld. Opzoeken gaat in vaste volgorde:
+exact → .lower() → casefold → casefold zonder accenten/dubbele spaties.
+"""
+from __future__ import annotations
+import re, unicodedata, weakref
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+def _strip_accents(s: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
+
+def fold(s: str) -> str:
+    """Ruimste vergelijkingsvorm: casefold, zonder accenten, spaties samengevoegd."""
+    return re.sub(r"\s+", " ", _strip_accents(str(s).strip().casefold()))
+
+
+class LaneDirectory:
+    """Naam→code en code→naam maps van één lanes-sheet."""
+
+    def __init__(self):
+        self.name2code: Dict[str, str] = {}
+        self.code2name: Dict[str, str] = {}
+        self._lower: Dict[str, str] = {}
+        self._casefold: Dict[str, str] = {}
+        self._folded: Dict[str, str] = {}
+
+    def add(self, name: str, code: str) -> None:
+        """Later toegevoegde codes overschrijven (zoals de oude dict-opbouw);
+        de volgorde van namen blijft die van de eerste keer."""
+        self.name2code[name] = code
+
+    def add_code_name(self, code: str, name: str) -> None:
+        if code and name and code not in self.code2name: self.code2name[code] = name
+
+    def freeze(self) -> "LaneDirectory":
+        """Bouw de genormaliseerde maps; de eerste naam (in sheet-volgorde) wint."""
+        self._lower.clear(); self._casefold.clear(); self._folded.clear()
+        for k, v in self.name2code.items():
+            self._lower.setdefault(k.lower(), v)
+            self._casefold.setdefault(k.casefold(), v)
+            self._folded.setdefault(fold(k), v)
+        return self
+
+    def lookup(self, name: Any) -> Optional[str]:
+        s = str(name).strip() if name is not None else ""
+        if s in self.name2code: return self.name2code[s]
+        for m, key in ((self._lower, s.lower()), (self._casefold, s.casefold()), (self._folded, fold(s))):
+            if key in m: return m[key]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.name2code)
+
+
+def from_fcl_lanes(df, is_code: Callable[[str], bool]) -> LaneDirectory:
+    """Directory uit een genormaliseerde FCL lanes-frame (OPORT/OPORT_CODE/DPORT/DPORT_CODE)."""
+    d = LaneDirectory()
+    rows = zip(df["OPORT"].tolist(), df["OPORT_CODE"].tolist(), df["DPORT"].tolist(), df["DPORT_CODE"].tolist())
+    for on, oc, dn, dc in rows:
+        if is_code(oc): d.add(str(on).strip(), oc)
+        if is_code(dc): d.add(str(dn).strip(), dc)
+        d.add_code_name(str(oc).strip().upper(), str(on).strip())
+        d.add_code_name(str(dc).strip().upper(), str(dn).strip())
+    return d.freeze()
+
+def from_air_lanes(df, cols: Dict[str, str]) -> LaneDirectory:
+    """Directory uit de AIR lanes-frame: eerst alle origins, dan alle destinations."""
+    d = LaneDirectory()
+    for nc, cc in ((cols.get("oport"), cols.get("ocode")), (cols.get("dport"), cols.get("dcode"))):
+        if not (nc and cc): continue
+        for name, code in df[[nc, cc]].dropna().itertuples(index=False, name=None):
+            name, code = str(name).strip(), str(code).strip().upper()
+            d.add(name, code); d.add_code_name(code, name)
+    return d.freeze()
+
+
+_BY_ID: Dict[Tuple[int, Hashable], Tuple[Any, LaneDirectory]] = {}
+
+def for_frame(df, kind: Hashable, build: Callable[[], LaneDirectory]) -> LaneDirectory:
+    """Directory per frame-object (zolang het leeft); zie service_index.index_for."""
+    key = (id(df), kind)
+    ent = _BY_ID.get(key)
+    if ent is not None and ent[0]() is df:
+        return ent[1]
+    d = build()
+    try:
+        ref = weakref.ref(df, lambda _r, k=key: _BY_ID.pop(k, None))
+    except TypeError:
+        return d
+    _BY_ID[key] = (ref, d)
+    return d
@@ -0,0 +1,97 @@
+# engine/lane_rates.py
+"""
+Tarieftabellen per lane: één dict-toegang per vrachtregel.
+
+De lanes-frames worden één keer per frame (dus per rate-book load) omgezet in
+dicts op het codepaar. Elke lane staat er in beide richtingen in; de rij in de
+gevraagde richting gaat voor en binnen een richting wint de eerste rij in
+sheet-volgorde — gelijk aan de oude filter-en-omdraai scans.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from engine.lane_directory import for_frame
+
+AIR_BREAKS = ("r100", "r300", "r500", "r1000", "r1200", "r1500", "r2000")
+
+class FclRates(NamedTuple):
+    r20: Optional[float]
+    r40: Optional[float]
+    r40hq: Optional[float]
+    lcl: Optional[float]
+
+    def containers(self) -> Dict[str, float]:
+        """Ingevulde containertarieven in het formaat van fcl_rates_for_lane."""
+        return {k: v for k, v in (("20FT", self.r20), ("40FT", self.r40), ("40HQ", self.r40hq)) if v is not None}
+
+class AirRates(NamedTuple):
+    r100: Optional[float]
+    r300: Optional[float]
+    r500: Optional[float]
+    r1000: Optional[float]
+    r1200: Optional[float]
+    r1500: Optional[float]
+    r2000: Optional[float]
+
+    def brackets(self) -> Dict[str, float]:
+        return {k: v for k, v in zip(AIR_BREAKS, self) if v is not None}
+
+
+def _f(v) -> Optional[float]:
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(x) else x
+
+def _pairs(rows: Iterable[Tuple[Any, Any, Any]]) -> Dict[Tuple[Any, Any], Any]:
+    """{(o, d): waarde} met eerst alle rijen in eigen richting, daarna omgedraaid."""
+    rows = list(rows); out: Dict[Tuple[Any, Any], Any] = {}
+    for o, d, v in rows: out.setdefault((o, d), v)
+    for o, d, v in rows: out.setdefault((d, o), v)
+    return out
+
+
+def fcl_table(df_lanes) -> Dict[Tuple[Any, Any], FclRates]:
+    """{(POL, POD): FclRates} uit een genormaliseerde FCL lanes-frame (per frame gecachet)."""
+    def build():
+        lcl = df_lanes["RATE_LCL_CBM"].tolist() if "RATE_LCL_CBM" in df_lanes.columns else [None] * len(df_lanes)
+        rows = zip(df_lanes["OPORT_CODE"].tolist(), df_lanes["DPORT_CODE"].tolist(),
+                   df_lanes["RATE_20FT"].tolist(), df_lanes["RATE_40FT"].tolist(), df_lanes["RATE_40HQ"].tolist(), lcl)
+        return _pairs((o, d, FclRates(_f(a), _f(b), _f(c), _f(e))) for o, d, a, b, c, e in rows)
+    return for_frame(df_lanes, "fcl_rates", build)
+
+def lcl_table(df_lanes) -> Dict[Tuple[Any, Any], Optional[float]]:
+    """{(POL, POD): RATE_LCL_CBM}; hier wint de eerste rij in sheet-volgorde ongeacht de
+    richting (zoals de oude LCL-lookup in _run_safe)."""
+    def build():
+        out: Dict[Tuple[Any, Any], Optional[float]] = {}
+        for o, d, v in zip(df_lanes["OPORT_CODE"].tolist(), df_lanes["DPORT_CODE"].tolist(), df_lanes["RATE_LCL_CBM"].tolist()):
+            out.setdefault((o, d), _f(v)); out.setdefault((d, o), _f(v))
+        return out
+    return for_frame(df_lanes, "lcl_rates", build)
+
+def air_table(df, cols: Dict[str, str]) -> Dict[Tuple[str, str], AirRates]:
+    """{(ORG, DST): AirRates}; codes zoals de oude scan ze vergeleek (str().upper())."""
+    def build():
+        oc, dc = cols.get("ocode"), cols.get("dcode")
+        if not oc or not dc: return {}
+        n = len(df)
+        brk = [df[cols[k]].tolist() if cols.get(k) and cols[k] in df.columns else [None] * n for k in AIR_BREAKS]
+        codes = zip([str(v).upper() for v in df[oc].tolist()], [str(v).upper() for v in df[dc].tolist()])
+        return _pairs((o, d, AirRates(*(_f(b[i]) for b in brk))) for i, (o, d) in enumerate(codes))
+    return for_frame(df, "air_rates", build)
+
+def lcl_service_table(df_services, cols: Dict[str, str]) -> Dict[str, Tuple[int, Any]]:
+    """{PORT CODE: (rijpositie, ruwe rate)} voor Type=Freight / Mode=LCL in de services-sheet;
+    de eerste rij per PORT CODE wint."""
+    def build():
+        out: Dict[str, Tuple[int, Any]] = {}
+        rows = zip(df_services[cols["type"]].tolist(), df_services[cols["mode"]].tolist(),
+                   df_services[cols["port"]].tolist(), df_services[cols["rate_per_cbm"]].tolist())
+        for i, (t, m, port, rate) in enumerate(rows):
+            if str(t).strip().casefold() == "freight" and str(m).strip().casefold() == "lcl":
+                out.setdefault(str(port).strip().upper(), (i, rate))
+        return out
+    return for_frame(df_services, "lcl_rates", build)
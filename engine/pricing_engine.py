@@ -0,0 +1,394 @@
+# engine/pricing_engine.py
+"""
+GUI-vrije prijsberekening (ROAD, LCL, AIR, FCL, destination-only).
+
+Dit is de rekenlogica uit App._run_safe: getypeerde invoer (QuoteInput) in,
+kostenregels (PriceResult) uit. Geen Tk, geen messageboxen: invoer- en
+tarieffouten worden een PricingError met dezelfde titel/tekst als de oude
+melding; info-meldingen (automatisch gekozen sheet, omgezette codes) komen in
+PriceResult.notices.
+
+De tarief- en geo-helpers (lees_*, match_service_rij, geocode_country, ...)
+komen uit `lib`: de Studio-module of elk object met dezelfde namen. Er is geen
+gedeelde toestand per aanroep, dus price() mag parallel draaien (FastAPI
+threadpool); de caches in de helpers zijn zelf thread-safe.
+
+Geocodes en afstanden lopen via een GeoContext (engine/geo_context.py): elk
+adres één keer per run. Geef dezelfde `geo` mee aan meerdere price()-aanroepen
+(modes van één offerte, een batch) om ze te delen.
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from engine.geo_context import GeoContext
+
+MODES = ("ROAD", "LCL", "FCL", "AIR")
+
+
+class PricingError(Exception):
+    """Prijsberekening afgebroken. kind = "warning" (invoer) of "error" (tarief/geo/Excel)."""
+
+    def __init__(self, title: str, message: str, kind: str = "error"):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+        self.kind = kind
+        self.notices: List[Tuple[str, str]] = []
+
+
+@dataclass
+class QuoteInput:
+    mode: str
+    origin: str = ""
+    destination: str = ""
+    volume_cbm: float = 0.0
+    use_origin: bool = True
+    use_freight: bool = True
+    use_dest: bool = True
+    pol: str = ""                       # haven/luchthaven: code of naam (LCL/FCL/AIR)
+    pod: str = ""
+    excel_path: str = "tarieven.xlsx"
+    fcl_sheet: str = ""                 # leeg = automatisch detecteren
+    fcl_choice: str = "Auto (best price)"
+    road_type: str = "Combined"         # Combined / Direct
+    road_rate: Optional[float] = None   # €/km; None = standaard voor road_type
+    # alleen destination-only (FCL/LCL/AIR met alleen Destination aangevinkt)
+    dest_only_container: str = "20FT"
+    dest_only_gross_cbm: float = 0.0
+    dest_only_air_kg: float = 0.0       # 0 = afleiden uit volume (cbm × 167)
+    dest_only_rate: Optional[float] = None
+    dest_only_label: str = ""
+
+
+@dataclass
+class PriceResult:
+    charges_rows: List[Dict[str, Any]] = field(default_factory=list)
+    dest_only_rows: List[Dict[str, Any]] = field(default_factory=list)
+    origin_km: Optional[float] = None
+    origin_km_note: Optional[str] = None
+    dest_km: Optional[float] = None
+    dest_km_note: Optional[str] = None
+    notices: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        """Som zoals op de PDF: kostenregels (zonder skip_total) + destination-only regels."""
+        t = sum(float(r["amount"]) for r in self.charges_rows if r.get("amount") is not None and not r.get("skip_total"))
+        return round(t + sum(float(r.get("amount") or 0.0) for r in self.dest_only_rows), 2)
+
+
+def _service_line(lib, row, descr: str, volume_cbm: float, amount: float) -> Dict[str, Any]:
+    C = lib.COLS
+    if str(row[C["rate_type"]]).strip().upper() == "FLAT":
+        return {"descr": descr, "qty": "1 flat", "rate": lib.eur(float(row[C['flat']])), "amount": amount}
+    return {"descr": descr, "qty": f"{volume_cbm:g} m³", "rate": f"{lib.eur(float(row[C['rate_per_cbm']]))} / m³", "amount": amount}
+
+def _service_row(lib, df, label: str, typ: str, addr: str, mode: str, volume_cbm: float, km, cc):
+    p = lib.LineParams(label, typ, addr, mode, volume_cbm, km)
+    row = lib.match_service_rij_strict_op(df, p) if cc != "nl" else lib.match_service_rij(df, p)
+    return row, lib.calc_service_prijs(row, volume_cbm)
+
+def _sheet_missing(e: Exception) -> bool:
+    return "Worksheet named" in str(e) or "not found" in str(e).lower()
+
+
+def price(inp: QuoteInput, lib, geo: Optional[GeoContext] = None) -> PriceResult:
+    """Bereken de kostenregels voor `inp`; zie de moduledocstring voor `lib` en `geo`."""
+    res = PriceResult()
+    try:
+        _price(inp, lib, res, geo if geo is not None else GeoContext(lib))
+    except PricingError as e:
+        e.notices = res.notices
+        raise
+    return res
+
+def check_input(inp: QuoteInput, lib, geo: Optional[GeoContext] = None) -> None:
+    """Alleen de invoercontrole van price() (diensten, adressen, landen, volume), zonder
+    Excel te lezen: dezelfde PricingError, in dezelfde volgorde."""
+    _check(inp, geo if geo is not None else GeoContext(lib))
+
+def _check(inp: QuoteInput, geo: GeoContext):
+    use_origin, use_freight, use_dest = bool(inp.use_origin), bool(inp.use_freight), bool(inp.use_dest)
+    if not (use_origin or use_freight or use_dest):
+        raise PricingError("Input", "Select at least one service (Origin / Freight / Destination).", "warning")
+    origin_addr = (inp.origin or "").strip(); dest_addr = (inp.destination or "").strip()
+    if (use_origin or use_freight) and not origin_addr:
+        raise PricingError("Input", "Enter an Origin location or untick related services.", "warning")
+    if use_dest and not dest_addr:
+        raise PricingError("Input", "Enter a Destination location or untick related services.", "warning")
+
+    mode = (inp.mode or "").strip().upper()
+    try:
+        cc_o = None
+        if (use_origin or use_freight) and origin_addr:
+            cc_o, _name_o = geo.country(origin_addr)
+        cc_d = None
+        if dest_addr:
+            cc_d, _name_d = geo.country(dest_addr)
+    except Exception as e:
+        raise PricingError("Geocoding", f"Could not geocode country: {e}")
+    try:
+        volume_cbm = float(inp.volume_cbm)
+    except (TypeError, ValueError):
+        volume_cbm = math.nan
+    if not volume_cbm > 0:
+        raise PricingError("Input", "Volume (m³) invalid or ≤ 0.", "warning")
+    return use_origin, use_freight, use_dest, origin_addr, dest_addr, mode, cc_o, cc_d, volume_cbm
+
+def _price(inp: QuoteInput, lib, res: PriceResult, geo: GeoContext) -> None:
+    use_origin, use_freight, use_dest, origin_addr, dest_addr, mode, cc_o, cc_d, volume_cbm = _check(inp, geo)
+    excel = inp.excel_path
+    fcl_sheet_name = (inp.fcl_sheet or "").strip()
+    try: df = lib.lees_services_sheet(excel, lib.SERVICES_SHEET)
+    except Exception as e:
+        raise PricingError("Excel read error (services)", f"{e}")
+
+    # Distances to warehouse (+ ROAD freight leg): all routes of this quote fetched concurrently
+    domestic_pair = cc_o == "nl" and cc_d == "nl" and use_origin and use_dest
+    road = [(origin_addr, dest_addr)] if mode == "ROAD" and use_freight and dest_addr and not domestic_pair else []
+    geo.prefetch([a for a, use in ((origin_addr, use_origin), (dest_addr, use_dest)) if use], road)
+    okm = onote = None; dkm = dnote = None
+    if use_origin: okm, onote = geo.warehouse_km(origin_addr)
+    if use_dest:   dkm, dnote = geo.warehouse_km(dest_addr)
+    res.origin_km, res.origin_km_note, res.dest_km, res.dest_km_note = okm, onote, dkm, dnote
+
+    rows = res.charges_rows
+    only_dest = (not use_origin) and (not use_freight) and use_dest
+    if only_dest and mode in ("FCL", "LCL", "AIR"):
+        res.dest_only_rows.append(_dest_only_row(inp, lib, geo, excel, dest_addr, mode, volume_cbm))
+
+    if mode == "ROAD":
+        _price_road(inp, lib, geo, df, rows, origin_addr, dest_addr, volume_cbm, okm, dkm, use_origin, use_freight, use_dest)
+    else:
+        if use_origin:
+            try:
+                row_o, amt_o = _service_row(lib, df, "Origin services", "Origin", origin_addr, mode, volume_cbm, okm, cc_o)
+                rows.append(_service_line(lib, row_o, f"Origin services ({row_o[lib.COLS['mode']]}) {origin_addr}", volume_cbm, amt_o))
+            except Exception as e:
+                raise PricingError("Rates (Origin)", f"{e}")
+        if use_freight:
+            if mode == "LCL": _price_lcl(inp, lib, df, rows, excel, fcl_sheet_name, volume_cbm)
+            elif mode == "AIR": _price_air(inp, lib, res, rows, excel, volume_cbm)
+            elif mode == "FCL": _price_fcl(inp, lib, res, rows, excel, fcl_sheet_name, volume_cbm)
+        if use_dest:
+            try:
+                row_d, amt_d = _service_row(lib, df, "Destination services", "Destination", dest_addr, mode, volume_cbm, dkm, cc_d)
+                rows.append(_service_line(lib, row_d, f"Destination services ({row_d[lib.COLS['mode']]}) {dest_addr}", volume_cbm, amt_d))
+            except Exception as e:
+                raise PricingError("Rates (Destination)", f"{e}")
+
+    if not rows:
+        raise PricingError("Input", "Nothing to show. Tick at least one service.", "warning")
+
+
+def _dest_only_row(inp: QuoteInput, lib, geo: GeoContext, excel: str, dest_addr: str, mode: str, volume_cbm: float) -> Dict[str, Any]:
+    try:
+        df_dest, dest_cols = lib.lees_dest_only_charges(excel, lib.DEST_ONLY_SHEET)
+    except Exception as e:
+        raise PricingError("Excel (DestOnlyCharges)", f"{e}")
+    try:
+        cc_d, name_d = geo.country(dest_addr)
+        dest_country = ("Netherlands" if (cc_d == "nl" and name_d) else (name_d or "Netherlands"))
+    except Exception:
+        dest_country = "Netherlands"
+    container = None; gross_cbm_val = None; air_kg_val = None
+    if mode == "FCL":
+        container = (inp.dest_only_container or "20FT").strip()
+    elif mode == "LCL":
+        gross_cbm_val = float(inp.dest_only_gross_cbm or 0.0)
+    elif mode == "AIR":
+        air_kg_val = float(inp.dest_only_air_kg or 0.0)
+        # Fallback: if not provided, derive chargeable kg from volume (cbm * 167)
+        if not air_kg_val:
+            air_kg_val = round(volume_cbm * 167.0, 2)
+    try:
+        (cname, qty_val, qty_unit, rate_str, amt) = lib.find_dest_only_rate(df_dest, dest_cols, dest_country, mode, container, gross_cbm_val, air_kg_val)
+    except Exception as e:
+        raise PricingError("Dest-only rates", f"{e}")
+    override_rate = inp.dest_only_rate
+    if override_rate is not None:
+        if mode == "FCL":
+            amt = override_rate
+            rate_str = lib.eur(override_rate)
+        elif mode == "LCL":
+            amt = round(override_rate * (qty_val or 0.0), 2)
+            rate_str = lib.eur(override_rate) + " / cbm gross"
+        elif mode == "AIR":
+            amt = round(override_rate * (qty_val or 0.0), 2)
+            rate_str = lib.eur(override_rate) + " / kg"
+    qty_disp = f"{qty_val:g} {qty_unit}" if qty_unit else (f"{qty_val:g}" if qty_val is not None else "-")
+    label_override = (inp.dest_only_label or "").strip()
+    descr = label_override if label_override and label_override != "(auto)" else cname
+    return {"descr": descr, "qty": qty_disp, "rate": rate_str, "amount": amt}
+
+
+def _price_road(inp, lib, geo, df, rows, origin_addr, dest_addr, volume_cbm, okm, dkm, use_origin, use_freight, use_dest) -> None:
+    # Determine domestic vs international (only for the addresses we actually need)
+    try:
+        cc_o = cc_d = None
+        if (use_origin or use_freight) and origin_addr:
+            cc_o, _name_o = geo.country(origin_addr)
+        if (use_dest or use_freight) and dest_addr:
+            cc_d, _name_d = geo.country(dest_addr)
+        if use_freight and (not origin_addr or not dest_addr):
+            raise ValueError("Both origin and destination required for road freight.")
+    except Exception as e:
+        raise PricingError("Geocoding", f"Could not geocode country: {e}")
+    is_domestic = (cc_o == "nl" and cc_d == "nl") if (cc_o and cc_d) else False
+
+    if is_domestic and use_origin and use_dest:
+        # One consolidated line: Domestic door-to-door services (ROAD)
+        try:
+            row_o = lib.match_service_rij(df, lib.LineParams("Origin services", "Origin", origin_addr, "ROAD", volume_cbm, okm))
+            amt_o = lib.calc_service_prijs(row_o, volume_cbm)
+            row_d = lib.match_service_rij(df, lib.LineParams("Destination services", "Destination", dest_addr, "ROAD", volume_cbm, dkm))
+            amt_d = lib.calc_service_prijs(row_d, volume_cbm)
+            total_amt = round(amt_o + amt_d, 2)
+        except Exception as e:
+            raise PricingError("Rates (ROAD)", f"Could not match ROAD origin/destination rows: {e}")
+        rows.append({"descr": f"Domestic door-to-door services (ROAD) {origin_addr} – {dest_addr}", "qty": "-", "rate": "-", "amount": total_amt})
+        return
+
+    # International ROAD: individual origin/dest + a Road Freight line (if ticked)
+    if use_origin:
+        try:
+            row_o, amt_o = _service_row(lib, df, "Origin services", "Origin", origin_addr, "ROAD", volume_cbm, okm, cc_o)
+            rows.append(_service_line(lib, row_o, f"Origin services (ROAD) {origin_addr}", volume_cbm, amt_o))
+        except Exception as e:
+            raise PricingError("Rates (ROAD origin)", f"{e}")
+    if use_freight:
+        try:
+            km_between, _note = geo.road_km(origin_addr, dest_addr)
+            per_km = inp.road_rate
+            if per_km is None:
+                per_km = lib.DEFAULT_ROAD_RATE_COMBINED if inp.road_type == "Combined" else lib.DEFAULT_ROAD_RATE_DIRECT
+            amt_f = round(km_between * per_km, 2)
+            rows.append({"descr": f"Road freight ({inp.road_type}) {origin_addr} – {dest_addr}", "qty": f"{km_between:.0f} km",
+                         "rate": f"{lib.eur(per_km)} / km", "amount": amt_f})
+        except Exception as e:
+            raise PricingError("Road freight", f"Could not compute road distance:\n{e}")
+    if use_dest:
+        try:
+            row_d, amt_d = _service_row(lib, df, "Destination services", "Destination", dest_addr, "ROAD", volume_cbm, dkm, cc_d)
+            rows.append(_service_line(lib, row_d, f"Destination services (ROAD) {dest_addr}", volume_cbm, amt_d))
+        except Exception as e:
+            raise PricingError("Rates (ROAD destination)", f"{e}")
+
+
+def _ports(inp: QuoteInput, missing: str) -> Tuple[str, str]:
+    pol_in = (inp.pol or "").strip(); pod_in = (inp.pod or "").strip()
+    if not pol_in or not pod_in:
+        raise PricingError("Input", missing, "warning")
+    return pol_in, pod_in
+
+def _fcl_lanes(lib, res: PriceResult, excel: str, fcl_sheet_name: str, notify: bool):
+    if not fcl_sheet_name:
+        auto_name, auto_hdr = lib.detect_fcl_lanes_sheet(excel)
+        df_lanes = lib.lees_fcl_lanes(excel, auto_name, auto_hdr)
+        if notify: res.notices.append(("FCL lanes", f"Auto-selected sheet: ‘{auto_name}’."))
+        return df_lanes
+    if not notify:
+        return lib.lees_fcl_lanes(excel, fcl_sheet_name)
+    try:
+        return lib.lees_fcl_lanes(excel, fcl_sheet_name)
+    except Exception as e:
+        if not _sheet_missing(e): raise
+        auto_name, auto_hdr = lib.detect_fcl_lanes_sheet(excel)
+        df_lanes = lib.lees_fcl_lanes(excel, auto_name, auto_hdr)
+        res.notices.append(("FCL lanes", f"Sheet ‘{fcl_sheet_name}’ not found. Automatically used ‘{auto_name}’."))
+        return df_lanes
+
+def _price_lcl(inp, lib, df, rows, excel, fcl_sheet_name, volume_cbm) -> None:
+    pol_in, pod_in = _ports(inp, "Enter both POL and POD (code or name) or untick Freight.")
+    try:
+        df_lanes = _fcl_lanes(lib, None, excel, fcl_sheet_name, notify=False)
+    except Exception as e:
+        raise PricingError("Excel (lanes)", f"{e}")
+    try:
+        pol = lib.resolve_port_input(pol_in, df_lanes)
+        pod = lib.resolve_port_input(pod_in, df_lanes)
+    except Exception as e:
+        raise PricingError("POL/POD", str(e))
+    code2name = lib.build_code_to_name(df_lanes); pol_name = code2name.get(pol, pol); pod_name = code2name.get(pod, pod)
+    try:
+        # try to get from lanes sheet first
+        rate_per_cbm = lib.lcl_rate_for_lane(df_lanes, pol, pod)
+        if rate_per_cbm is None:
+            rate_per_cbm = lib.find_lcl_rate_per_cbm(df, pol, pod)
+    except Exception as e:
+        raise PricingError("Rates (LCL)", str(e))
+    gross_cbm = round(volume_cbm * 1.2, 4)
+    amount = round(gross_cbm * rate_per_cbm, 2)
+    rows.append({"descr": f"Freight (LCL) {pol_name} - {pod_name}", "qty": f"{gross_cbm:.2f} cbm gross",
+                 "rate": f"{lib.eur(rate_per_cbm)} / cbm gross", "amount": amount})
+
+def _price_air(inp, lib, res, rows, excel, volume_cbm) -> None:
+    pol_in, pod_in = _ports(inp, "Enter both Origin and Destination airport (IATA code or name) or untick Freight.")
+    # Read AIR sheet (auto if empty)
+    try:
+        air_sheet = (getattr(lib, "AIR_SHEET", "") or "").strip()
+        if not air_sheet:
+            auto_name, auto_hdr = lib.detect_air_lanes_sheet(excel)
+            df_air, air_cols = lib.lees_air_lanes(excel, auto_name, auto_hdr)
+            res.notices.append(("AIR lanes", f"Auto-selected sheet: ‘{auto_name}’."))
+        else:
+            try:
+                df_air, air_cols = lib.lees_air_lanes(excel, air_sheet)
+            except Exception as e:
+                if not _sheet_missing(e): raise
+                auto_name, auto_hdr = lib.detect_air_lanes_sheet(excel)
+                df_air, air_cols = lib.lees_air_lanes(excel, auto_name, auto_hdr)
+                res.notices.append(("AIR lanes", f"Sheet ‘{air_sheet}’ not found. Automatically used ‘{auto_name}’."))
+    except Exception as e:
+        raise PricingError("Excel (AIR lanes)", f"{e}")
+    try:
+        pol = lib.resolve_air_input(pol_in, df_air, air_cols)
+        pod = lib.resolve_air_input(pod_in, df_air, air_cols)
+    except Exception as e:
+        raise PricingError("AIR IATA", str(e))
+    if (pol != pol_in) or (pod != pod_in):
+        res.notices.append(("AIR lanes", f"Input converted to codes: ORG={pol_in}→{pol}, DST={pod_in}→{pod}"))
+    acw = max(100.0, math.ceil(max(0.0, volume_cbm) * 1.2 * 167.0))
+    try:
+        rates = lib.air_rates_for_lane(df_air, air_cols, pol, pod)
+    except Exception as e:
+        raise PricingError("AIR lane not found", str(e))
+    _brk_key, rate_per_kg = lib.pick_air_rate(rates, acw)
+    rows.append({"descr": f"Freight (AIR) {pol} - {pod}", "qty": f"{acw:.0f} kg (charg.)",
+                 "rate": f"{lib.eur(rate_per_kg)} / kg", "amount": round(acw * rate_per_kg, 2)})
+
+def _price_fcl(inp, lib, res, rows, excel, fcl_sheet_name, volume_cbm) -> None:
+    pol_in, pod_in = _ports(inp, "Enter both POL and POD (code or name) or untick Freight.")
+    try:
+        df_lanes = _fcl_lanes(lib, res, excel, fcl_sheet_name, notify=True)
+    except Exception as e:
+        raise PricingError("Excel read error (FCL lanes)", f"{e}")
+    try:
+        pol = lib.resolve_port_input(pol_in, df_lanes)
+        pod = lib.resolve_port_input(pod_in, df_lanes)
+    except Exception as e:
+        raise PricingError("POL/POD not recognised", str(e))
+    if (pol != pol_in) or (pod != pod_in):
+        res.notices.append(("FCL lanes", f"Input converted to codes: POL={pol_in}→{pol}, POD={pod_in}→{pod}"))
+    try: rates = lib.fcl_rates_for_lane(df_lanes, pol, pod)
+    except Exception as e:
+        raise PricingError("Lane not found", str(e))
+
+    code2name = lib.build_code_to_name(df_lanes); pol_name = code2name.get(pol, pol); pod_name = code2name.get(pod, pod)
+    descr = f"Freight (FCL) {pol_name} - {pod_name}"
+    choice = (inp.fcl_choice or "Auto (best price)").upper()
+    if choice.startswith("AUTO"):
+        combo = lib.choose_fcl_combo(volume_cbm, rates)
+        for ctype in ["40HQ", "40FT", "20FT"]:
+            n = combo.get(ctype, 0)
+            if n > 0:
+                r = rates[ctype]
+                rows.append({"descr": descr, "qty": f"{n} × {lib.PRETTY_TYPE.get(ctype, ctype)}", "rate": f"{lib.eur(r)} / container", "amount": n*r})
+    else:
+        if choice not in rates:
+            raise PricingError("Container not available", f"{choice} has no rate for this lane.")
+        cap = lib.FCL_CAPACITY.get(choice, 9999)
+        n = math.ceil(volume_cbm / cap) if volume_cbm > 0 else 1
+        r = rates[choice]
+        rows.append({"descr": descr, "qty": f"{n} × {lib.PRETTY_TYPE.get(choice, choice)}", "rate": f"{lib.eur(r)} / container", "amount": n*r})
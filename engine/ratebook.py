@@ -0,0 +1,169 @@
+# engine/ratebook.py
+"""
+Proces-brede cache voor tarieven.xlsx.
+
+Een RateBook hoort bij één versie van het Excel-bestand. Alles wat uit het
+werkboek wordt afgeleid (services-sheet, lanes, dest-only charges, ...) wordt
+per RateBook één keer opgebouwd via ``book.get(key, build)`` en daarna
+hergebruikt tot het bestand wijzigt (mtime/size, bevestigd met sha1).
+
+De opgeslagen objecten worden gedeeld tussen requests/threads: behandel ze
+als read-only.
+"""
+from __future__ import annotations
+import hashlib, os, threading, time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+def _env(k: str, d: str="") -> str: return os.getenv(k, d)
+
+def default_path() -> str:
+    return _env("PRICING_EXCEL_PATH", "tarieven.xlsx") or "tarieven.xlsx"
+
+def _stat_sig(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def _sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class RateBook:
+    """Geparste inhoud van één versie van het tarievenbestand."""
+
+    def __init__(self, path: str, sig: Tuple[int, int], sha1: str):
+        self.path = path
+        self.sig = sig
+        self.sha1 = sha1
+        self.loaded_at = time.time()
+        self._items: Dict[Hashable, Any] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Geef het item voor `key`; bouw het (één keer, thread-safe) via `build()`.
+        Fouten worden niet gecachet zodat een volgende aanroep het opnieuw probeert."""
+        try:
+            return self._items[key]
+        except KeyError:
+            pass
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._items:
+                self._items[key] = build()
+            return self._items[key]
+
+    def keys(self):
+        return list(self._items.keys())
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "sha1": self.sha1,
+            "mtime_ns": self.sig[0],
+            "size": self.sig[1],
+            "loaded_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            "items": [str(k) for k in self._items.keys()],
+        }
+
+
+_BOOKS: Dict[str, RateBook] = {}
+_LOCK = threading.Lock()
+
+def get_ratebook(path: Optional[str] = None) -> RateBook:
+    """Geef de actuele RateBook voor `path`.
+    Per aanroep alleen een os.stat(); bij gewijzigde mtime/size wordt de sha1
+    bepaald en alleen bij andere inhoud een nieuwe (lege) RateBook gestart."""
+    path = os.path.abspath(path or default_path())
+    sig = _stat_sig(path)
+    book = _BOOKS.get(path)
+    if book is not None and book.sig == sig:
+        return book
+    with _LOCK:
+        book = _BOOKS.get(path)
+        if book is not None and book.sig == sig:
+            return book
+        sha1 = _sha1(path)
+        if book is not None and book.sha1 == sha1:
+            book.sig = sig  # alleen aangeraakt, inhoud gelijk
+            return book
+        book = RateBook(path, sig, sha1)
+        _BOOKS[path] = book
+        return book
+
+def reload(path: Optional[str] = None) -> RateBook:
+    """Gooi de cache voor `path` weg en start met een verse RateBook."""
+    path = os.path.abspath(path or default_path())
+    with _LOCK:
+        _BOOKS.pop(path, None)
+    return get_ratebook(path)
+
+def cached(path: str, key: Hashable, build: Callable[[], Any]) -> Any:
+    """Kortere vorm van get_ratebook(path).get(key, build)."""
+    return get_ratebook(path).get(key, build)
+
+
+# =================== Sheet auto-detectie ===================
+PREVIEW_ROWS = 6
+
+def sheet_previews(path: str, nrows: int = PREVIEW_ROWS) -> Dict[str, List[tuple]]:
+    """Eerste `nrows`+1 rijen van elk werkblad, in één keer gelezen.
+    openpyxl read-only (iter_rows) voor .xlsx; pandas met nrows als fallback (.xls)."""
+    try:
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            return {ws.title: [tuple(r) for r in ws.iter_rows(max_row=nrows + 1, values_only=True)]
+                    for ws in wb.worksheets}
+        finally:
+            wb.close()
+    except Exception:
+        import pandas as pd
+        frames = pd.read_excel(path, sheet_name=None, header=None, nrows=nrows + 1)
+        return {name: [tuple(None if pd.isna(v) else v for v in row) for row in df.itertuples(index=False)]
+                for name, df in frames.items()}
+
+def _empty(v) -> bool:
+    return v is None or (isinstance(v, str) and v == "")
+
+def header_columns(rows: List[tuple], hdr: int) -> Optional[List[Any]]:
+    """Kolomnamen zoals pd.read_excel(header=hdr) ze zou geven, of None als
+    die header-rij niet bestaat (pandas geeft dan een fout)."""
+    last = max((i for i, r in enumerate(rows) if any(not _empty(v) for v in r)), default=-1)
+    more = len(rows) > PREVIEW_ROWS  # er volgen nog rijen na de preview
+    if hdr > last and not (more or (hdr == 0 and last < 0)):
+        return None
+    row = list(rows[hdr]) if hdr < len(rows) else []
+    while row and _empty(row[-1]): row.pop()
+    cols, seen = [], {}
+    for i, v in enumerate(row):
+        name = f"Unnamed: {i}" if _empty(v) else v
+        if name in seen:
+            seen[name] += 1; name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        cols.append(name)
+    return cols
+
+def detect_sheet(previews: Dict[str, List[tuple]], score: Callable[[List[Any]], Optional[int]],
+                 prefer: Tuple[str, ...] = (), headers: int = PREVIEW_ROWS) -> Optional[Tuple[str, int]]:
+    """Kies (sheet, header-rij) met de hoogste (score, voorkeursnaam, -header).
+    `score(columns)` geeft een getal, of None als de kolommen onbruikbaar zijn."""
+    best = None
+    for name, rows in previews.items():
+        pref = 1 if any(k in name.upper() for k in prefer) else 0
+        for hdr in range(0, headers):
+            cols = header_columns(rows, hdr)
+            if cols is None: continue
+            try:
+                sc = score(cols)
+            except Exception:
+                continue
+            if sc is None: continue
+            key = (sc, pref, -hdr)
+            if best is None or key > best[0]: best = (key, name, hdr)
+    return (best[1], best[2]) if best else None
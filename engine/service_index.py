@@ -0,0 +1,171 @@
+# engine/service_index.py
+"""
+Geïndexeerde opzoeking in de services-sheet (Origin/Destination tarieven).
+
+Vervangt de boolean-mask scans van match_service_rij / match_service_rij_strict_op:
+per (operation, type, mode) worden de rijen vooraf ingedeeld op afstand- en
+volumebanden, zodat één lookup een dict-hit plus twee bisects is.
+De uitkomst is rij-voor-rij gelijk aan de oude functies (eerste rij in
+sheet-volgorde wint, FLAT-voorkeur op de bandgrens, dezelfde fallbacks).
+"""
+from __future__ import annotations
+import math, weakref
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+INF = float("inf")
+
+def _num(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class _Bands:
+    """Half-open intervallen [start, end) → per elementair interval de rijen die
+    het dekken (in sheet-volgorde). Rijen met NaN-grenzen dekken niets."""
+
+    def __init__(self, spans: Sequence[Tuple[int, float, float]]):
+        self.spans = [(pos, s, e) for pos, s, e in spans if not (math.isnan(s) or math.isnan(e))]
+        self.bounds = sorted({b for _, s, e in self.spans for b in (s, e) if math.isfinite(b)})
+        self.cells: List[List[int]] = [[pos for pos, s, e in self.spans if s <= lo < e] for lo in self.bounds]
+
+    def cell(self, x) -> Optional[int]:
+        """Index van het elementaire interval met x, of None (geen/afwijkende invoer)."""
+        if x is None or x != x or not math.isfinite(x):
+            return None
+        i = bisect_right(self.bounds, x) - 1
+        return i if i >= 0 else None
+
+    def lookup(self, x) -> List[int]:
+        i = self.cell(x)
+        if i is not None:
+            return self.cells[i]
+        if x is None or x != x:
+            return []  # pandas: vergelijken met None/NaN is altijd False
+        return [pos for pos, s, e in self.spans if s <= x < e]  # ±inf of buiten alle grenzen
+
+
+class _Group:
+    """Rijen met dezelfde sleutel (operation/type/mode), vooraf ingedeeld op banden."""
+
+    def __init__(self, rows: List[int], d_start, d_end, v_min, v_max, is_flat):
+        self.rows = rows
+        self.is_flat = is_flat
+        vm = {p: (INF if math.isnan(v_max[p]) else v_max[p]) for p in rows}
+        self._vol_span = {p: (v_min[p], vm[p]) for p in rows}
+        self.dist = _Bands([(p, d_start[p], d_end[p]) for p in rows])
+        self.vol = self._vol_bands(rows)
+        # volumebanden per afstandscel, zodat afstand+volume twee bisects zijn
+        self.vol_in_cell = [self._vol_bands(c) for c in self.dist.cells]
+        # FLAT-voorkeur op de grens: eerste FLAT-rij per exacte Max. Value
+        self.flat_at: Dict[float, int] = {}
+        for p in rows:
+            if is_flat[p] and not math.isnan(v_max[p]) and v_max[p] not in self.flat_at:
+                self.flat_at[v_max[p]] = p
+        self.first_flat = next((p for p in rows if is_flat[p]), None)
+
+    def _vol_bands(self, rows: List[int]) -> _Bands:
+        return _Bands([(p,) + self._vol_span[p] for p in rows])
+
+    def by_distance(self, dist, vol) -> Tuple[List[int], List[int]]:
+        """(rijen binnen de afstandsband, daarvan de rijen binnen de volumeband)."""
+        i = self.dist.cell(dist)
+        if i is not None:
+            return self.dist.cells[i], self.vol_in_cell[i].lookup(vol)
+        base = self.dist.lookup(dist)
+        return base, (self._vol_bands(base).lookup(vol) if base else [])
+
+
+class ServiceIndex:
+    """Index op een (genormaliseerde) services-DataFrame; `cols` is de COLS-mapping."""
+
+    def __init__(self, df, cols: Dict[str, str]):
+        self.df = df
+        self.cols = cols
+        ops = [str(v) for v in df[cols["operation"]].tolist()]
+        typs = [str(v) for v in df[cols["type"]].tolist()]
+        modes = [str(v) for v in df[cols["mode"]].tolist()]
+        rtypes = [str(v) for v in df[cols["rate_type"]].tolist()]
+        d_start = [_num(v) for v in df[cols["d_start"]].tolist()]
+        d_end = [_num(v) for v in df[cols["d_end"]].tolist()]
+        v_min = [_num(v) for v in df[cols["v_min"]].tolist()]
+        v_max = [_num(v) for v in df[cols["v_max"]].tolist()]
+        n = len(ops)
+        # match_service_rij vergelijkt met .lower() en "FLAT" via .upper()
+        flat_loose = [rtypes[i].upper() == "FLAT" for i in range(n)]
+        # match_service_rij_strict_op vergelijkt met .strip().casefold() en .strip().upper()
+        flat_strict = [rtypes[i].strip().upper() == "FLAT" for i in range(n)]
+        self.ops_lower = {o.lower() for o in ops}
+
+        def build(keyf, is_flat):
+            buckets: Dict[Any, List[int]] = {}
+            for i in range(n):
+                buckets.setdefault(keyf(i), []).append(i)
+            return {k: _Group(rows, d_start, d_end, v_min, v_max, is_flat) for k, rows in buckets.items()}
+
+        self.by_op = build(lambda i: (ops[i].lower(), typs[i].lower(), modes[i].lower()), flat_loose)
+        self.by_type = build(lambda i: (typs[i].lower(), modes[i].lower()), flat_loose)
+        self.strict = build(lambda i: (ops[i].strip().casefold(), typs[i].strip().casefold(), modes[i].strip().casefold()), flat_strict)
+
+    def _row(self, pos: int):
+        return self.df.iloc[pos]
+
+    # ---- match_service_rij ----
+    def match(self, p):
+        """Zelfde keuze als match_service_rij: Operation (indien bekend) + Type + Mode +
+        afstandsband + volumeband; daarna FLAT binnen de afstandsband; daarna zonder Operation."""
+        op = p.location_for_operation.lower().strip()
+        typ = p.type_label.lower(); mode = p.mode.lower()
+        heeft_op = op in self.ops_lower
+        grp = self.by_op.get((op, typ, mode)) if heeft_op else self.by_type.get((typ, mode))
+        base, fit = grp.by_distance(p.distance_km, p.volume_cbm) if grp else ([], [])
+        # (FLAT-op-de-grens kan hier niet: een kandidaat heeft altijd volume < Max. Value)
+        if fit: return self._row(fit[0])
+        flat = next((r for r in base if grp.is_flat[r]), None)
+        if flat is not None: return self._row(flat)
+        if heeft_op:
+            grp2 = self.by_type.get((typ, mode))
+            if grp2:
+                _, fit2 = grp2.by_distance(p.distance_km, p.volume_cbm)
+                if fit2: return self._row(fit2[0])
+        raise LookupError("No matching rate row found for the given parameters.")
+
+    # ---- match_service_rij_strict_op ----
+    def match_strict(self, p):
+        """Zelfde keuze als match_service_rij_strict_op: exacte Operation, afstand genegeerd."""
+        place = str(p.location_for_operation).strip()
+        key = (place.casefold(), p.type_label.strip().casefold(), p.mode.strip().casefold())
+        grp = self.strict.get(key)
+        try:
+            vol = float(p.volume_cbm)
+        except Exception:
+            vol = None
+        if grp is not None and vol is not None and not math.isnan(vol):
+            hit = grp.flat_at.get(vol)
+            if hit is not None: return self._row(hit).copy()
+        if grp is None:
+            raise LookupError(f"Plaats '{place}' niet gevonden in de tarieven sheet voor Type='{p.type_label}' en Mode='{p.mode}'.")
+        fit = grp.vol.lookup(p.volume_cbm)
+        if fit: return self._row(fit[0])
+        if grp.first_flat is not None: return self._row(grp.first_flat)
+        return self._row(grp.rows[0])
+
+
+_BY_ID: Dict[int, Tuple[Any, ServiceIndex]] = {}
+
+def index_for(df, cols: Dict[str, str]) -> ServiceIndex:
+    """Index per DataFrame-object (zolang het leeft). Bedoeld voor de gedeelde,
+    read-only frames uit de rate-book; een gemuteerde frame moet opnieuw gelezen worden."""
+    key = id(df)
+    ent = _BY_ID.get(key)
+    if ent is not None and ent[0]() is df and ent[1].cols is cols:
+        return ent[1]
+    idx = ServiceIndex(df, cols)
+    try:
+        ref = weakref.ref(df, lambda _r, k=key: _BY_ID.pop(k, None))
+    except TypeError:
+        return idx
+    _BY_ID[key] = (ref, idx)
+    return idx
@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from engine import ratebook
 
 def _validity():
     try:
@@ -11,6 +12,9 @@ def _load_rates():
     path = os.environ.get("PRICING_EXCEL_PATH","tarieven.xlsx")
     if not os.path.exists(path):
         return None
+    return ratebook.cached(path, "core_rates", lambda: _read_rates(path))
+
+def _read_rates(path):
     try:
         df = pd.read_excel(path)
     except Exception:
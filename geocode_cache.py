@@ -0,0 +1,119 @@
+# geocode_cache.py
+"""
+Geocode-cache: SQLite-tabel `geocodes` (via storage, gedeeld door alle API-workers
+en de Tk-app) met een LRU in het geheugen ervoor.
+
+Sleutel = genormaliseerd adres (normalize): "Amsterdam , NL" en "amsterdam, nl"
+delen één regel. Een regel ouder dan GEOCODE_TTL_DAYS (standaard 180; 0 = nooit)
+telt als miss, zodat het adres opnieuw opgevraagd wordt. Schrijven is één
+INSERT per nieuw adres in plaats van het hele geocache.json herschrijven.
+"""
+from __future__ import annotations
+import json, os, re, threading, time, unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import storage
+
+def _env(k: str, d: str = "") -> str: return os.getenv(k, d)
+
+_LRU: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_LOCK = threading.Lock()
+_READY = False
+_STATS = {"hits_memory": 0, "hits_db": 0, "misses": 0, "writes": 0}
+
+def _ttl() -> float:
+    return float(_env("GEOCODE_TTL_DAYS", "180")) * 86400
+
+def _lru_max() -> int:
+    return int(_env("GEOCODE_LRU_SIZE", "4096"))
+
+def _ensure_db():
+    # de Tk-app start zonder app.py: schema hier (eenmalig) aanmaken/migreren
+    global _READY
+    if not _READY:
+        storage.init_db(); _READY = True
+
+def normalize(addr: str) -> str:
+    s = unicodedata.normalize("NFKC", str(addr or "")).casefold()
+    s = re.sub(r"\s*([,;])\s*", r"\1 ", s)
+    return re.sub(r"\s+", " ", s).strip(" ,;.")
+
+def _fresh(entry: Dict[str, Any]) -> bool:
+    ttl = _ttl()
+    return ttl <= 0 or (entry.get("fetched_at") or 0) >= time.time() - ttl
+
+def _remember(key: str, entry: Dict[str, Any]):
+    with _LOCK:
+        _LRU[key] = entry; _LRU.move_to_end(key)
+        while len(_LRU) > _lru_max(): _LRU.popitem(last=False)
+
+def get(addr: str) -> Optional[Dict[str, Any]]:
+    """{lat, lon, country_code, address, raw, fetched_at} of None (onbekend of verlopen)."""
+    key = normalize(addr)
+    if not key: return None
+    with _LOCK:
+        hit = _LRU.get(key)
+        if hit is not None:
+            if _fresh(hit):
+                _LRU.move_to_end(key); _STATS["hits_memory"] += 1
+                return hit
+            del _LRU[key]
+    _ensure_db()
+    ttl = _ttl()
+    hit = storage.geocode_get(key, time.time() - ttl if ttl > 0 else None)
+    if hit is None:
+        with _LOCK: _STATS["misses"] += 1
+        return None
+    _remember(key, hit)
+    with _LOCK: _STATS["hits_db"] += 1
+    return hit
+
+def to_entry(addr, lat, lon, raw=None, address="", country_code=None, fetched_at=None) -> Dict[str, Any]:
+    raw = raw or {}
+    if country_code is None:
+        country_code = ((raw.get("address") or {}).get("country_code") or "") if isinstance(raw, dict) else ""
+    return {"key": normalize(addr), "query": str(addr).strip(), "lat": float(lat), "lon": float(lon),
+            "country_code": (country_code or "").lower(), "address": address or str(addr).strip(),
+            "raw": raw, "fetched_at": float(fetched_at or time.time())}
+
+def put(addr: str, lat: float, lon: float, raw: Optional[dict] = None, address: str = "", country_code: Optional[str] = None) -> Dict[str, Any]:
+    entry = to_entry(addr, lat, lon, raw, address, country_code)
+    if not entry["key"]: return entry
+    _ensure_db()
+    storage.geocode_put_many([entry])
+    _remember(entry["key"], entry)
+    with _LOCK: _STATS["writes"] += 1
+    return entry
+
+def put_many(items) -> int:
+    """[(adres, {lat, lon, raw, address, country_code}), ...] in één transactie (batch-geocoder)."""
+    entries = [to_entry(a, r["lat"], r["lon"], r.get("raw"), r.get("address") or "", r.get("country_code")) for a, r in items]
+    entries = [e for e in entries if e["key"]]
+    if not entries: return 0
+    _ensure_db()
+    storage.geocode_put_many(entries)
+    for e in entries: _remember(e["key"], e)
+    with _LOCK: _STATS["writes"] += len(entries)
+    return len(entries)
+
+def import_json(path: str) -> int:
+    """Oud geocache.json ({adres: {lat, lon, raw, address}}) overnemen; bestaande regels blijven staan."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    mtime = os.path.getmtime(path)
+    rows = [to_entry(k, v["lat"], v["lon"], v.get("raw"), v.get("address") or "", fetched_at=mtime)
+            for k, v in (data or {}).items() if isinstance(v, dict) and "lat" in v and "lon" in v and normalize(k)]
+    _ensure_db()
+    return storage.geocode_put_many(rows, replace=False)
+
+def prune() -> int:
+    """Verlopen regels uit de tabel verwijderen (TTL)."""
+    ttl = _ttl()
+    if ttl <= 0: return 0
+    _ensure_db()
+    with _LOCK: _LRU.clear()
+    return storage.geocode_prune(time.time() - ttl)
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        return dict(_STATS, memory=len(_LRU), lru_max=_lru_max())
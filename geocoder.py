@@ -0,0 +1,233 @@
+# geocoder.py
+"""
+Batch-geocoding: veel adressen in één keer (bv. een tender-import).
+
+geocode_batch(addresses) ontdubbelt op genormaliseerd adres, beantwoordt
+cache-hits (geocode_cache) direct en haalt de rest op via een provider:
+gelijktijdig (GEOCODE_CONCURRENCY) maar begrensd door een token bucket
+(GEOCODE_RATE verzoeken/s, GEOCODE_BURST) die alle batches in het proces
+per provider delen. Tijdelijke fouten krijgen GEOCODE_RETRIES pogingen met
+exponentiële backoff; "niet gevonden" (None) wordt niet herhaald. Gevonden
+adressen gaan in één transactie de cache in.
+
+Providers (GEOCODE_PROVIDER):
+- nominatim (standaard): geopy Nominatim, één gedeelde instantie; houd
+  GEOCODE_RATE=1 aan (gebruiksvoorwaarden van de publieke server)
+- file:<pad>: offline uit CSV (address,lat,lon,country_code[,country,display_name])
+  of JSON in het geocache.json-formaat; voor tests en zonder netwerk
+Eigen provider: subclass GeocodeProvider en implementeer `async lookup(query)`.
+"""
+from __future__ import annotations
+import asyncio, csv, functools, json, os, threading, time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+import geocode_cache
+
+def _env(k: str, d: str = "") -> str: return os.getenv(k, d)
+
+
+class TokenBucket:
+    """Max `rate` acquires per seconde met pieken tot `burst`; rate <= 0 = onbegrensd.
+    Thread-safe en niet aan één event loop gebonden (elke batch draait in zijn eigen loop),
+    zodat gelijktijdige batches één bucket kunnen delen; zie bucket_for()."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate); self.burst = max(1, int(burst))
+        self._tokens = float(self.burst); self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, burst: int = 1):
+        with self._lock:
+            self.rate = float(rate); self.burst = max(1, int(burst)); self._tokens = min(self._tokens, float(self.burst))
+
+    def _reserve(self) -> float:
+        """Token nemen (mag onder nul: een reservering); geeft de wachttijd in seconden."""
+        with self._lock:   # op volgorde: wie eerst reserveert, gaat eerst
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._t) * self.rate); self._t = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        if self.rate <= 0: return
+        wait = self._reserve()
+        if wait > 0: await asyncio.sleep(wait)
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+def bucket_for(provider: "GeocodeProvider", rate: float, burst: int = 1) -> TokenBucket:
+    """Eén bucket per provider(naam) voor het hele proces: gelijktijdige batches (API, warehouse-job)
+    delen de limiet. rate/burst van de laatste aanroep gelden."""
+    with _BUCKETS_LOCK:
+        b = _BUCKETS.get(provider.name)
+        if b is None:
+            b = _BUCKETS[provider.name] = TokenBucket(rate, burst); return b
+    if (b.rate, b.burst) != (float(rate), max(1, int(burst))): b.configure(rate, burst)
+    return b
+
+
+# ---- providers ----
+class GeocodeProvider:
+    """lookup(query) → {lat, lon, address, raw[, country_code]} of None (niet gevonden).
+    Exceptions gelden als tijdelijk (opnieuw proberen)."""
+    name = "base"
+
+    async def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class NominatimProvider(GeocodeProvider):
+    name = "nominatim"
+
+    def __init__(self, user_agent: Optional[str] = None, timeout: Optional[float] = None):
+        from geopy.geocoders import Nominatim
+        self.timeout = float(timeout if timeout is not None else _env("GEOCODE_TIMEOUT", "12"))
+        ua = user_agent or _env("GEOCODE_UA", "voerman_quote_app/4.4 (contact: info@voerman.com)")
+        self._geo = Nominatim(user_agent=ua, timeout=self.timeout)   # gedeeld; geopy is thread-safe per request
+
+    async def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        # run_in_executor i.p.v. asyncio.to_thread (die bestaat pas vanaf Python 3.9)
+        loc = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self._geo.geocode, query, addressdetails=True, timeout=self.timeout))
+        if not loc: return None
+        return {"lat": float(loc.latitude), "lon": float(loc.longitude), "address": getattr(loc, "address", query), "raw": getattr(loc, "raw", {}) or {}}
+
+
+class FileProvider(GeocodeProvider):
+    """Offline provider uit een bestand; `latency` (s) simuleert een netwerk-roundtrip."""
+    name = "file"
+
+    def __init__(self, path: str, latency: float = 0.0):
+        self.path = path; self.latency = float(latency)
+        self._index = self._load(path)
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        if path.lower().endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                for k, v in (json.load(f) or {}).items():
+                    if isinstance(v, dict) and "lat" in v and "lon" in v:
+                        out[geocode_cache.normalize(k)] = {"lat": float(v["lat"]), "lon": float(v["lon"]),
+                                                           "address": v.get("address") or k, "raw": v.get("raw") or {}}
+            return out
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for r in csv.DictReader(f):
+                q = (r.get("address") or r.get("query") or "").strip()
+                if not q: continue
+                cc = (r.get("country_code") or "").strip().lower()
+                out[geocode_cache.normalize(q)] = {
+                    "lat": float(r["lat"]), "lon": float(r["lon"]), "address": r.get("display_name") or q, "country_code": cc,
+                    "raw": {"address": {"country_code": cc, "country": r.get("country") or ""}, "display_name": r.get("display_name") or q}}
+        return out
+
+    async def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        if self.latency: await asyncio.sleep(self.latency)
+        return self._index.get(geocode_cache.normalize(query))
+
+
+_PROVIDER: Optional[GeocodeProvider] = None
+_PROVIDER_LOCK = threading.Lock()
+
+def provider_from_env(spec: Optional[str] = None) -> GeocodeProvider:
+    spec = (spec if spec is not None else _env("GEOCODE_PROVIDER", "nominatim")).strip()
+    if spec.lower().startswith("file:"):
+        return FileProvider(spec[5:], latency=float(_env("GEOCODE_FILE_LATENCY", "0")))
+    if spec.lower() in ("", "nominatim"):
+        return NominatimProvider()
+    raise ValueError(f"onbekende GEOCODE_PROVIDER: {spec!r}")
+
+def get_provider() -> GeocodeProvider:
+    global _PROVIDER
+    if _PROVIDER is None:
+        with _PROVIDER_LOCK:
+            if _PROVIDER is None: _PROVIDER = provider_from_env()
+    return _PROVIDER
+
+
+# ---- batch ----
+@dataclass
+class BatchResult:
+    results: Dict[str, Optional[Dict[str, Any]]] = field(default_factory=dict)   # invoer-adres → cache-entry of None
+    unique: int = 0
+    cache_hits: int = 0
+    fetched: int = 0
+    not_found: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {"addresses": len(self.results), "unique": self.unique, "cache_hits": self.cache_hits, "fetched": self.fetched,
+                "not_found": self.not_found, "failed": self.failed, "seconds": round(self.seconds, 3)}
+
+
+async def geocode_batch_async(addresses: Iterable[str], provider: Optional[GeocodeProvider] = None, *,
+                              rate: Optional[float] = None, burst: Optional[int] = None, concurrency: Optional[int] = None,
+                              retries: Optional[int] = None, use_cache: bool = True) -> BatchResult:
+    t0 = time.perf_counter()
+    provider = provider or get_provider()
+    rate = float(_env("GEOCODE_RATE", "1")) if rate is None else float(rate)
+    burst = int(_env("GEOCODE_BURST", "1")) if burst is None else int(burst)
+    concurrency = int(_env("GEOCODE_CONCURRENCY", "4")) if concurrency is None else int(concurrency)
+    retries = int(_env("GEOCODE_RETRIES", "3")) if retries is None else int(retries)
+
+    addresses = [a for a in addresses if isinstance(a, str)]
+    firsts: Dict[str, str] = {}   # genormaliseerd → eerste schrijfwijze (die gaat naar de provider)
+    for a in addresses:
+        k = geocode_cache.normalize(a)
+        if k: firsts.setdefault(k, a)
+    res = BatchResult(unique=len(firsts))
+    found: Dict[str, Optional[Dict[str, Any]]] = {}
+    misses = []
+    for k, a in firsts.items():
+        hit = geocode_cache.get(a) if use_cache else None
+        if hit is not None:
+            found[k] = hit; res.cache_hits += 1
+        else:
+            misses.append((k, a))
+
+    bucket = bucket_for(provider, rate, burst); sem = asyncio.Semaphore(max(1, concurrency))
+    fresh: List[tuple] = []
+
+    async def _one(k: str, a: str):
+        async with sem:
+            for attempt in range(max(1, retries)):
+                await bucket.acquire()
+                try:
+                    r = await provider.lookup(a)
+                except Exception:
+                    if attempt + 1 < retries: await asyncio.sleep(0.5 * (2 ** attempt))
+                    continue
+                if r is None:
+                    res.not_found += 1; found[k] = None
+                else:
+                    res.fetched += 1; fresh.append((a, r))
+                return
+            res.failed += 1; found[k] = None
+
+    await asyncio.gather(*(_one(k, a) for k, a in misses))
+    if fresh:
+        if use_cache: geocode_cache.put_many(fresh)
+        for a, r in fresh:   # zelfde vorm als een cache-hit
+            found[geocode_cache.normalize(a)] = geocode_cache.to_entry(a, r["lat"], r["lon"], r.get("raw"), r.get("address") or "", r.get("country_code"))
+    res.results = {a: found.get(geocode_cache.normalize(a)) for a in addresses}
+    res.seconds = time.perf_counter() - t0
+    return res
+
+
+def geocode_batch(addresses: Iterable[str], provider: Optional[GeocodeProvider] = None, **kw) -> BatchResult:
+    """Synchrone variant van geocode_batch_async (ook bruikbaar vanuit een thread met een event loop)."""
+    addresses = list(addresses)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(geocode_batch_async(addresses, provider, **kw))
+    box: Dict[str, Any] = {}
+    def _run():
+        try: box["r"] = asyncio.run(geocode_batch_async(addresses, provider, **kw))
+        except BaseException as e: box["e"] = e
+    t = threading.Thread(target=_run, name="geocode-batch"); t.start(); t.join()
+    if "e" in box: raise box["e"]
+    return box["r"]
@@ -0,0 +1,124 @@
+# jobs.py
+"""
+Lokale job-wachtrij: werk dat te lang duurt voor één request (extractie, prijzen,
+PDF's, preview) gaat via storage.enqueue_job in de jobs-tabel en wordt door een
+pool van worker-threads opgepakt. De tabel is de bron van waarheid: jobs overleven
+een herstart, en claim_job is atomair, dus meerdere processen kunnen meedraaien.
+
+Handlers registreren met register(kind, fn); fn(params) → dict (resultaat).
+Een Retry-exceptie (bv. volle PDF-wachtrij) plant de job opnieuw in, tot
+JOB_MAX_ATTEMPTS pogingen (of max_attempts van register); elke andere fout
+maakt de job 'failed'.
+"""
+from __future__ import annotations
+import os, threading, time, traceback
+from typing import Any, Callable, Dict, Optional
+import storage
+
+def _env(k: str, d: str = "") -> str: return os.getenv(k, d)
+
+class Retry(RuntimeError):
+    """Tijdelijke fout: job later opnieuw proberen."""
+    def __init__(self, msg: str = "", delay: float = 2.0):
+        super().__init__(msg); self.delay = delay
+
+_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+_MAX_ATTEMPTS: Dict[str, int] = {}
+
+def register(kind: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]], max_attempts: Optional[int] = None):
+    _HANDLERS[kind] = fn
+    if max_attempts is not None: _MAX_ATTEMPTS[kind] = int(max_attempts)
+
+
+class JobRunner:
+    """Worker-threads die queued jobs claimen; wake() na enqueue, anders poll (JOB_POLL_SECONDS)."""
+
+    def __init__(self, workers: Optional[int] = None, poll: Optional[float] = None, max_attempts: Optional[int] = None):
+        self.workers = int(_env("PIPELINE_WORKERS", "2")) if workers is None else int(workers)
+        self.poll = float(_env("JOB_POLL_SECONDS", "1")) if poll is None else float(poll)
+        self.max_attempts = int(_env("JOB_MAX_ATTEMPTS", "3")) if max_attempts is None else int(max_attempts)
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: list = []
+        self._lock = threading.Lock()
+        self._stats = {"done": 0, "failed": 0, "retried": 0, "running": 0}
+
+    def start(self):
+        with self._lock:
+            if self._threads or self.workers <= 0: return
+            self._stop.clear()
+            storage.requeue_stale_jobs(float(_env("JOB_STALE_SECONDS", "600")))
+            for i in range(self.workers):
+                t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                t.start(); self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set(); self.wake()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for t in threads: t.join(timeout)
+
+    def wake(self):
+        with self._wake: self._wake.notify_all()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            kinds = list(_HANDLERS)   # alleen jobs claimen die dit proces kan uitvoeren
+            try:
+                job = storage.claim_job(kinds) if kinds else None
+            except Exception:
+                job = None; traceback.print_exc()
+            if job is None:
+                with self._wake: self._wake.wait(self.poll)
+                continue
+            self.run_one(job)
+
+    def run_one(self, job: Dict[str, Any]):
+        fn = _HANDLERS.get(job["kind"])
+        with self._lock: self._stats["running"] += 1
+        try:
+            if fn is None: raise LookupError(f"geen handler voor job-type {job['kind']!r}")
+            result = fn(job["params"] or {})
+        except Retry as e:
+            if job["attempts"] < _MAX_ATTEMPTS.get(job["kind"], self.max_attempts):
+                storage.finish_job(job["id"], error=str(e), retry_at=time.time() + e.delay * job["attempts"])
+                self._count("retried"); return
+            self._fail(job, e)
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            storage.finish_job(job["id"], result=result)
+            storage.log_event("job.done", {"job_id": job["id"], "kind": job["kind"], "key": job["key"]})
+            self._count("done")
+        finally:
+            with self._lock: self._stats["running"] -= 1
+
+    def _fail(self, job, e: Exception):
+        storage.finish_job(job["id"], error=f"{type(e).__name__}: {e}")
+        storage.log_event("job.failed", {"job_id": job["id"], "kind": job["kind"], "key": job["key"], "error": str(e)})
+        self._count("failed")
+
+    def _count(self, k: str):
+        with self._lock: self._stats[k] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, started=bool(self._threads))
+
+
+_RUNNER: Optional[JobRunner] = None
+_RUNNER_LOCK = threading.Lock()
+
+def get_runner() -> JobRunner:
+    global _RUNNER
+    if _RUNNER is None:
+        with _RUNNER_LOCK:
+            if _RUNNER is None: _RUNNER = JobRunner()
+    return _RUNNER
+
+def enqueue(kind: str, key: str, params: Dict[str, Any], force: bool = False):
+    """storage.enqueue_job + workers wakker maken (en starten als dat nog niet gebeurd is)."""
+    job, created = storage.enqueue_job(kind, key, params, force=force)
+    if created:
+        r = get_runner(); r.start(); r.wake()
+    return job, created
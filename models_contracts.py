@@ -36,3 +36,13 @@ class QuoteOption(BaseModel):
     assumptions: List[str] = []
     mode: Optional[str] = None
     service: Optional[str] = None
+
+class QuoteBatchRequest(BaseModel):
+    requests: List[QuoteRequest]
+    render_pdf: bool = False
+    persist: bool = False
+
+class QuoteBatchItem(BaseModel):
+    source_id: str
+    quote_id: Optional[str] = None
+    options: List[QuoteOption]
@@ -0,0 +1,157 @@
+# pdf_service.py
+"""
+PDF-renderservice: offerte-PDF's in een pool van warme worker-processen.
+
+Elke worker laadt bij het starten de Studio (en daarmee reportlab + de
+render-templates), zodat een render alleen nog de opmaak kost. submit() geeft
+een Future met het pad van de PDF; alle opties van een offerte kunnen zo
+tegelijk gerenderd worden.
+
+De wachtrij is begrensd (PDF_QUEUE_MAX renders in behandeling); is die vol,
+dan wacht submit() maximaal PDF_QUEUE_TIMEOUT seconden en geeft daarna
+QueueFull. PDF_WORKERS=0 rendert in de aanroepende thread (zonder pool).
+"""
+from __future__ import annotations
+import multiprocessing, os, sys, threading, time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+def _env(k: str, d: str = "") -> str: return os.getenv(k, d)
+
+class QueueFull(RuntimeError):
+    """Te veel renders in behandeling; probeer het later opnieuw."""
+
+
+# ---- worker-kant ----
+def _worker_init():
+    from reportlab.pdfbase import pdfmetrics
+    pdfmetrics.getFont("Helvetica"); pdfmetrics.getFont("Helvetica-Bold")
+    import studio_adapter
+    studio_adapter.warm_up()
+
+def _ping(delay: float = 0.0) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+def _render(kwargs: Dict[str, Any]):
+    t0 = time.perf_counter()
+    from studio_adapter import generate_pdf_with_studio
+    path = generate_pdf_with_studio(**kwargs)
+    return path, (time.perf_counter() - t0) * 1000
+
+
+class RenderService:
+    """Procespool + begrensde wachtrij + metrics (zie metrics())."""
+
+    def __init__(self, workers: Optional[int] = None, queue_max: Optional[int] = None, queue_timeout: Optional[float] = None):
+        self.workers = int(_env("PDF_WORKERS", str(min(4, os.cpu_count() or 1)))) if workers is None else int(workers)
+        self.queue_max = max(1, int(_env("PDF_QUEUE_MAX", "32")) if queue_max is None else int(queue_max))
+        self.queue_timeout = float(_env("PDF_QUEUE_TIMEOUT", "30")) if queue_timeout is None else float(queue_timeout)
+        self._slots = threading.BoundedSemaphore(self.queue_max)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "pending": 0, "pool_restarts": 0}
+        self._latency = deque(maxlen=500)   # submit → klaar (ms)
+        self._render = deque(maxlen=500)    # render in de worker (ms)
+
+    # ---- pool ----
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: geen fork van een server-proces met threads
+                ctx = multiprocessing.get_context(_env("PDF_MP_START", "spawn"))
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_worker_init)
+            return self._pool
+
+    def _reset_pool(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None; self._stats["pool_restarts"] += 1
+        broken.shutdown(wait=False)   # een kapotte pool laat zelf al zijn futures falen
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Start alle workers (Studio geladen) zodat de eerste offerte niet wacht."""
+        if self.workers > 0:
+            pool = self._get_pool()
+            # korte pauze per ping zodat elke worker er één krijgt (en dus klaar is met laden)
+            pids = {f.result() for f in [pool.submit(_ping, 0.2) for _ in range(self.workers * 2)]}
+            return {"workers": self.workers, "pids": sorted(pids)}
+        _worker_init()
+        return {"workers": 0, "pids": [os.getpid()]}
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None: return
+        # cancel_futures bestaat pas vanaf Python 3.9; op 3.8 worden wachtende renders nog afgemaakt
+        # (zelf f.cancel() doen laat shutdown(wait=True) daar hangen)
+        if sys.version_info >= (3, 9): pool.shutdown(wait=True, cancel_futures=True)
+        else: pool.shutdown(wait=True)
+
+    # ---- renderen ----
+    def submit(self, **kwargs) -> "Future[str]":
+        """Render een PDF (argumenten van studio_adapter.generate_pdf_with_studio); Future → pad."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock: self._stats["rejected"] += 1
+            raise QueueFull(f"PDF-wachtrij vol ({self.queue_max} in behandeling)")
+        t0 = time.perf_counter(); out: "Future[str]" = Future()
+        with self._lock:
+            self._stats["submitted"] += 1; self._stats["pending"] += 1
+
+        def _done(res=None, exc=None):
+            with self._lock:
+                self._stats["pending"] -= 1
+                if exc is None:
+                    self._stats["completed"] += 1; self._render.append(res[1])
+                else:
+                    self._stats["failed"] += 1
+                self._latency.append((time.perf_counter() - t0) * 1000)
+            self._slots.release()
+            if exc is None: out.set_result(res[0])
+            else: out.set_exception(exc)
+
+        if self.workers <= 0:
+            try: _done(_render(kwargs))
+            except Exception as e: _done(exc=e)
+            return out
+        pool = self._get_pool()
+        try:
+            fut = pool.submit(_render, kwargs)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._reset_pool(pool); _done(exc=e)
+            return out
+        def _cb(f):
+            exc = CancelledError("PDF-render geannuleerd") if f.cancelled() else f.exception()
+            if isinstance(exc, BrokenProcessPool): self._reset_pool(pool)
+            _done(None if exc else f.result(), exc)
+        fut.add_done_callback(_cb)
+        return out
+
+    def metrics(self) -> Dict[str, Any]:
+        def _pct(xs, p):
+            if not xs: return None
+            xs = sorted(xs); return round(xs[min(len(xs) - 1, int(p * len(xs)))], 1)
+        with self._lock:
+            lat, ren = list(self._latency), list(self._render)
+            return dict(self._stats, workers=self.workers, queue_max=self.queue_max, started=self._pool is not None,
+                        latency_ms={"p50": _pct(lat, .5), "p95": _pct(lat, .95), "max": round(max(lat), 1) if lat else None},
+                        render_ms={"p50": _pct(ren, .5), "p95": _pct(ren, .95)})
+
+
+_SERVICE: Optional[RenderService] = None
+_SERVICE_LOCK = threading.Lock()
+
+def get_service() -> RenderService:
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None: _SERVICE = RenderService()
+    return _SERVICE
+
+def submit(**kwargs) -> "Future[str]":
+    return get_service().submit(**kwargs)
+
+def metrics() -> Dict[str, Any]:
+    return get_service().metrics()
@@ -1,7 +1,9 @@
 # pricing_core.py
 from __future__ import annotations
 import os, uuid
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 load_dotenv(override=False)
 
@@ -9,77 +11,162 @@ def _env(k: str, d: str="") -> str: return os.getenv(k, d)
 def _ensure_out() -> str:
     out = _env("OUT_DIR","out") or "out"; os.makedirs(out, exist_ok=True); return out
 
-def _label(req: Any) -> str:
+def _label(req: Any, mode: str | None = None) -> str:
     def _fmt(p):
         if not p: return "-"
         city = getattr(p,"city",None) or getattr(p,"POL",None) or getattr(p,"IATA",None) or ""
         cty  = getattr(p,"country",None) or ""
         s = ", ".join([x for x in [city, cty] if x])
         return s or getattr(p,"POL",None) or getattr(p,"IATA",None) or "-"
-    mode = (getattr(req,"modes",["LCL"]) or ["LCL"])[0] if isinstance(getattr(req,"modes",None), list) else getattr(req,"mode","LCL")
+    if mode is None:
+        mode = (getattr(req,"modes",["LCL"]) or ["LCL"])[0] if isinstance(getattr(req,"modes",None), list) else getattr(req,"mode","LCL")
     return f"{mode} – {_fmt(getattr(req,'origin',None))} → {_fmt(getattr(req,'destination',None))}"
 
+# indicatieve tarieven per eenheid (unit → soort, tarief, omschrijving): de enige bron voor
+# _placeholder_lines_and_totals én de gevectoriseerde _batch_totals
+_INDICATIVE = pd.DataFrame([
+    ("m3", "cbm", 95.0, "Freight (LCL) indicative"), ("cbm", "cbm", 95.0, "Freight (LCL) indicative"),
+    ("kg", "kg", 1.25, "Air freight indicative"), ("kilogram", "kg", 1.25, "Air freight indicative"),
+], columns=["unit", "kind", "rate", "descr"])
+_INDICATIVE_BY_UNIT = {r.unit: (r.kind, float(r.rate), r.descr) for r in _INDICATIVE.itertuples()}
+_QTY_FMT = {"cbm": "{:.2f} cbm", "kg": "{:.0f} kg"}
+_BASE_SERVICE = 250.00
+_BUY_FACTOR = 0.85
+
+def _measure(v: Any):
+    unit = getattr(v,"unit",None) or (isinstance(v,dict) and v.get("unit")) or "m3"
+    val  = getattr(v,"value",None) or (isinstance(v,dict) and v.get("value")) or 0.0
+    try: val = float(val)
+    except Exception: val = 0.0
+    return str(unit).lower(), val
+
 def _placeholder_lines_and_totals(req: Any):
     vols = getattr(req,"volumes",[]) or []
     lines: List[Dict[str,Any]] = []; total = 0.0
     for v in vols:
-        unit = getattr(v,"unit",None) or (isinstance(v,dict) and v.get("unit")) or "m3"
-        val  = getattr(v,"value",None) or (isinstance(v,dict) and v.get("value")) or 0.0
-        try: val = float(val)
-        except Exception: val = 0.0
-        if str(unit).lower() in ("m3","cbm"):
-            rate=95.0; amt=round(val*rate,2)
-            lines.append({"descr":"Freight (LCL) indicative","qty":f"{val:.2f} cbm","rate":f"€ {rate:.2f}/cbm","amount":amt}); total+=amt
-        elif str(unit).lower() in ("kg","kilogram"):
-            rate=1.25; amt=round(val*rate,2)
-            lines.append({"descr":"Air freight indicative","qty":f"{val:.0f} kg","rate":f"€ {rate:.2f}/kg","amount":amt}); total+=amt
+        unit, val = _measure(v)
+        if unit in _INDICATIVE_BY_UNIT:
+            kind, rate, descr = _INDICATIVE_BY_UNIT[unit]; amt = round(val*rate,2)
+            lines.append({"descr":descr,"qty":_QTY_FMT[kind].format(val),"rate":f"€ {rate:.2f}/{kind}","amount":amt}); total+=amt
     if not lines:
-        lines=[{"descr":"Base service (indicative)","qty":"1","rate":"€ 250.00","amount":250.00}]; total=250.00
-    buy = float(round(max(0.0, total*0.85), 2)); sell = float(round(total,2))
+        lines=[{"descr":"Base service (indicative)","qty":"1","rate":f"€ {_BASE_SERVICE:.2f}","amount":_BASE_SERVICE}]; total=_BASE_SERVICE
+    buy, sell = _buy_sell(total)
+    return lines, buy, sell
+
+def _buy_sell(total: float):
+    return float(round(max(0.0, total*_BUY_FACTOR), 2)), float(round(total,2))
+
+# ---- echte prijs via de engine (ENGINE_MODE=real) ----
+def _engine_mode() -> str:
+    return (_env("ENGINE_MODE","placeholder") or "placeholder").strip().lower()
+
+def _place_text(p: Any) -> str:
+    parts = [getattr(p,k,None) for k in ("address","postal_code","city","country")] if p else []
+    return ", ".join(str(x).strip() for x in parts if x and str(x).strip())
+
+def _quote_input(req: Any, mode: str):
+    from engine.pricing_engine import QuoteInput
+    services = set(_services_from_req(req)) or {"origin","freight","destination"}
+    if getattr(req,"destination_only",False): services = {"destination"}
+    o = getattr(req,"origin",None); d = getattr(req,"destination",None)
+    total_cbm = sum(val for unit, val in map(_measure, getattr(req,"volumes",[]) or []) if unit in ("m3","cbm"))
+    return QuoteInput(
+        mode=str(mode or "LCL").upper(), origin=_place_text(o), destination=_place_text(d), volume_cbm=total_cbm,
+        use_origin="origin" in services, use_freight="freight" in services, use_dest="destination" in services,
+        pol=(getattr(o,"POL",None) or getattr(o,"IATA",None) or "") if o else "",
+        pod=(getattr(d,"POD",None) or getattr(d,"IATA",None) or "") if d else "",
+        excel_path=_env("PRICING_EXCEL_PATH","tarieven.xlsx") or "tarieven.xlsx")
+
+def _engine_lines_and_totals(req: Any, mode: str, geo: Any = None):
+    """Regels + (buy, sell) via de prijsengine; gooit bij fouten (PricingError e.d.)."""
+    from studio_adapter import price_with_studio
+    res = price_with_studio(_quote_input(req, mode), geo)
+    lines = list(res.charges_rows) + list(res.dest_only_rows)
+    buy, sell = _buy_sell(res.total)
     return lines, buy, sell
 
+def _geo_context():
+    """Gedeelde geocode-context voor een run (alleen ENGINE_MODE=real)."""
+    if _engine_mode() != "real": return None
+    from studio_adapter import geo_context
+    return geo_context()
+
+def _lines_and_totals(req: Any, mode: str, geo: Any = None):
+    """(regels, buy, sell, aannames): engine bij ENGINE_MODE=real, anders/bij een fout indicatief.
+    geo: context van _geo_context(), zodat modes/offertes van één run adressen delen."""
+    if _engine_mode() == "real":
+        try:
+            lines, buy, sell = _engine_lines_and_totals(req, mode, geo)
+            return lines, buy, sell, []
+        except Exception as e:
+            note = f"Indicatieve prijs: {getattr(e, 'message', None) or e}"
+            lines, buy, sell = _placeholder_lines_and_totals(req)
+            return lines, buy, sell, [note]
+    lines, buy, sell = _placeholder_lines_and_totals(req)
+    return lines, buy, sell, []
+
+def _batch_totals(reqs: List[Any]):
+    """(buy, sell) per request in één keer: alle volumes als één frame, join op de
+    tarieftabel, bedragen en sommen met NumPy. Zelfde uitkomst als _placeholder_lines_and_totals."""
+    n = len(reqs)
+    rows = [(i,) + _measure(v) for i, r in enumerate(reqs) for v in (getattr(r,"volumes",[]) or [])]
+    vol = pd.DataFrame(rows, columns=["req", "unit", "value"]).merge(_INDICATIVE, on="unit", how="inner")
+    req_idx = vol["req"].to_numpy(dtype=np.int64)
+    # afronden met round() i.p.v. np.round: die wijkt op halve centen af van de losse berekening
+    amount = np.array([round(x, 2) for x in (vol["value"].to_numpy(dtype=float) * vol["rate"].to_numpy(dtype=float)).tolist()], dtype=float)
+    total = np.bincount(req_idx, weights=amount, minlength=n)
+    total = np.where(np.bincount(req_idx, minlength=n) > 0, total, _BASE_SERVICE)
+    buy = [round(x, 2) for x in np.maximum(0.0, total * _BUY_FACTOR).tolist()]
+    sell = [round(x, 2) for x in total.tolist()]
+    return buy, sell
+
 def _services_from_req(req: Any) -> list[str]:
     s = getattr(req, "services", None) or []
     if isinstance(s, (list, tuple)): return [str(x).lower() for x in s]
     return ["origin","freight","destination"]
 
+def _modes_of(req: Any) -> List[str]:
+    modes = getattr(req,"modes",None)
+    return (modes or ["LCL"]) if isinstance(modes, list) else [getattr(req,"mode","LCL")]
+
+def generate_quotes(req: Any, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Eén optie per mode (zoals generate_quote per mode), maar de PDF's van alle
+    opties worden tegelijk gerenderd via pdf_service. Gooit pdf_service.QueueFull
+    als de renderwachtrij vol is. Elke klaar-PDF geeft een pdf.rendered event
+    (met `context`, bv. message_id, in de payload).
+    """
+    out_dir = _ensure_out()
+    validity = f"{int(_env('VALIDITY_DAYS','14'))} dagen"
+    pending = []
+    modes = _modes_of(req); geo = _geo_context()
+    for i, mode in enumerate(modes):
+        label = _label(req, mode)
+        lines, buy, sell, assumptions = _lines_and_totals(req, mode, geo)
+        ctx = dict(context or {}, source_id=getattr(req,"source_id",None), of=len(modes))
+        pending.append(({"label": label, "buy_total": buy, "sell_total": sell, "validity": validity,
+                         "pdf_path": "", "assumptions": assumptions, "mode": mode},
+                        _submit_pdf(req, mode, label, lines, ctx)))
+    for opt, fut in pending:
+        opt["pdf_path"] = _pdf_result(fut, out_dir)
+    return [opt for opt, _ in pending]
+
 def generate_quote(req: Any) -> List[Dict[str, Any]]:
     """
-    ALTIJD Studio voor de PDF. Voor prijs/regels gebruiken we een simpele
-    berekening zodat mail + preview altijd werken.
+    ALTIJD Studio voor de PDF. Prijs/regels komen uit de prijsengine bij
+    ENGINE_MODE=real; anders (of als die faalt) een simpele berekening zodat
+    mail + preview altijd werken.
     Als Studio geen PDF kan leveren, wordt een fallback-PDF gemaakt.
     """
     out_dir = _ensure_out()
     label = _label(req)
+    mode = (getattr(req,'modes', ['LCL']) or ['LCL'])[0] if isinstance(getattr(req,'modes',None), list) else getattr(req,'mode','LCL')
 
-    # 1) simpele regels + totalen (voor mail/preview én voor fallback)
-    lines, buy, sell = _placeholder_lines_and_totals(req)
+    # 1) regels + totalen: engine (ENGINE_MODE=real) of simpele indicatieve berekening
+    lines, buy, sell, assumptions = _lines_and_totals(req, mode)
 
     # 2) Studio aanroepen voor de PDF (altijd)
-    try:
-        total_cbm = 0.0
-        for v in getattr(req,"volumes",[]) or []:
-            try:
-                unit = (getattr(v,"unit",None) or (isinstance(v,dict) and v.get("unit")) or "m3").lower()
-                val = float(getattr(v,"value",None) or (isinstance(v,dict) and v.get("value")) or 0.0)
-                if unit in ("m3","cbm"): total_cbm += val
-            except Exception: pass
-
-        from studio_adapter import generate_pdf_with_studio
-        brand = _env("BRAND","Voerman")
-        services = _services_from_req(req)
-        origin_label = getattr(getattr(req,"origin",None), "city", None) or getattr(getattr(req,"origin",None), "POL", None) or "-"
-        dest_label   = getattr(getattr(req,"destination",None), "city", None) or getattr(getattr(req,"destination",None), "POD", None) or "-"
-        mode = (getattr(req,"modes",['LCL']) or ['LCL'])[0] if isinstance(getattr(req,"modes",None), list) else getattr(req,"mode","LCL")
-
-        pdf_path = generate_pdf_with_studio(
-            brand=brand, services=services, mode=mode, total_cbm=total_cbm,
-            origin_label=origin_label, dest_label=dest_label, req_label=label,
-            priced_lines=lines
-        )
-    except Exception:
-        pdf_path = os.path.join(out_dir, f"quote_{uuid.uuid4().hex[:8]}.pdf")
-        open(pdf_path,"wb").close()
+    pdf_path = _studio_pdf(req, mode, label, lines, out_dir)
 
     return [{
         "label": label,
@@ -87,6 +174,81 @@ def generate_quote(req: Any) -> List[Dict[str, Any]]:
         "sell_total": sell,
         "validity": f"{int(_env('VALIDITY_DAYS','14'))} dagen",
         "pdf_path": pdf_path,
-        "assumptions": [],
-        "mode": (getattr(req,'modes', ['LCL']) or ['LCL'])[0] if isinstance(getattr(req,'modes',None), list) else getattr(req,'mode','LCL')
+        "assumptions": assumptions,
+        "mode": mode
     }]
+
+def price_batch(reqs: Iterable[Any], render_pdf: bool = False) -> List[List[Dict[str, Any]]]:
+    """
+    Prijs veel QuoteRequests in één aanroep; per request de opties (één per mode),
+    in dezelfde vorm als generate_quote. Zonder render_pdf wordt er geen PDF
+    gemaakt en is pdf_path leeg.
+    Alleen de indicatieve berekening is gevectoriseerd. Bij ENGINE_MODE=real gaat
+    elke request/mode nog los door de prijsengine (Studio kent geen batch-lookup op
+    het tarievenboek); wel gedeeld: één GeoContext (elk adres één keer) en het
+    gecachete tarievenboek.
+    """
+    reqs = list(reqs)
+    real = _engine_mode() == "real"   # engine per request/mode; anders gevectoriseerd
+    buy, sell = (None, None) if real else _batch_totals(reqs)
+    geo = _geo_context() if real else None   # elk adres één keer voor de hele batch
+    validity = f"{int(_env('VALIDITY_DAYS','14'))} dagen"
+    out_dir = _ensure_out() if render_pdf else None
+    result: List[List[Dict[str, Any]]] = []; pending = []
+    for i, req in enumerate(reqs):
+        opts = []
+        for mode in _modes_of(req):
+            label = _label(req, mode); pdf_path = ""; assumptions: List[str] = []
+            if real:
+                lines, b, t, assumptions = _lines_and_totals(req, mode, geo)
+            else:
+                lines, b, t = None, buy[i], sell[i]
+            opt = {"label": label, "buy_total": b, "sell_total": t, "validity": validity,
+                   "pdf_path": pdf_path, "assumptions": assumptions, "mode": mode}
+            if render_pdf:   # PDF's parallel; resultaten hieronder ophalen
+                if lines is None: lines, _, _ = _placeholder_lines_and_totals(req)
+                pending.append((opt, _submit_pdf(req, mode, label, lines, {"source_id": getattr(req,"source_id",None)})))
+            opts.append(opt)
+        result.append(opts)
+    for opt, fut in pending:
+        opt["pdf_path"] = _pdf_result(fut, out_dir)
+    return result
+
+def _pdf_kwargs(req: Any, mode: str, label: str, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    total_cbm = 0.0
+    for v in getattr(req,"volumes",[]) or []:
+        try:
+            unit = (getattr(v,"unit",None) or (isinstance(v,dict) and v.get("unit")) or "m3").lower()
+            val = float(getattr(v,"value",None) or (isinstance(v,dict) and v.get("value")) or 0.0)
+            if unit in ("m3","cbm"): total_cbm += val
+        except Exception: pass
+    origin_label = getattr(getattr(req,"origin",None), "city", None) or getattr(getattr(req,"origin",None), "POL", None) or "-"
+    dest_label   = getattr(getattr(req,"destination",None), "city", None) or getattr(getattr(req,"destination",None), "POD", None) or "-"
+    return dict(brand=_env("BRAND","Voerman"), services=_services_from_req(req), mode=mode, total_cbm=total_cbm,
+                origin_label=origin_label, dest_label=dest_label, req_label=label, priced_lines=lines)
+
+def _submit_pdf(req: Any, mode: str, label: str, lines: List[Dict[str, Any]], context: Optional[Dict[str, Any]] = None):
+    """PDF-render in de wachtrij van pdf_service (Future → pad); klaar → pdf.rendered event."""
+    import pdf_service
+    fut = pdf_service.submit(**_pdf_kwargs(req, mode, label, lines))
+    def _rendered(f):
+        if f.exception() is None:
+            try:
+                import storage
+                storage.log_event("pdf.rendered", dict(context or {}, mode=mode, label=label, pdf_path=f.result()))
+            except Exception: pass
+    fut.add_done_callback(_rendered)
+    return fut
+
+def _pdf_result(fut: Any, out_dir: str) -> str:
+    """Pad uit een render-Future; bij een fout een leeg bestand (studio_adapter heeft zelf al een fallback-PDF)."""
+    try:
+        return fut.result()
+    except Exception:
+        pdf_path = os.path.join(out_dir, f"quote_{uuid.uuid4().hex[:8]}.pdf")
+        open(pdf_path,"wb").close()
+        return pdf_path
+
+def _studio_pdf(req: Any, mode: str, label: str, lines: List[Dict[str, Any]], out_dir: str) -> str:
+    """PDF via de Studio (render-service); bij een fout een leeg bestand."""
+    return _pdf_result(_submit_pdf(req, mode, label, lines), out_dir)
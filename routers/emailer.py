@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
 from models_contracts import QuoteOption
-import os
+import asyncio, os, time
+import storage, jobs, email_service
 from email_service import render_preview
 router = APIRouter()
 class EmailPreviewBody(BaseModel):
@@ -37,7 +39,37 @@ def send_email(b: EmailSendBody):
     atts = [o.pdf_path for o in b.options if o.pdf_path]
     # Subject fallback
     subject = b.subject or (f"Offerte – {b.options[0].label}" if b.options else "Offerte")
-    # Send
-    from email_service import send_via_smtp
-    res = send_via_smtp(b.to, subject, html, atts)
-    return {"ok": res.get("ok", False), "info": res.get("info",""), "attachments": atts}
+    # Queue (verzenden gebeurt in de achtergrond; status via /email/send/{send_id})
+    res = email_service.queue_email(b.to, subject, html, atts, {'quote_id': b.quote_id})
+    return {**res, "attachments": atts}
+
+# ---- uitgaande wachtrij: job "email.send" (zie email_service.queue_email) ----
+def _send_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        email_service.send_message(params['to'], params['subject'], params['html'], params.get('attachments'))
+    except Exception as e:
+        if email_service.is_transient(e):
+            raise jobs.Retry(f"{type(e).__name__}: {e}", delay=float(os.environ.get('EMAIL_RETRY_SECONDS', '30')))
+        raise
+    atts = params.get('attachments') or []
+    storage.log_event('email.sent', dict(params.get('meta') or {}, to=params['to'], subject=params['subject'], attachments=len(atts)))
+    return {"info": "sent", "to": params['to']}
+
+jobs.register("email.send", _send_job, max_attempts=int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5')))
+
+@router.get("/send/{send_id}")
+async def send_status(send_id: str, wait: float = 0):
+    """Status van een verzending (queued/running/done/failed); wait=N (max 30 s) = long-poll."""
+    deadline = time.monotonic() + min(max(wait, 0.0), 30.0)
+    while True:
+        job = await run_in_threadpool(storage.get_job, send_id)
+        if not job or job["kind"] != "email.send":
+            raise HTTPException(404, "send not found")
+        if job["status"] not in ("queued", "running") or time.monotonic() >= deadline:
+            return {"send_id": send_id, "status": job["status"], "attempts": job["attempts"], "error": job["error"],
+                    "to": (job["params"] or {}).get("to"), "created_at": job["created_at"]}
+        await asyncio.sleep(0.25)
+
+@router.get("/smtp/stats")
+def smtp_stats():
+    return {f"{k[0]}:{k[1]}": p.stats() for k, p in list(email_service._POOLS.items())}
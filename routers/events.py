@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import asyncio, json, os
+import storage
+router = APIRouter()
+
+_POLL = float(os.environ.get("SSE_POLL_SECONDS", "2"))    # andere processen schrijven ook events
+_PING = float(os.environ.get("SSE_PING_SECONDS", "15"))
+
+@router.get("/events/stream")
+async def events_stream(request: Request, types: Optional[str] = None):
+    """
+    Server-Sent Events uit storage.log_event (o.a. message.ingested, quote.priced,
+    pdf.rendered, email.sent). ?types=a,b filtert; Last-Event-ID hervat na een reconnect.
+    """
+    wanted = [t.strip() for t in (types or "").split(",") if t.strip()] or None
+    try:
+        last = int(request.headers.get("last-event-id") or -1)
+    except ValueError:
+        last = -1
+    if last < 0: last = await run_in_threadpool(storage.events_cursor)
+    loop = asyncio.get_running_loop(); wake = asyncio.Event()
+    def _cb(): loop.call_soon_threadsafe(wake.set)
+
+    async def gen():
+        nonlocal last
+        storage.subscribe(_cb)
+        try:
+            yield "retry: 3000\n\n"
+            idle = 0.0
+            while not await request.is_disconnected():
+                wake.clear()
+                rows = await run_in_threadpool(storage.events_since, last, wanted, 200)
+                for rowid, type_, payload, created in rows:
+                    data = json.dumps({"type": type_, "payload": payload, "created_at": created}, ensure_ascii=False)
+                    yield f"id: {rowid}\nevent: {type_}\ndata: {data}\n\n"
+                    last = rowid
+                if len(rows) == 200: continue
+                if rows: idle = 0.0
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=_POLL)
+                except asyncio.TimeoutError:
+                    idle += _POLL
+                    if idle >= _PING:
+                        idle = 0.0; yield ": ping\n\n"
+        finally:
+            storage.unsubscribe(_cb)
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel
+from typing import List, Optional
+import hashlib, os
+import geocoder, geocode_cache, distance_cache, jobs
+from engine import ratebook
+router = APIRouter()
+
+class BatchBody(BaseModel):
+    addresses: List[str]
+
+def _view(e):
+    return None if e is None else {"lat": e["lat"], "lon": e["lon"], "country_code": e.get("country_code"), "address": e.get("address")}
+
+def _batch_view(res):
+    return {"results": {a: _view(e) for a, e in res.results.items()}, **res.summary()}
+
+def _geocode_job(params):
+    return _batch_view(geocoder.geocode_batch(params["addresses"]))
+
+jobs.register("geocode.batch", _geocode_job)
+
+@router.post("/geocode/batch")
+def geocode_batch(b: BatchBody, response: Response, force: bool = False):
+    """Veel adressen tegelijk: dubbelen en cache-hits direct, de rest via de provider (rate-limited).
+    Tot GEOCODE_BATCH_SYNC_MAX adressen direct; een grotere batch wordt een job (202 + job-id,
+    status en resultaat via GET /pipeline/jobs/{id})."""
+    limit = int(os.environ.get("GEOCODE_BATCH_MAX", "2000"))
+    if len(b.addresses) > limit:
+        raise HTTPException(413, f"max {limit} adressen per batch")
+    if len(b.addresses) <= int(os.environ.get("GEOCODE_BATCH_SYNC_MAX", "10")):
+        return _batch_view(geocoder.geocode_batch(b.addresses))
+    key = hashlib.sha1("\n".join(b.addresses).encode("utf-8")).hexdigest()   # zelfde lijst → zelfde job
+    job, created = jobs.enqueue("geocode.batch", key, {"addresses": b.addresses}, force=force)
+    response.status_code = 202 if created else 200
+    response.headers["Location"] = f"/pipeline/jobs/{job['id']}"
+    return {"id": job["id"], "status": job["status"], "created": created, "addresses": len(b.addresses)}
+
+@router.get("/geocode/stats")
+def geocode_stats():
+    return geocode_cache.stats()
+
+# ---- afstanden: routecache + warehouse-tabel (distance_cache.py) ----
+def _warehouse_job(params):
+    import studio_adapter
+    return studio_adapter.build_warehouse_distances(ratebook.default_path())
+
+jobs.register("distances.warehouse", _warehouse_job)
+
+@router.post("/distances/warehouse/rebuild", status_code=202)
+def warehouse_rebuild(response: Response, force: bool = False):
+    """Warehouse-afstandstabel in de achtergrond (opnieuw) opbouwen; één job per tarievenbestand-versie.
+    Alleen het geconfigureerde tarievenbestand (PRICING_EXCEL_PATH): geen pad van de client."""
+    path = ratebook.default_path()
+    try:
+        sig = int(os.path.getmtime(path))
+    except OSError:
+        raise HTTPException(404, "tarievenbestand niet gevonden")
+    job, created = jobs.enqueue("distances.warehouse", f"{os.path.abspath(path)}:{sig}", {}, force=force)
+    if not created: response.status_code = 200
+    response.headers["Location"] = f"/pipeline/jobs/{job['id']}"
+    return {"id": job["id"], "status": job["status"], "created": created}
+
+def _latlon(wh: str):
+    """ "lat,lon" → (lat, lon); anders 422."""
+    try:
+        lat, lon = (float(x) for x in wh.split(","))
+    except ValueError:
+        raise HTTPException(422, 'wh moet "lat,lon" zijn (twee getallen)')
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(422, "wh buiten bereik (lat -90..90, lon -180..180)")
+    return lat, lon
+
+@router.get("/distances/warehouse")
+def warehouse_table(wh: Optional[str] = None):
+    """Inhoud van de warehouse-tabel (wh = "lat,lon"; standaard WAREHOUSE_LATLON)."""
+    ll = _latlon(wh or os.environ.get("WAREHOUSE_LATLON", "52.051,4.396"))
+    rows = distance_cache.warehouse_rows(ll)
+    return {"warehouse": distance_cache.warehouse_key(ll), "count": len(rows), "rows": rows}
+
+@router.get("/distances/stats")
+def distance_stats():
+    return distance_cache.stats()
@@ -1,17 +1,57 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Optional
+import base64, hashlib, json
 import storage, time, uuid
 
 router = APIRouter()
 
+def _encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(",", ":")).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        ts, mid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if (ts is not None and not isinstance(ts, str)) or not isinstance(mid, str): raise ValueError
+        return ts, mid
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+def _item(r):
+    return {"id": r[0], "source": r[1], "sender_email": r[2], "subject": r[3], "timestamp": r[4]}
+
 @router.get("/messages")
-def list_messages(limit: int = 100, offset: int = 0):
-    # list ordered by timestamp or rowid fallback
-    with storage._conn() as c:
-        try:
-            rows = c.execute("SELECT id, source, sender_email, subject, ts FROM messages ORDER BY ts DESC LIMIT ? OFFSET ?", (limit, offset)).fetchall()
-        except Exception:
-            rows = c.execute("SELECT id, source, sender_email, subject, ts FROM messages ORDER BY rowid DESC LIMIT ? OFFSET ?", (limit, offset)).fetchall()
-    return [{"id": r[0], "source": r[1], "sender_email": r[2], "subject": r[3], "timestamp": r[4]} for r in rows]
+def list_messages(request: Request, response: Response, limit: int = 100, before: Optional[str] = None,
+                  offset: Optional[int] = None):
+    """Nieuwste eerst; volgende pagina met ?before=<next_cursor> (keyset, geen OFFSET).
+    ETag volgt het wijzigingsvolgnummer: bij If-None-Match zonder wijziging een 304.
+    sync_cursor is het startpunt voor /messages/changes.
+    Verouderd: ?offset=N (zonder before) geeft nog de oude platte lijst, met een Deprecation-header."""
+    limit = max(1, min(int(limit), 500))
+    if offset is not None and not before:
+        response.headers["Deprecation"] = "true"; response.headers["Link"] = '</messages>; rel="successor-version"'
+        return [_item(r) for r in storage.list_messages_offset(limit, offset)]
+    version = storage.messages_version()
+    etag = 'W/"' + hashlib.sha1(f"{version}|{limit}|{before or ''}".encode()).hexdigest()[:16] + '"'
+    if etag in [t.strip() for t in (request.headers.get("if-none-match") or "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    rows, last = storage.list_messages(limit, _decode_cursor(before) if before else None)
+    response.headers["ETag"] = etag; response.headers["Cache-Control"] = "no-cache"
+    return {"items": [_item(r) for r in rows], "next_cursor": _encode_cursor(last) if last else None,
+            "sync_cursor": str(version)}
+
+@router.get("/messages/changes")
+def message_changes(since: str):
+    """Alleen wat er sinds `since` (sync_cursor/cursor) is toegevoegd, gewijzigd of verwijderd.
+    reset=true: cursor onbekend (bv. andere database) → volledige lijst opnieuw ophalen."""
+    try:
+        since_seq = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    version = storage.messages_version()
+    if since_seq < storage.message_changes_floor() or since_seq > version:
+        return {"reset": True, "upserted": [], "deleted": [], "cursor": str(version)}
+    rows, deleted, seq = storage.message_changes(since_seq)
+    return {"reset": False, "upserted": [_item(r) for r in rows], "deleted": deleted, "cursor": str(seq), "more": seq < version}
 
 @router.get("/messages/{mid}")
 def get_message(mid: str):
@@ -1,10 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
-import os, time
-import storage, pricing_core
+import asyncio, os, time
+import storage, pricing_core, pdf_service, jobs
 from extractor import extract_from_unified
-from email_service import render_preview
+from email_service import render_preview, queue_email
 from models_contracts import QuoteOption
 
 router = APIRouter()
@@ -14,30 +15,73 @@ class GenerateBody(BaseModel):
     language: Optional[str] = None
     customer_name: Optional[str] = None
 
-@router.post("/pipeline/generate")
-def generate(b: GenerateBody):
-    msg = storage.get_message(b.message_id)
+def _generate(message_id: str, language: Optional[str] = None, customer_name: Optional[str] = None) -> Dict[str, Any]:
+    """Extractie → prijzen + PDF's → preview-HTML. LookupError als de mail niet bestaat."""
+    msg = storage.get_message(message_id)
     if not msg:
-        return {"error":"message not found"}
+        raise LookupError("message not found")
     res = extract_from_unified(msg)
     qr = res.request
-    if b.language:
-        qr.language = b.language
-    options: List[Dict[str, Any]] = []
-    for m in (qr.modes or ["LCL"]):
-        qr_single = qr.copy(update={"modes":[m]})
-        for o in pricing_core.generate_quote(qr_single):
-            o["mode"] = m
-            options.append(o)
-    html = render_preview(qr.language, options, b.customer_name or msg['sender'].get('email'), res.clarifying_questions, 'Met vriendelijke groet,\nVoerman Team', 'q_'+b.message_id)
+    if language:
+        qr.language = language
+    options: List[Dict[str, Any]] = pricing_core.generate_quotes(qr, {"message_id": message_id})   # PDF's van alle modes parallel
+    storage.log_event('quote.priced', {'message_id': message_id, 'options': len(options), 'modes': [o.get('mode') for o in options]})
+    html = render_preview(qr.language, options, customer_name or msg['sender'].get('email'), res.clarifying_questions, 'Met vriendelijke groet,\nVoerman Team', 'q_'+message_id)
     out_dir = os.environ.get('OUT_DIR','out'); os.makedirs(out_dir, exist_ok=True)
-    filename = f"email_preview_{b.message_id}.html"
+    filename = f"email_preview_{message_id}.html"
     html_path = os.path.join(out_dir, filename)
     web_path = f"/out/{filename}"
     with open(html_path,'w',encoding='utf-8') as f: f.write(html)
     atts = [o.get('pdf_path') for o in options if o.get('pdf_path')]
     return {"options": options, "html_path": html_path, "web_path": web_path, "html": html, "attachments": atts, "clarifying_questions": res.clarifying_questions}
 
+@router.post("/pipeline/generate")
+def generate(b: GenerateBody):
+    try:
+        return _generate(b.message_id, b.language, b.customer_name)
+    except LookupError as e:
+        return {"error": str(e)}
+    except pdf_service.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# ---- asynchroon: POST /pipeline/jobs → job-id, GET /pipeline/jobs/{id} → status + resultaat ----
+def _generate_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return _generate(params["message_id"], params.get("language"), params.get("customer_name"))
+    except pdf_service.QueueFull as e:
+        raise jobs.Retry(str(e), delay=5.0)
+
+jobs.register("pipeline.generate", _generate_job)
+
+class JobBody(GenerateBody):
+    force: bool = False   # afgeronde job opnieuw draaien (bv. na aanpassen van de mail)
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": job["id"], "status": job["status"], "message_id": job["key"], "attempts": job["attempts"],
+            "created_at": job["created_at"], "error": job["error"], "result": job["result"]}
+
+@router.post("/pipeline/jobs", status_code=202)
+def create_job(b: JobBody, response: Response):
+    """Genereren in de achtergrond; dezelfde message_id nogmaals geeft de bestaande job terug."""
+    if not storage.get_message(b.message_id):
+        raise HTTPException(404, "message not found")
+    job, created = jobs.enqueue("pipeline.generate", b.message_id, b.dict(exclude={"force"}), force=b.force)
+    if not created: response.status_code = 200
+    response.headers["Location"] = f"/pipeline/jobs/{job['id']}"
+    return dict(_job_view(job), created=created)
+
+@router.get("/pipeline/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Status van een job; wait=N (max 30 s) wacht tot de job klaar is (long-poll)."""
+    deadline = time.monotonic() + min(max(wait, 0.0), 30.0)
+    while True:
+        job = await run_in_threadpool(storage.get_job, job_id)
+        if not job:
+            raise HTTPException(404, "job not found")
+        if job["status"] not in ("queued", "running") or time.monotonic() >= deadline:
+            return _job_view(job)
+        await asyncio.sleep(0.25)
+
 class SendBody(BaseModel):
     to: str
     language: str = 'nl'
@@ -60,9 +104,8 @@ def send(b: SendBody):
         except Exception:
             pass
     subject = b.subject or (f"Offerte – {b.options[0].label}" if b.options else "Offerte")
-    from email_service import send_via_smtp
-    res = send_via_smtp(b.to, subject, html, atts)
-    return {"ok": res.get("ok", False), "info": res.get("info",""), "attachments": atts}
+    res = queue_email(b.to, subject, html, atts, {'quote_id': b.quote_id})   # status: /email/send/{send_id}
+    return {**res, "attachments": atts}
 
 
 class SendRawBody(BaseModel):
@@ -73,6 +116,5 @@ class SendRawBody(BaseModel):
 
 @router.post("/pipeline/send_raw")
 def send_raw(b: SendRawBody):
-    from email_service import send_raw_html
-    res = send_raw_html(b.to, b.subject, b.html, b.attachments or [])
-    return {"ok": res.get("ok", False), "info": res.get("info",""), "attachments": b.attachments}
+    res = queue_email(b.to, b.subject, b.html, b.attachments or [])
+    return {**res, "attachments": b.attachments}
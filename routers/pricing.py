@@ -1,15 +1,34 @@
-from fastapi import APIRouter
+import os
+from fastapi import APIRouter, HTTPException
 from typing import List
-from models_contracts import QuoteRequest, QuoteOption
-import storage, pricing_core
+from models_contracts import QuoteRequest, QuoteOption, QuoteBatchRequest, QuoteBatchItem
+import storage, pricing_core, pdf_service
 router = APIRouter()
 @router.post("/quote", response_model=List[QuoteOption])
 def quote(req: QuoteRequest):
-    qid = storage.new_quote(req.source_id, currency=req.currency)
-    options = []
-    for mode in (req.modes or ["LCL"]):
-        req_single = req.copy(update={"modes":[mode]})
-        for opt in pricing_core.generate_quote(req_single):
-            opt["mode"] = mode
-            storage.add_option(qid, opt); options.append(opt)
-    storage.set_quote_status(qid, 'priced'); return options
+    try:
+        options = pricing_core.generate_quotes(req)   # PDF's van alle modes parallel
+    except pdf_service.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    storage.save_quote({"source_id": req.source_id, "currency": req.currency}, options,
+                       [("quote.priced", {"source_id": req.source_id, "options": len(options)})])
+    return options
+
+@router.post("/quote/batch", response_model=List[QuoteBatchItem])
+def quote_batch(body: QuoteBatchRequest):
+    """Veel requests in één keer prijzen (bv. tender-herprijzing); standaard zonder PDF en zonder opslag.
+    Max QUOTE_BATCH_MAX requests (standaard 500); opslaan gebeurt in één transactie."""
+    limit = int(os.environ.get("QUOTE_BATCH_MAX", "500"))
+    if len(body.requests) > limit:
+        raise HTTPException(413, f"max {limit} requests per batch")
+    try:
+        results = pricing_core.price_batch(body.requests, render_pdf=body.render_pdf)
+    except pdf_service.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    qids = [None] * len(results)
+    if body.persist:
+        qids = storage.save_quotes([({"source_id": req.source_id, "currency": req.currency}, options,
+                                     [("quote.priced", {"source_id": req.source_id, "options": len(options)})])
+                                    for req, options in zip(body.requests, results)])
+    return [{"source_id": req.source_id, "quote_id": qid, "options": options}
+            for req, options, qid in zip(body.requests, results, qids)]
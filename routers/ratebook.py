@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from engine import ratebook
+router = APIRouter()
+
+# Altijd het geconfigureerde tarievenbestand (PRICING_EXCEL_PATH): geen pad uit de request,
+# anders kan elke client bestanden op de host "vingerafdrukken" en groeit _BOOKS onbegrensd.
+
+@router.get("/ratebook")
+def ratebook_info():
+    try:
+        return ratebook.get_ratebook(ratebook.default_path()).info()
+    except OSError as e:
+        return {"error": str(e)}
+
+@router.post("/ratebook/reload")
+def ratebook_reload():
+    try:
+        return {"ok": True, **ratebook.reload(ratebook.default_path()).info()}
+    except OSError as e:
+        return {"ok": False, "error": str(e)}
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+import pdf_service
+router = APIRouter()
+
+@router.get("/render/metrics")
+def render_metrics():
+    """Wachtrij en latency van de PDF-renderservice."""
+    return pdf_service.metrics()
+
+@router.post("/render/warmup")
+def render_warmup():
+    return {"ok": True, **pdf_service.get_service().warm_up()}
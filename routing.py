@@ -0,0 +1,145 @@
+# routing.py
+"""
+OpenRouteService-client: één requests.Session per API-key met een connection pool
+(keep-alive, ORS_POOL_SIZE verbindingen), zodat niet elke route een nieuwe
+TCP/TLS-handshake kost.
+
+- route_km(a, b): één route (directions), km of None
+- routes(pairs) / routes_async(pairs): meerdere routes gelijktijdig (ORS_CONCURRENCY),
+  bv. origin→warehouse, destination→warehouse en origin→destination van één offerte
+- matrix_km(sources, destinations): één matrix-request voor een batch
+  (ORS_MATRIX_MAX_LOCATIONS per request; grotere batches in blokken)
+
+Coördinaten zijn (lat, lon) zoals in de rest van de app; ORS wil [lon, lat].
+ORS_BASE_URL wijst voor tests naar een lokale mock (tests/run_ors_routing.py).
+Fouten en niet-routeerbare paren geven None; de aanroeper valt terug op geodesisch.
+"""
+from __future__ import annotations
+import asyncio, os, threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+def _env(k: str, d: str = "") -> str: return os.getenv(k, d)
+
+LatLon = Tuple[float, float]
+
+def _lonlat(p: LatLon) -> List[float]:
+    return [float(p[1]), float(p[0])]
+
+
+class OrsClient:
+    def __init__(self, api_key: str, base_url: Optional[str] = None, profile: Optional[str] = None,
+                 timeout: Optional[float] = None, pool_size: Optional[int] = None):
+        self.api_key = api_key
+        self.base_url = (base_url or _env("ORS_BASE_URL", "https://api.openrouteservice.org")).rstrip("/")
+        self.profile = profile or _env("ORS_PROFILE", "driving-car")
+        self.timeout = float(timeout if timeout is not None else _env("ORS_TIMEOUT", "20"))
+        self.pool_size = size = int(pool_size if pool_size is not None else _env("ORS_POOL_SIZE", "8"))
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": api_key, "Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._stats = {"routes": 0, "matrix": 0, "errors": 0}
+
+    def _count(self, k: str, n: int = 1):
+        with self._lock: self._stats[k] += n
+
+    def _post(self, path: str, body: dict) -> Optional[dict]:
+        try:
+            r = self.session.post(f"{self.base_url}{path}", json=body, timeout=self.timeout)
+            if r.status_code != 200:
+                self._count("errors"); return None
+            return r.json()
+        except Exception:
+            self._count("errors"); return None
+
+    # ---- directions ----
+    def route_km(self, a: LatLon, b: LatLon) -> Optional[float]:
+        self._count("routes")
+        data = self._post(f"/v2/directions/{self.profile}", {"coordinates": [_lonlat(a), _lonlat(b)]})
+        try:
+            if data and "features" in data:   # geojson-vorm
+                return data["features"][0]["properties"]["segments"][0]["distance"] / 1000.0
+            if data and "routes" in data:
+                return data["routes"][0]["summary"]["distance"] / 1000.0
+        except (KeyError, IndexError, TypeError):
+            self._count("errors")
+        return None
+
+    async def route_km_async(self, a: LatLon, b: LatLon) -> Optional[float]:
+        return await _in_thread(self.route_km, a, b)
+
+    async def routes_async(self, pairs: Sequence[Tuple[LatLon, LatLon]], concurrency: Optional[int] = None) -> List[Optional[float]]:
+        sem = asyncio.Semaphore(max(1, int(concurrency if concurrency is not None else _env("ORS_CONCURRENCY", "4"))))
+        async def _one(a, b):
+            async with sem: return await self.route_km_async(a, b)
+        return list(await asyncio.gather(*(_one(a, b) for a, b in pairs)))
+
+    def routes(self, pairs: Sequence[Tuple[LatLon, LatLon]], concurrency: Optional[int] = None) -> List[Optional[float]]:
+        """Synchrone variant van routes_async (ook vanuit een thread met een event loop)."""
+        pairs = list(pairs)
+        if len(pairs) <= 1:
+            return [self.route_km(a, b) for a, b in pairs]
+        return _run(self.routes_async(pairs, concurrency))
+
+    # ---- matrix ----
+    def matrix_km(self, sources: Sequence[LatLon], destinations: Sequence[LatLon]) -> List[List[Optional[float]]]:
+        """km[i][j] van sources[i] naar destinations[j]; None = geen route/fout. Blokken op bestemmingen."""
+        sources = list(sources); destinations = list(destinations)
+        out: List[List[Optional[float]]] = [[None] * len(destinations) for _ in sources]
+        step = max(1, int(_env("ORS_MATRIX_MAX_LOCATIONS", "50")) - len(sources))
+        for lo in range(0, len(destinations), step):
+            chunk = destinations[lo:lo + step]
+            self._count("matrix")
+            data = self._post(f"/v2/matrix/{self.profile}", {
+                "locations": [_lonlat(p) for p in sources + chunk],
+                "sources": list(range(len(sources))),
+                "destinations": list(range(len(sources), len(sources) + len(chunk))),
+                "metrics": ["distance"], "units": "km"})
+            rows = (data or {}).get("distances") or []
+            for i, row in enumerate(rows[:len(sources)]):
+                for j, km in enumerate(row[:len(chunk)]):
+                    out[i][lo + j] = float(km) if km is not None else None
+        return out
+
+    async def matrix_km_async(self, sources: Sequence[LatLon], destinations: Sequence[LatLon]):
+        return await _in_thread(self.matrix_km, sources, destinations)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock: return dict(self._stats, pool_size=self.pool_size)
+
+
+async def _in_thread(fn, *args):
+    """asyncio.to_thread bestaat pas vanaf Python 3.9."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+def _run(coro):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    box: Dict[str, object] = {}
+    def _t():
+        try: box["r"] = asyncio.run(coro)
+        except BaseException as e: box["e"] = e
+    t = threading.Thread(target=_t, name="ors-routes"); t.start(); t.join()
+    if "e" in box: raise box["e"]  # type: ignore[misc]
+    return box["r"]
+
+
+_CLIENTS: Dict[Tuple[str, str], OrsClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_client(api_key: Optional[str] = None) -> Optional[OrsClient]:
+    """Gedeelde client per (key, ORS_BASE_URL); None zonder key."""
+    key = api_key or _env("ORS_API_KEY")
+    if not key: return None
+    k = (key, _env("ORS_BASE_URL", ""))
+    c = _CLIENTS.get(k)
+    if c is None:
+        with _CLIENTS_LOCK:
+            c = _CLIENTS.get(k)
+            if c is None: c = _CLIENTS[k] = OrsClient(key)
+    return c
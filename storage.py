@@ -1,4 +1,4 @@
-import sqlite3, json, os, time, uuid
+import sqlite3, json, os, threading, time, uuid
 
 # Always keep DB next to this file by default
 _default_path = os.environ.get("DB_PATH", "voerman.db")
@@ -8,9 +8,50 @@ if not os.path.isabs(_default_path):
 else:
     DB_PATH = _default_path
 
+# ---- connectie-pool: één connectie per thread (per DB-pad), WAL + pragmas ----
+# `with _conn() as c:` blijft werken: dat is de transactie (commit/rollback), niet close.
+# De statement-cache van sqlite3 (cached_statements) werkt pas echt met hergebruikte connecties.
+_local = threading.local()
+_all_conns: "dict[tuple[int, str], sqlite3.Connection]" = {}   # (thread ident, pad) → connectie
+_pool_lock = threading.Lock()
+_generation = 0   # close_all() verhoogt dit; threads openen dan een nieuwe connectie
+
+def _pragmas(c: sqlite3.Connection):
+    journal = (os.environ.get("DB_JOURNAL_MODE", "WAL") or "WAL").upper()   # DELETE voor netwerkschijven
+    c.execute(f"PRAGMA journal_mode={journal}")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute(f"PRAGMA mmap_size={int(os.environ.get('DB_MMAP_SIZE', str(256 * 1024 * 1024)))}")
+    c.execute(f"PRAGMA cache_size={-int(os.environ.get('DB_CACHE_KB', '20000'))}")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute("PRAGMA busy_timeout=5000")
+
 def _conn():
-    # Thread-safe enough for FastAPI threadpool
-    return sqlite3.connect(DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None or getattr(_local, "generation", None) != _generation:
+        conns = _local.conns = {}; _local.generation = _generation
+    c = conns.get(DB_PATH)
+    if c is None:
+        # check_same_thread=False alleen zodat close_all() kan sluiten; gebruik blijft per thread
+        c = sqlite3.connect(DB_PATH, timeout=30, cached_statements=256, check_same_thread=False)
+        _pragmas(c)
+        conns[DB_PATH] = c
+        with _pool_lock:
+            # connecties van beëindigde threads opruimen (alleen bij openen, dus zelden)
+            alive = {t.ident for t in threading.enumerate()}
+            for key in [k for k in _all_conns if k[0] not in alive]:
+                try: _all_conns.pop(key).close()
+                except Exception: pass
+            _all_conns[(threading.get_ident(), DB_PATH)] = c
+    return c
+
+def close_all():
+    """Alle gepoolde connecties sluiten (bij afsluiten of in tests)."""
+    global _generation
+    with _pool_lock:
+        conns = list(_all_conns.values()); _all_conns.clear(); _generation += 1
+    for c in conns:
+        try: c.close()
+        except Exception: pass
 
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
@@ -61,6 +102,105 @@ def init_db():
             created_at TEXT
         )""")
         c.commit()
+    migrate()
+    prune_message_changes()
+
+# ---- schema-migraties (versie in PRAGMA user_version) ----
+# Alleen toevoegen, nooit wijzigen: (versie, omschrijving, [sql, ...]).
+MIGRATIONS = [
+    (1, "secundaire indexen", [
+        "CREATE INDEX IF NOT EXISTS idx_attachments_message_id ON attachments(message_id)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(ts)",
+        "CREATE INDEX IF NOT EXISTS idx_quote_options_quote_id ON quote_options(quote_id)",
+        "CREATE INDEX IF NOT EXISTS idx_events_type_created ON events(type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_quotes_source_message_id ON quotes(source_message_id)",
+    ]),
+    (2, "keyset-paginatie messages (ts, id)", [
+        "CREATE INDEX IF NOT EXISTS idx_messages_ts_id ON messages(ts, id)",
+        "DROP INDEX IF EXISTS idx_messages_ts",
+    ]),
+    (3, "wijzigingslog messages (incrementele sync dashboard)", [
+        """CREATE TABLE IF NOT EXISTS message_changes(
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT,
+            op TEXT
+        )""",
+        "CREATE TRIGGER IF NOT EXISTS trg_messages_ins AFTER INSERT ON messages BEGIN INSERT INTO message_changes(message_id, op) VALUES (NEW.id, 'upsert'); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_messages_upd AFTER UPDATE ON messages BEGIN INSERT INTO message_changes(message_id, op) VALUES (NEW.id, 'upsert'); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_messages_del AFTER DELETE ON messages BEGIN INSERT INTO message_changes(message_id, op) VALUES (OLD.id, 'delete'); END",
+    ]),
+    (4, "job-wachtrij (pipeline/jobs)", [
+        """CREATE TABLE IF NOT EXISTS jobs(
+            id TEXT PRIMARY KEY,
+            kind TEXT,
+            key TEXT,
+            status TEXT,
+            params_json TEXT,
+            result_json TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 0,
+            run_after REAL DEFAULT 0,
+            created_at TEXT,
+            started_at REAL,
+            finished_at REAL
+        )""",
+        # idempotentie: per (kind, key) maximaal één actieve of geslaagde job
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_kind_key_live ON jobs(kind, key) WHERE status IN ('queued', 'running', 'done')",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after)",
+    ]),
+    (5, "geocode-cache (vervangt geocache.json)", [
+        """CREATE TABLE IF NOT EXISTS geocodes(
+            key TEXT PRIMARY KEY,
+            query TEXT,
+            lat REAL,
+            lon REAL,
+            country_code TEXT,
+            address TEXT,
+            raw_json TEXT,
+            fetched_at REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_geocodes_fetched_at ON geocodes(fetched_at)",
+    ]),
+    (6, "afstanden: routecache + warehouse-tabel", [
+        """CREATE TABLE IF NOT EXISTS distances(
+            key TEXT PRIMARY KEY,
+            km REAL,
+            note TEXT,
+            computed_at REAL
+        )""",
+        """CREATE TABLE IF NOT EXISTS warehouse_distances(
+            wh TEXT,
+            place_key TEXT,
+            place TEXT,
+            kind TEXT,
+            lat REAL,
+            lon REAL,
+            km REAL,
+            note TEXT,
+            computed_at REAL,
+            PRIMARY KEY (wh, place_key)
+        )""",
+    ]),
+]
+
+def schema_version() -> int:
+    return _conn().execute("PRAGMA user_version").fetchone()[0]
+
+def migrate() -> int:
+    """Voer openstaande migraties uit, elk in een eigen transactie (BEGIN IMMEDIATE,
+    dus ook veilig als meerdere processen tegelijk starten). Geeft de nieuwe versie."""
+    c = _conn()
+    for version, _descr, stmts in MIGRATIONS:
+        if schema_version() >= version: continue
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if c.execute("PRAGMA user_version").fetchone()[0] < version:
+                for sql in stmts: c.execute(sql)
+                c.execute(f"PRAGMA user_version={int(version)}")
+            c.commit()
+        except Exception:
+            c.rollback(); raise
+    return schema_version()
 
 def insert_message(m):
     sender_email = None
@@ -76,7 +216,9 @@ def insert_message(m):
             aid = a.get('id') or str(uuid.uuid4())
             c.execute("INSERT OR REPLACE INTO attachments VALUES(?,?,?,?,?,?)",
                       (aid, m['id'], a.get('uri'), a.get('filename'), a.get('mimetype'), a.get('size') or 0))
+        c.execute(_SQL_EVENT, _event_row('message.ingested', {'message_id': m['id'], 'subject': m.get('subject'), 'sender_email': sender_email}))
         c.commit()
+    _notify()
 
 def get_message(mid):
     with _conn() as c:
@@ -97,20 +239,128 @@ def get_message(mid):
         'message_id': row[9]
     }
 
+_SQL_QUOTE = "INSERT INTO quotes VALUES(?,?,?,?,?)"
+_SQL_OPTION = "INSERT INTO quote_options(id, quote_id, mode, service, label, buy_total, sell_total, validity, pdf_path, review_required) VALUES(?,?,?,?,?,?,?,?,?,?)"
+_SQL_EVENT = "INSERT INTO events VALUES(?,?,?,?)"
+
+def _option_row(quote_id, opt: dict):
+    oid = 'opt_' + uuid.uuid4().hex[:10]
+    return (oid, quote_id, opt.get('mode'), opt.get('service'), opt.get('label'), float(opt.get('buy_total',0.0)), float(opt.get('sell_total',0.0)), opt.get('validity'), opt.get('pdf_path'), int(opt.get('review_required',0)))
+
+def _event_row(type_, payload):
+    return ('evt_' + uuid.uuid4().hex[:10], type_, json.dumps(payload), time.strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+_MSG_LIST_COLS = "SELECT id, source, sender_email, subject, ts FROM messages"
+
+def list_messages(limit=100, before=None):
+    """
+    Berichten nieuwste eerst (ts DESC, id DESC; zonder ts achteraan), keyset-gepagineerd
+    via index (ts, id). before = (ts, id) van de laatste rij van de vorige pagina.
+    Geeft (rijen, key van de laatste rij of None als er niets meer is).
+    """
+    c = _conn(); rows = []
+    if before is None or before[0] is not None:
+        if before is None:
+            rows = c.execute(_MSG_LIST_COLS + " WHERE ts IS NOT NULL ORDER BY ts DESC, id DESC LIMIT ?", (limit + 1,)).fetchall()
+        else:
+            rows = c.execute(_MSG_LIST_COLS + " WHERE ts IS NOT NULL AND (ts, id) < (?, ?) ORDER BY ts DESC, id DESC LIMIT ?", (before[0], before[1], limit + 1)).fetchall()
+    if len(rows) <= limit:   # staart: berichten zonder ts, op id
+        if before is not None and before[0] is None:
+            rows += c.execute(_MSG_LIST_COLS + " WHERE ts IS NULL AND id < ? ORDER BY id DESC LIMIT ?", (before[1], limit + 1 - len(rows))).fetchall()
+        else:
+            rows += c.execute(_MSG_LIST_COLS + " WHERE ts IS NULL ORDER BY id DESC LIMIT ?", (limit + 1 - len(rows),)).fetchall()
+    more = len(rows) > limit; rows = rows[:limit]
+    return rows, ((rows[-1][4], rows[-1][0]) if more and rows else None)
+
+def list_messages_offset(limit=100, offset=0):
+    """Verouderd (GET /messages?offset=): zelfde volgorde als list_messages, maar met OFFSET."""
+    return _conn().execute(_MSG_LIST_COLS + " ORDER BY ts IS NULL, ts DESC, id DESC LIMIT ? OFFSET ?",
+                           (int(limit), max(0, int(offset)))).fetchall()
+
+def messages_version() -> int:
+    """Volgnummer van de laatste wijziging aan messages (0 = nog niets gelogd)."""
+    return _conn().execute("SELECT COALESCE(MAX(seq), 0) FROM message_changes").fetchone()[0]
+
+def prune_message_changes(keep: int = 50000):
+    """Wijzigingslog inkorten tot de laatste `keep` regels (bij opstarten)."""
+    with _conn() as c:
+        c.execute("DELETE FROM message_changes WHERE seq <= (SELECT COALESCE(MAX(seq), 0) FROM message_changes) - ?", (int(keep),))
+
+def message_changes_floor() -> int:
+    """Laagste `since` waarvoor het log nog compleet is."""
+    return _conn().execute("SELECT COALESCE(MIN(seq), 1) - 1 FROM message_changes").fetchone()[0]
+
+def message_changes(since: int, limit: int = 1000):
+    """
+    Wijzigingen na volgnummer `since`, per bericht alleen de laatste:
+    (upserted rijen zoals list_messages, verwijderde ids, nieuw volgnummer).
+    Bij meer dan `limit` wijzigingen wordt tot en met de limit teruggegeven.
+    """
+    c = _conn()
+    log = c.execute("SELECT seq, message_id, op FROM message_changes WHERE seq > ? ORDER BY seq LIMIT ?", (int(since), int(limit))).fetchall()
+    last = {}
+    for seq, mid, op in log: last[mid] = op
+    up = [mid for mid, op in last.items() if op == "upsert"]
+    rows = []
+    for i in range(0, len(up), 500):
+        chunk = up[i:i + 500]
+        rows += c.execute(_MSG_LIST_COLS + f" WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY ts DESC, id DESC", chunk).fetchall()
+    found = {r[0] for r in rows}
+    deleted = [mid for mid, op in last.items() if op == "delete" or (op == "upsert" and mid not in found)]
+    return rows, deleted, (log[-1][0] if log else int(since))
+
 def new_quote(source_message_id, currency='EUR'):
     qid = 'q_' + uuid.uuid4().hex[:10]
     with _conn() as c:
-        c.execute("INSERT INTO quotes VALUES(?,?,?,?,?)", (qid, source_message_id, 'draft', currency, time.strftime('%Y-%m-%dT%H:%M:%SZ')))
+        c.execute(_SQL_QUOTE, (qid, source_message_id, 'draft', currency, time.strftime('%Y-%m-%dT%H:%M:%SZ')))
         c.commit()
     return qid
 
 def add_option(quote_id, opt: dict):
-    oid = 'opt_' + uuid.uuid4().hex[:10]
+    row = _option_row(quote_id, opt)
     with _conn() as c:
-        c.execute("INSERT INTO quote_options(id, quote_id, mode, service, label, buy_total, sell_total, validity, pdf_path, review_required) VALUES(?,?,?,?,?,?,?,?,?,?)",
-                  (oid, quote_id, opt.get('mode'), opt.get('service'), opt.get('label'), float(opt.get('buy_total',0.0)), float(opt.get('sell_total',0.0)), opt.get('validity'), opt.get('pdf_path'), int(opt.get('review_required',0))))
+        c.execute(_SQL_OPTION, row)
         c.commit()
-    return oid
+    return row[0]
+
+def save_quote(quote: dict, options=(), events=()):
+    """
+    Offerte + opties + events in één transactie (één commit). Alles of niets.
+    quote: {source_message_id|source_id, currency='EUR', status='priced'}
+    events: [(type, payload), ...]
+    Geeft de quote-id terug.
+    """
+    qid = quote.get('id') or 'q_' + uuid.uuid4().hex[:10]
+    qrow = (qid, quote.get('source_message_id') or quote.get('source_id'), quote.get('status') or 'priced',
+            quote.get('currency') or 'EUR', quote.get('created_at') or time.strftime('%Y-%m-%dT%H:%M:%SZ'))
+    orows = [_option_row(qid, o) for o in options or []]
+    erows = [_event_row(t, dict(p, quote_id=qid) if isinstance(p, dict) else p) for t, p in events or []]
+    with _conn() as c:   # commit bij succes, rollback bij een fout
+        c.execute(_SQL_QUOTE, qrow)
+        if orows: c.executemany(_SQL_OPTION, orows)
+        if erows: c.executemany(_SQL_EVENT, erows)
+    if erows: _notify()
+    return qid
+
+def save_quotes(items):
+    """
+    Veel offertes in één transactie (bulk-variant van save_quote, bv. /quote/batch).
+    items: [(quote, options, events), ...]; geeft de quote-ids in dezelfde volgorde.
+    """
+    qids, qrows, orows, erows = [], [], [], []
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ')
+    for quote, options, events in items:
+        qid = quote.get('id') or 'q_' + uuid.uuid4().hex[:10]; qids.append(qid)
+        qrows.append((qid, quote.get('source_message_id') or quote.get('source_id'), quote.get('status') or 'priced',
+                      quote.get('currency') or 'EUR', quote.get('created_at') or now))
+        orows.extend(_option_row(qid, o) for o in options or [])
+        erows.extend(_event_row(t, dict(p, quote_id=qid) if isinstance(p, dict) else p) for t, p in events or [])
+    with _conn() as c:   # commit bij succes, rollback bij een fout
+        if qrows: c.executemany(_SQL_QUOTE, qrows)
+        if orows: c.executemany(_SQL_OPTION, orows)
+        if erows: c.executemany(_SQL_EVENT, erows)
+    if erows: _notify()
+    return qids
 
 def set_quote_status(qid, status):
     with _conn() as c:
@@ -118,8 +368,182 @@ def set_quote_status(qid, status):
         c.commit()
 
 def log_event(type_, payload):
-    eid = 'evt_' + uuid.uuid4().hex[:10]
+    row = _event_row(type_, payload)
     with _conn() as c:
-        c.execute("INSERT INTO events VALUES(?,?,?,?)", (eid, type_, json.dumps(payload), time.strftime('%Y-%m-%dT%H:%M:%SZ')))
+        c.execute(_SQL_EVENT, row)
         c.commit()
-    return eid
+    _notify()
+    return row[0]
+
+# ---- event-abonnees (SSE): seintje na elke commit met events ----
+# De events-tabel blijft de bron (rowid = volgorde, ook voor Last-Event-ID);
+# een seintje maakt wachtende streams in dit proces direct wakker.
+_subscribers = set()
+
+def subscribe(cb):
+    with _pool_lock: _subscribers.add(cb)
+
+def unsubscribe(cb):
+    with _pool_lock: _subscribers.discard(cb)
+
+def _notify():
+    with _pool_lock: subs = list(_subscribers)
+    for cb in subs:
+        try: cb()
+        except Exception: pass
+
+def events_cursor() -> int:
+    return _conn().execute("SELECT COALESCE(MAX(rowid), 0) FROM events").fetchone()[0]
+
+def events_since(after: int, types=None, limit: int = 200):
+    """[(rowid, type, payload, created_at)] na rowid `after`, oudste eerst."""
+    sql = "SELECT rowid, type, payload_json, created_at FROM events WHERE rowid > ?"
+    args = [int(after)]
+    if types:
+        sql += f" AND type IN ({','.join('?' * len(types))})"; args += list(types)
+    rows = _conn().execute(sql + " ORDER BY rowid LIMIT ?", args + [int(limit)]).fetchall()
+    return [(r[0], r[1], json.loads(r[2]) if r[2] else None, r[3]) for r in rows]
+
+# ---- job-wachtrij (zie jobs.py) ----
+# status: queued → running → done | failed; 'superseded' = vervangen door een nieuwe run (force).
+_JOB_COLS = "id, kind, key, status, params_json, result_json, error, attempts, run_after, created_at, started_at, finished_at"
+
+def _job_dict(r):
+    if not r: return None
+    d = dict(zip([k.strip() for k in _JOB_COLS.split(",")], r))
+    d["params"] = json.loads(d.pop("params_json") or "null"); d["result"] = json.loads(d.pop("result_json") or "null")
+    return d
+
+def enqueue_job(kind, key, params, force=False):
+    """
+    Job in de wachtrij, idempotent per (kind, key): bestaat er al een queued/running/done job,
+    dan komt die terug (created=False). force=True vervangt een afgeronde job door een nieuwe run;
+    een job die nog loopt wordt nooit dubbel gestart. Geeft (job, created).
+    """
+    c = _conn()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        live = c.execute(f"SELECT {_JOB_COLS} FROM jobs WHERE kind=? AND key=? AND status IN ('queued','running','done')", (kind, key)).fetchone()
+        if live and (not force or live[3] != "done"):
+            c.commit(); return _job_dict(live), False
+        if live: c.execute("UPDATE jobs SET status='superseded' WHERE id=?", (live[0],))
+        jid = 'job_' + uuid.uuid4().hex[:12]
+        c.execute("INSERT INTO jobs(id, kind, key, status, params_json, created_at) VALUES(?,?,?,?,?,?)",
+                  (jid, kind, key, 'queued', json.dumps(params, ensure_ascii=False), time.strftime('%Y-%m-%dT%H:%M:%SZ')))
+        c.commit()
+    except Exception:
+        c.rollback(); raise
+    return get_job(jid), True
+
+def get_job(jid):
+    return _job_dict(_conn().execute(f"SELECT {_JOB_COLS} FROM jobs WHERE id=?", (jid,)).fetchone())
+
+# UPDATE … RETURNING bestaat pas vanaf SQLite 3.35 (Python 3.8 levert vaak een oudere mee)
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+def claim_job(kinds=None):
+    """Oudste uitvoerbare queued job atomair op 'running' zetten (ook tussen processen). None = niets te doen."""
+    sql = "SELECT id FROM jobs WHERE status='queued' AND run_after <= ?"
+    args = [time.time()]
+    if kinds:
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"; args += list(kinds)
+    sql += " ORDER BY run_after, created_at LIMIT 1"
+    if _HAS_RETURNING:
+        with _conn() as c:
+            r = c.execute(f"UPDATE jobs SET status='running', started_at=?, attempts=attempts+1 "
+                          f"WHERE id=({sql}) AND status='queued' RETURNING {_JOB_COLS}",
+                          [time.time()] + args).fetchone()
+        return _job_dict(r)
+    c = _conn()   # oudere SQLite: kiezen + bijwerken onder de schrijflock
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        row = c.execute(sql, args).fetchone()
+        if row:
+            c.execute("UPDATE jobs SET status='running', started_at=?, attempts=attempts+1 WHERE id=?", (time.time(), row[0]))
+            r = c.execute(f"SELECT {_JOB_COLS} FROM jobs WHERE id=?", (row[0],)).fetchone()
+        c.commit()
+    except Exception:
+        c.rollback(); raise
+    return _job_dict(r) if row else None
+
+def finish_job(jid, result=None, error=None, retry_at=None):
+    """Afronden: result → done, error → failed, retry_at (epoch) → terug in de wachtrij."""
+    with _conn() as c:
+        if retry_at is not None:
+            c.execute("UPDATE jobs SET status='queued', error=?, run_after=? WHERE id=?", (error, float(retry_at), jid))
+        else:
+            c.execute("UPDATE jobs SET status=?, result_json=?, error=?, finished_at=? WHERE id=?",
+                      ('failed' if error else 'done', json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), jid))
+
+def requeue_stale_jobs(older_than: float = 600.0) -> int:
+    """'running' jobs waarvan het proces is weggevallen (langer dan older_than s bezig) opnieuw inplannen."""
+    with _conn() as c:
+        return c.execute("UPDATE jobs SET status='queued', run_after=0 WHERE status='running' AND started_at < ?",
+                         (time.time() - older_than,)).rowcount
+
+def next_job_at(kinds=None):
+    """Vroegste run_after van queued jobs (epoch) of None."""
+    sql = "SELECT MIN(run_after) FROM jobs WHERE status='queued'"
+    args = []
+    if kinds:
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"; args = list(kinds)
+    return _conn().execute(sql, args).fetchone()[0]
+
+# ---- geocode-cache (zie geocode_cache.py; key = genormaliseerd adres) ----
+_GEO_COLS = "key, query, lat, lon, country_code, address, raw_json, fetched_at"
+
+def _geo_dict(r):
+    if not r: return None
+    d = dict(zip([k.strip() for k in _GEO_COLS.split(",")], r))
+    d["raw"] = json.loads(d.pop("raw_json") or "null") or {}
+    return d
+
+def geocode_get(key, min_fetched_at=None):
+    """Gecachte geocode of None; min_fetched_at (epoch) = oudere rijen tellen als verlopen."""
+    r = _conn().execute(f"SELECT {_GEO_COLS} FROM geocodes WHERE key=?", (key,)).fetchone()
+    if r and min_fetched_at is not None and (r[7] or 0) < min_fetched_at: return None
+    return _geo_dict(r)
+
+def geocode_put_many(rows, replace=True):
+    """rows: [{key, query, lat, lon, country_code, address, raw, fetched_at}]. replace=False laat bestaande staan."""
+    vals = [(g["key"], g.get("query"), float(g["lat"]), float(g["lon"]), g.get("country_code"), g.get("address"),
+             json.dumps(g.get("raw") or {}, ensure_ascii=False), float(g.get("fetched_at") or time.time())) for g in rows]
+    with _conn() as c:
+        c.executemany(f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO geocodes({_GEO_COLS}) VALUES(?,?,?,?,?,?,?,?)", vals)
+    return len(vals)
+
+def geocode_prune(older_than_ts: float) -> int:
+    with _conn() as c:
+        return c.execute("DELETE FROM geocodes WHERE fetched_at < ?", (float(older_than_ts),)).rowcount
+
+# ---- afstanden (zie distance_cache.py) ----
+def distance_get(key, min_computed_at=None):
+    """(km, note) of None; min_computed_at (epoch) = oudere regels tellen als verlopen."""
+    r = _conn().execute("SELECT km, note, computed_at FROM distances WHERE key=?", (key,)).fetchone()
+    if not r or (min_computed_at is not None and (r[2] or 0) < min_computed_at): return None
+    return r[0], r[1]
+
+def distance_put_many(rows):
+    """rows: [(key, km, note)]"""
+    now = time.time()
+    with _conn() as c:
+        c.executemany("INSERT OR REPLACE INTO distances(key, km, note, computed_at) VALUES(?,?,?,?)",
+                      [(k, float(km), note, now) for k, km, note in rows])
+
+_WH_COLS = "wh, place_key, place, kind, lat, lon, km, note, computed_at"
+
+def warehouse_distance_get(wh, place_key):
+    r = _conn().execute(f"SELECT {_WH_COLS} FROM warehouse_distances WHERE wh=? AND place_key=?", (wh, place_key)).fetchone()
+    return dict(zip([k.strip() for k in _WH_COLS.split(",")], r)) if r else None
+
+def warehouse_distances_replace(wh, rows):
+    """Warehouse-tabel voor `wh` vervangen (één transactie). rows: dicts met de kolommen van _WH_COLS."""
+    with _conn() as c:
+        c.execute("DELETE FROM warehouse_distances WHERE wh=?", (wh,))
+        c.executemany(f"INSERT OR REPLACE INTO warehouse_distances({_WH_COLS}) VALUES(?,?,?,?,?,?,?,?,?)",
+                      [(wh, r["place_key"], r["place"], r["kind"], r["lat"], r["lon"], r["km"], r["note"], r.get("computed_at") or time.time()) for r in rows])
+
+def warehouse_distances_list(wh):
+    rows = _conn().execute(f"SELECT {_WH_COLS} FROM warehouse_distances WHERE wh=? ORDER BY kind, km", (wh,)).fetchall()
+    cols = [k.strip() for k in _WH_COLS.split(",")]
+    return [dict(zip(cols, r)) for r in rows]
@@ -1,25 +1,85 @@
 # studio_adapter.py
 from __future__ import annotations
-import importlib.util, os, uuid, traceback
-from typing import Any, Dict, List
+import importlib.util, os, threading, time, uuid, traceback
+from typing import Any, Dict, List, Optional
 
 OUT_DIR = os.environ.get("OUT_DIR", "out")
 os.makedirs(OUT_DIR, exist_ok=True)
 
-def _import_studio():
+# Studio-module één keer laden (exec van ~4000 regels + tkinter/reportlab/geocache),
+# opnieuw alleen als het bestand wijzigt (mtime/size).
+_STUDIO: Dict[str, Any] = {"path": None, "sig": None, "mod": None, "loaded_at": None, "load_ms": None, "loads": 0}
+_STUDIO_LOCK = threading.Lock()
+
+def _studio_path() -> Optional[str]:
     path = os.environ.get("STUDIO_PATH", "Voerman_Quote_Studio_MQ26_P0PATCH.py")
     if not os.path.exists(path):
         for alt in [os.path.join(os.getcwd(), path), os.path.join(os.path.dirname(__file__), path)]:
             if os.path.exists(alt):
                 path = alt; break
-    if not os.path.exists(path):
-        return None
+    return os.path.abspath(path) if os.path.exists(path) else None
+
+def _load_studio(path: str):
     spec = importlib.util.spec_from_file_location("voerman_studio", path)
     mod = importlib.util.module_from_spec(spec)
     assert spec and spec.loader
     spec.loader.exec_module(mod)  # type: ignore
     return mod
 
+def _import_studio():
+    """Gecachte Studio-module; per aanroep alleen een os.stat()."""
+    path = _studio_path()
+    if not path:
+        return None
+    st = os.stat(path); sig = (st.st_mtime_ns, st.st_size)
+    if _STUDIO["mod"] is not None and _STUDIO["path"] == path and _STUDIO["sig"] == sig:
+        return _STUDIO["mod"]
+    with _STUDIO_LOCK:
+        if _STUDIO["mod"] is None or _STUDIO["path"] != path or _STUDIO["sig"] != sig:
+            t0 = time.perf_counter()
+            mod = _load_studio(path)
+            _STUDIO.update(path=path, sig=sig, mod=mod, loaded_at=time.time(),
+                           load_ms=round((time.perf_counter() - t0) * 1000, 1), loads=_STUDIO["loads"] + 1)
+        return _STUDIO["mod"]
+
+def studio_info() -> Dict[str, Any]:
+    """Status van de gecachte Studio-module."""
+    return {"path": _STUDIO["path"], "loaded": _STUDIO["mod"] is not None, "loads": _STUDIO["loads"], "load_ms": _STUDIO["load_ms"],
+            "loaded_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(_STUDIO["loaded_at"])) if _STUDIO["loaded_at"] else None}
+
+def warm_up() -> Dict[str, Any]:
+    """Studio vooraf laden (bij opstarten, zie STUDIO_WARMUP); fouten alleen loggen."""
+    try:
+        _import_studio()
+    except Exception:
+        traceback.print_exc()
+    return studio_info()
+
+def price_with_studio(inp, geo=None):
+    """Echte prijsberekening (engine/pricing_engine.py met de Studio-helpers).
+    Gooit PricingError/Exception; de aanroeper beslist over een fallback.
+    geo: context van geo_context() om geocodes te delen tussen aanroepen."""
+    studio = _import_studio()
+    if not studio or not hasattr(studio, "price_quote"):
+        raise RuntimeError("Studio (price_quote) niet gevonden")
+    return studio.price_quote(inp, geo) if geo is not None else studio.price_quote(inp)
+
+def geo_context():
+    """GeoContext voor één run (alle modes van een offerte, een batch); None zonder Studio."""
+    try:
+        studio = _import_studio()
+        return studio.new_geo_context() if studio and hasattr(studio, "new_geo_context") else None
+    except Exception:
+        return None
+
+def build_warehouse_distances(excel_path: Optional[str] = None) -> Dict[str, Any]:
+    """Warehouse-afstandstabel opbouwen met de Studio-helpers (distance_cache.build_warehouse_table)."""
+    studio = _import_studio()
+    if not studio or not hasattr(studio, "distance_between_coords"):
+        raise RuntimeError("Studio (distance_between_coords) niet gevonden")
+    import distance_cache
+    return distance_cache.build_warehouse_table(studio, excel_path)
+
 def _fallback_pdf(req_label: str, lines: List[Dict[str, Any]], brand: str) -> str:
     pdf = os.path.join(OUT_DIR, f"quote_{uuid.uuid4().hex[:8]}.pdf")
     try:
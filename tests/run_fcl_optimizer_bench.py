@@ -0,0 +1,73 @@
+import math, os, sys, time, importlib.util
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# Benchmark + gelijkheidscheck: choose_fcl_combo (scan, gememoiseerd per 0,1 cbm + tarieven)
+# tegen de ongecachte geneste lussen (_choose_fcl_combo_scan) op het exacte volume, en
+# fcl_combo_options (top-N) tegen een volledige opsomming.
+
+def _load_studio():
+    spec = importlib.util.spec_from_file_location("voerman_studio", os.path.join(ROOT, "Voerman_Quote_Studio_MQ26_P0PATCH.py"))
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+RATE_SETS = [
+    {"20FT": 1500.0, "40FT": 2000.0, "40HQ": 2100.0},
+    {"20FT": 1200.0, "40FT": 2600.0, "40HQ": 2650.0},
+    {"20FT": 1000.0, "40FT": 2000.0, "40HQ": 2233.33},
+    {"40FT": 1800.0, "40HQ": 2300.0},
+    {"20FT": 900.0},
+    {"40HQ": 2500.0},
+]
+import random
+random.seed(6)
+VOLUMES = [i / 2 for i in range(0, 1601)] + [round(random.uniform(0, 800), 3) for _ in range(800)]  # 0 .. 800 cbm
+
+print('[1/4] Load studio...')
+studio = _load_studio()
+
+print('[2/4] Compare memoised vs scan...')
+t_old = t_new = 0.0
+for rates in RATE_SETS:
+    for v in VOLUMES:
+        t = time.perf_counter(); a = studio._choose_fcl_combo_scan(v, rates); t_old += time.perf_counter() - t
+        t = time.perf_counter(); b = studio.choose_fcl_combo(v, rates); t_new += time.perf_counter() - t
+        assert a == b, f"mismatch {v} {rates}: scan={a} memo={b}"
+n = len(RATE_SETS) * len(VOLUMES)
+print(f'   {n} volumes identical (scan {t_old*1000:.0f} ms, memo cold {t_new*1000:.0f} ms)')
+# warm: één lane herhaald (quote opnieuw prijzen, container-keuze wisselen); past in de LRU
+rates = RATE_SETS[0]; studio._fcl_options_memo.cache_clear()
+for v in VOLUMES: studio.choose_fcl_combo(v, rates)
+t = time.perf_counter(); [studio._choose_fcl_combo_scan(v, rates) for v in VOLUMES]; t_old = time.perf_counter() - t
+t = time.perf_counter(); [studio.choose_fcl_combo(v, rates) for v in VOLUMES]; t_warm = time.perf_counter() - t
+print(f'   één lane, {len(VOLUMES)} volumes: scan {t_old*1000:.0f} ms, memo warm {t_warm*1000:.0f} ms  {studio._fcl_options_memo.cache_info()}')
+
+print('[3/4] Top-5 alternatieven tegen volledige opsomming...')
+import itertools
+CAP = studio.FCL_CAPACITY
+def _brute(v, rates, n):
+    types = [t for t in ("40HQ", "40FT", "20FT") if t in rates]
+    rng = {t: range(0, (math.ceil(v / CAP[t]) + 4) if t in types else 1) for t in ("40HQ", "40FT", "20FT")}
+    out = []
+    for hq, f40, f20 in itertools.product(rng["40HQ"], rng["40FT"], rng["20FT"]):
+        c = {"20FT": f20, "40FT": f40, "40HQ": hq}; total = sum(k * CAP[t] for t, k in c.items())
+        if total < v - 1e-9 or any(total - CAP[t] >= v - 1e-9 for t, k in c.items() if k): continue
+        out.append(round(sum(k * rates.get(t, 0.0) for t, k in c.items()), 6))
+    return sorted(out)[:n]
+checked = 0
+for rates in RATE_SETS:
+    for v in [i / 2 for i in range(0, 401)]:
+        opts = studio.fcl_combo_options(v, rates, 5)
+        assert opts[0][1] == studio._choose_fcl_combo_scan(v, rates), (v, rates)
+        assert [round(c, 6) for c, _ in opts] == _brute(v, rates, 5), (v, rates, opts, _brute(v, rates, 5))
+        assert len({tuple(sorted(c.items())) for _, c in opts}) == len(opts)
+        checked += 1
+print(f'   {checked} volumes: top-5 kosten gelijk aan de opsomming, eerste = scan; bv. 130 cbm {studio.fcl_combo_options(130, RATE_SETS[0], 3)}')
+
+print('[4/4] Large moves...')
+rates = RATE_SETS[0]
+for v in (1000.0, 2500.0, 5000.0):
+    t = time.perf_counter(); best = studio._choose_fcl_combo_scan(v, rates); ts = time.perf_counter() - t
+    assert studio.choose_fcl_combo(v, rates) == best
+    print(f'   {v:>6.0f} cbm: scan {ts*1000:7.1f} ms, best {best}')
+print(f'OK — memoised choose_fcl_combo matches the scan ({t_old*1000:.0f} ms scan vs {t_warm*1000:.0f} ms warm)')
@@ -0,0 +1,50 @@
+import os, sys, time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# Offline land-index (engine/gazetteer.py): vaste gevallen, dubbelzinnige adressen
+# (moeten None geven → geocoder) en snelheid per lookup.
+
+from engine.gazetteer import resolve_country
+
+CASES = {
+    "Nootdorp, Netherlands": "nl", "Nootdorp": "nl", "2631 AB Nootdorp": "nl", "Den Haag": "nl", "'s-Hertogenbosch": "nl",
+    "Amsterdam NL": "nl", "Amsterdam, NL": "nl", "Vinkeveen, Nederland": "nl", "Kerkstraat 1, 1234 AB Vinkeveen": "nl",
+    "the Netherlands": "nl", "Holland": "nl", "Groningen, Nederland": "nl",
+    "Brussel, België": "be", "Berlin, DE": "de", "Berlin": "de", "Köln": "de", "Deutschland": "de", "Zürich, Schweiz": "ch",
+    "Paris": "fr", "Paris, France": "fr", "Rue de la Paix 5, 75002 Paris": "fr", "España": "es", "Valencia, Spain": "es",
+    "Lisboa, Portugal": "pt", "00-001 Warszawa": "pl",
+    "London": "gb", "SW1A 1AA London": "gb", "Cambridge, UK": "gb", "Holland Park, London, UK": "gb",
+    "Houston, US": "us", "Houston, TX": "us", "Atlanta, GA": "us", "Atlanta, Georgia": "us", "Paris, Texas": "us",
+    "Cambridge, MA": "us", "New York, NY 10001": "us",
+    "London, Ontario": "ca", "Montreal": "ca", "H3Z 2Y7 Montréal": "ca", "Toronto, CA": "ca", "Montreal, Canada": "ca",
+    "Sydney NSW": "au", "Nairobi": "ke", "Dubai, UAE": "ae",
+    # US-plaatsen met een Europese naam: deelstaat(code) of ZIP wint niet van de plaats, maar geeft ook geen Europees land
+    "Zwolle, PA": None, "Berlin, CT": None, "Hamburg, NY": None, "Amsterdam, NY": None, "Rotterdam, NY 12303": None,
+    "Rotterdam NY 12303": None, "Holland, Michigan": None, "Holland, MI": None, "Amsterdam, Michigan": None,
+    "Los Angeles, CA": "us", "Springfield, OH": "us", "Springfield, IL": None, "Albany, NY 12207": "us", "Houston TX": "us", "Victoria, Canada": "ca",
+    "Berlin, Germany, DE": "de",
+    # landnaam in een straat- of plaatsnaam is geen bewijs
+    "Canada Square 1, London": "gb", "Holland Park, London": "gb", "Jersey City": None, "Chad Street 12": None, "India Street 4": None,
+    "Ontario Street 5, London": None, "Texas Avenue 3, Paris": None,
+    # dubbelzinnig of onbekend: geocoder beslist
+    "Cambridge": None, "Valencia": None, "Lagos": None, "Tbilisi, Georgia": None, "Some Street 5": None,
+}
+
+print('[1/3] Index bouwen...')
+t = time.perf_counter(); resolve_country("")
+print(f'   {(time.perf_counter() - t) * 1000:.0f} ms')
+
+print(f'[2/3] {len(CASES)} vaste gevallen...')
+bad = [(a, (resolve_country(a) or (None,))[0], want) for a, want in CASES.items() if (resolve_country(a) or (None,))[0] != want]
+assert not bad, bad
+assert resolve_country("Houston, US") == ("us", "United States")
+assert resolve_country("Nootdorp", {"holland": "netherlands"})[0] == "nl"
+print('   all match')
+
+print('[3/3] Snelheid...')
+t = time.perf_counter(); n = 0
+for _ in range(50):
+    for a in CASES: resolve_country(a); n += 1
+us = (time.perf_counter() - t) / n * 1e6
+print(f'OK — {len(CASES)} cases, {us:.0f} µs per lookup (geocoder: ~1 s round-trip)')
@@ -0,0 +1,88 @@
+import os, sys, csv, time, tempfile, asyncio
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# Batch-geocoder zonder netwerk: FileProvider (CSV) met gesimuleerde latency.
+# Vergelijkt één-voor-één (zoals geocode_raw) met geocode_batch (dedup + gelijktijdig
+# binnen de token bucket) en controleert retries en cache-hits.
+
+N = int(os.environ.get("BENCH_N", "200"))
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+RATE = float(os.environ.get("BENCH_RATE", "50"))
+
+tmp = tempfile.mkdtemp()
+os.environ["DB_PATH"] = os.path.join(tmp, "geo.db")
+import geocoder, geocode_cache
+
+gaz = os.path.join(tmp, "gazetteer.csv")
+with open(gaz, "w", encoding="utf-8", newline="") as f:
+    w = csv.writer(f); w.writerow(["address", "lat", "lon", "country_code", "country"])
+    for i in range(N): w.writerow([f"Straat {i}, Plaats {i % 37}", 52 + i / 1e4, 4 + i / 1e4, "nl", "Netherlands"])
+# tender: elk adres twee keer (andere schrijfwijze) + 10 onbekende
+tender = [f"Straat {i}, Plaats {i % 37}" for i in range(N)] + [f"  straat {i} ,plaats {i % 37} " for i in range(N)] + [f"Nergens {i}" for i in range(10)]
+
+class Flaky(geocoder.FileProvider):
+    """Eerste poging per adres faalt (tijdelijke fout)."""
+    def __init__(self, *a, **kw): super().__init__(*a, **kw); self.calls = 0; self.seen = set()
+    async def lookup(self, q):
+        self.calls += 1
+        if q not in self.seen:
+            self.seen.add(q); raise TimeoutError("tijdelijk")
+        return await super().lookup(q)
+
+print('[1/5] Retries + dedup (flaky provider, 20 adressen)...')
+p = Flaky(gaz)
+r = geocoder.geocode_batch(tender[:20] + tender[N:N + 20], p, rate=0, concurrency=8, retries=3, use_cache=False)
+assert r.unique == 20 and r.fetched == 20 and p.calls == 40 and r.failed == 0, r.summary()
+assert all(v is not None for v in r.results.values())
+print(f'   {r.summary()}')
+
+print(f'[2/5] {len(tender)} adressen, provider-latency {LATENCY * 1000:.0f} ms, rate {RATE:g}/s...')
+p = geocoder.FileProvider(gaz, latency=LATENCY)
+t = time.perf_counter()
+serial = {}
+async def _serial():
+    for a in dict.fromkeys(tender): serial[a] = await p.lookup(a)   # één voor één, wel al ontdubbeld op exacte tekst
+asyncio.run(_serial())
+t_serial = time.perf_counter() - t
+r = geocoder.geocode_batch(tender, p, rate=RATE, burst=5, concurrency=16)
+assert r.unique == N + 10 and r.fetched == N and r.not_found == 10 and r.cache_hits == 0, r.summary()
+for a, e in r.results.items():
+    s = serial[a]
+    assert (e is None) == (s is None) and (e is None or (e["lat"], e["lon"]) == (s["lat"], s["lon"])), a
+print(f'   serial {len(serial) / t_serial:,.0f} addr/s   batch {len(tender) / r.seconds:,.0f} addr/s   {r.summary()}')
+
+print('[3/5] Tweede run: alles uit de cache...')
+geocode_cache._LRU.clear()
+r2 = geocoder.geocode_batch(tender, p, rate=RATE)
+assert r2.cache_hits == N and r2.fetched == 0 and r2.not_found == 10, r2.summary()
+print(f'   {r2.summary()}')
+print('[4/5] Twee batches tegelijk (elk in een eigen thread/loop) delen één bucket per provider...')
+import threading
+p2 = geocoder.FileProvider(gaz); half = [f"Straat {i}, Plaats {i % 37}" for i in range(40)]
+out = []
+def _batch(addrs): out.append(geocoder.geocode_batch(addrs, p2, rate=20, burst=1, concurrency=8, use_cache=False))
+t = time.perf_counter()
+ts = [threading.Thread(target=_batch, args=(half[j::2],)) for j in range(2)]
+for th in ts: th.start()
+for th in ts: th.join()
+t_shared = time.perf_counter() - t
+assert sum(x.fetched for x in out) == 40 and t_shared >= 39 / 20 * 0.95, (t_shared, [x.summary() for x in out])
+assert geocoder.bucket_for(p2, 20, 1) is geocoder.bucket_for(geocoder.FileProvider(gaz), 20, 1)
+print(f'   40 lookups in 2 batches: {t_shared:.2f} s bij 20/s (per batch een eigen bucket zou ~1 s zijn)')
+
+print('[5/5] HTTP: kleine batch direct, grote batch als job...')
+os.environ.update(GEOCODE_PROVIDER=f"file:{gaz}", GEOCODE_RATE="0", PIPELINE_WORKERS="1", JOB_POLL_SECONDS="0.1", STUDIO_WARMUP="0", OUT_DIR=tmp)
+from fastapi.testclient import TestClient
+import app as app_module
+with TestClient(app_module.app) as client:
+    small = client.post("/geocode/batch", json={"addresses": tender[:5]})
+    assert small.status_code == 200 and small.json()["addresses"] == 5, small.text
+    big = client.post("/geocode/batch", json={"addresses": tender[:60]})
+    assert big.status_code == 202 and big.headers["location"] == f"/pipeline/jobs/{big.json()['id']}", big.text
+    again = client.post("/geocode/batch", json={"addresses": tender[:60]})
+    assert again.status_code == 200 and again.json()["id"] == big.json()["id"], again.text
+    job = client.get(f"/pipeline/jobs/{big.json()['id']}?wait=20").json()
+    assert job["status"] == "done" and job["result"]["addresses"] == 60 and job["result"]["results"][tender[0]]["lat"], job
+print(f'   5 adressen → 200; 60 adressen → 202 job {job["id"]} ({job["status"]}, {job["result"]["unique"]} uniek)')
+print(f'OK — batch {len(tender) / r.seconds:,.0f} addr/s vs serial {len(serial) / t_serial:,.0f} addr/s; rerun {r2.seconds * 1000:.0f} ms')
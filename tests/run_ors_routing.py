@@ -0,0 +1,120 @@
+import os, sys, json, math, time, tempfile, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# ORS-client tegen een lokale mock (geen netwerk, geen API-key): keep-alive via de
+# gedeelde Session, gelijktijdige routes van één ROAD-offerte, en de matrix in blokken.
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+
+
+def _km(a, b):   # a, b = [lon, lat]; haversine × 1.2 als "route"
+    lo1, la1, lo2, la2 = map(math.radians, (*a, *b))
+    h = math.sin((la2 - la1) / 2) ** 2 + math.cos(la1) * math.cos(la2) * math.sin((lo2 - lo1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h)) * 1.2
+
+
+class OrsMock(BaseHTTPRequestHandler):
+    """Lokale stand-in voor /v2/directions/{profile} (geojson) en /v2/matrix/{profile}."""
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True   # anders wacht elk antwoord op een keep-alive socket ~40 ms op delayed ACK
+    stats = {"connections": 0, "directions": 0, "matrix": 0, "max_matrix_locations": 0}
+    fail = False   # True: elk antwoord 503 (ORS onbereikbaar/overbelast)
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock: self.stats["connections"] += 1
+
+    def log_message(self, *a): pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        time.sleep(LATENCY)
+        if self.path.startswith("/v2/directions/"):
+            with self.lock: self.stats["directions"] += self.fail
+        if self.fail:
+            self.send_response(503); self.send_header("Content-Length", "0"); self.end_headers(); return
+        if self.path.startswith("/v2/directions/"):
+            a, b = body["coordinates"]
+            out = {"features": [{"properties": {"segments": [{"distance": _km(a, b) * 1000}]}}]}
+            with self.lock: self.stats["directions"] += 1
+        elif self.path.startswith("/v2/matrix/"):
+            loc = body["locations"]
+            out = {"distances": [[round(_km(loc[i], loc[j]), 2) for j in body["destinations"]] for i in body["sources"]]}
+            with self.lock:
+                self.stats["matrix"] += 1; self.stats["max_matrix_locations"] = max(self.stats["max_matrix_locations"], len(loc))
+        else:
+            self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers(); return
+        data = json.dumps(out).encode()
+        self.send_response(200); self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data))); self.end_headers(); self.wfile.write(data)
+
+
+srv = ThreadingHTTPServer(("127.0.0.1", 0), OrsMock); srv.daemon_threads = True
+threading.Thread(target=srv.serve_forever, daemon=True).start()
+BASE = f"http://127.0.0.1:{srv.server_port}"
+os.environ.update(ORS_BASE_URL=BASE, ORS_API_KEY="test-key", ORS_MATRIX_MAX_LOCATIONS="50",
+                  DB_PATH=os.path.join(tempfile.mkdtemp(), "ors.db"))
+import requests, routing
+
+def _reset():
+    with OrsMock.lock:
+        for k in OrsMock.stats: OrsMock.stats[k] = 0
+
+WH = (52.051, 4.396)
+PTS = [(51.5 + i * 0.013, 3.9 + i * 0.021) for i in range(120)]
+
+print('[1/5] 40 routes na elkaar: losse requests.post vs gedeelde Session...')
+_reset(); t = time.perf_counter()
+for p in PTS[:40]:
+    r = requests.post(f"{BASE}/v2/directions/driving-car", json={"coordinates": [[p[1], p[0]], [WH[1], WH[0]]]},
+                      headers={"Authorization": "test-key"}, timeout=20)
+    assert r.status_code == 200
+t_bare = time.perf_counter() - t; conn_bare = OrsMock.stats["connections"]
+_reset(); c = routing.get_client(); t = time.perf_counter()
+kms = [c.route_km(p, WH) for p in PTS[:40]]
+t_pool = time.perf_counter() - t; conn_pool = OrsMock.stats["connections"]
+assert all(k and k > 0 for k in kms) and conn_bare == 40 and conn_pool == 1, (conn_bare, conn_pool)
+print(f'   bare {conn_bare} verbindingen {t_bare * 1000:.0f} ms   pool {conn_pool} verbinding {t_pool * 1000:.0f} ms')
+
+print('[2/5] Drie legs van één ROAD-offerte (origin→wh, dest→wh, origin→dest)...')
+o, d = (52.09, 5.12), (52.52, 13.40)
+legs = [(o, WH), (d, WH), (o, d)]
+t = time.perf_counter(); serial = [c.route_km(a, b) for a, b in legs]; t_serial = time.perf_counter() - t
+t = time.perf_counter(); conc = c.routes(legs); t_conc = time.perf_counter() - t
+assert serial == conc, (serial, conc)
+print(f'   na elkaar {t_serial * 1000:.0f} ms   gelijktijdig {t_conc * 1000:.0f} ms')
+
+print(f'[3/5] Matrix: warehouse → {len(PTS)} punten (max 50 locaties per request)...')
+_reset(); t = time.perf_counter()
+row = c.matrix_km([WH], PTS)[0]; t_matrix = time.perf_counter() - t
+assert OrsMock.stats["matrix"] == 3 and OrsMock.stats["max_matrix_locations"] <= 50, OrsMock.stats
+for p, km in zip(PTS, row):
+    assert abs(km - _km([WH[1], WH[0]], [p[1], p[0]])) < 0.01
+print(f'   {OrsMock.stats["matrix"]} requests {t_matrix * 1000:.0f} ms (route per punt: ~{len(PTS) * t_pool / 40 * 1000:.0f} ms)')
+
+print('[4/5] Studio: ROAD-offerte Utrecht → Berlin, routes via prefetch...')
+import geocode_cache, studio_adapter
+from engine.pricing_engine import QuoteInput
+geocode_cache.put("Utrecht", *o, raw={"address": {"country_code": "nl", "country": "Netherlands"}})
+geocode_cache.put("Berlin", *d, raw={"address": {"country_code": "de", "country": "Germany"}})
+st = studio_adapter._import_studio()
+assert st.ORS_API_KEY == "test-key"
+inp = QuoteInput(mode="ROAD", origin="Utrecht", destination="Berlin", volume_cbm=30,
+                 excel_path=os.path.join(ROOT, "tarieven.xlsx"))
+_reset(); geo = st.new_geo_context(); t = time.perf_counter()
+res = st.price_quote(inp, geo); t_quote = time.perf_counter() - t
+assert OrsMock.stats["directions"] == 3 and geo.stats()["prefetched"] == 3, (OrsMock.stats, geo.stats())
+assert res.origin_km_note == "OpenRouteService (route)" and abs(res.origin_km - _km([o[1], o[0]], [WH[1], WH[0]])) < 0.01
+_reset(); res2 = st.price_quote(inp, st.new_geo_context())   # tweede keer: routecache
+assert OrsMock.stats["directions"] == 0 and res2.total == res.total
+print(f'   {t_quote * 1000:.0f} ms voor 3 routes à {LATENCY * 1000:.0f} ms; herhaling 0 requests; totaal {res.total:.2f}')
+print('[5/5] ORS faalt: mislukte paren geschat, niet nog eens serieel opgevraagd...')
+pairs = [((51.0 + i * 0.1, 5.0), WH) for i in range(6)]
+_reset(); OrsMock.fail = True
+est = st.distances_between_coords_many(pairs); OrsMock.fail = False
+assert OrsMock.stats["directions"] == len(pairs) and all(note == "Geodesic × 1.25 (approx.)" for _, note in est), (OrsMock.stats, est)
+print(f'   {len(pairs)} paren → {OrsMock.stats["directions"]} requests, allemaal geodesisch')
+print(f'OK — keep-alive {conn_bare}→{conn_pool} verbindingen, legs {t_serial / t_conc:.1f}x sneller, matrix {len(PTS)} punten in 3 requests')
@@ -0,0 +1,90 @@
+import os, sys, time, signal, tempfile
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# PDF-renderservice: volle wachtrij (QueueFull, ook als 503 via de API), herstart van
+# de pool na een gecrashte worker, shutdown met renders in de wachtrij, en de metrics.
+# Ook op Python 3.8 draaien (daar bestaat shutdown(cancel_futures=...) niet).
+
+def _kw(i):
+    return dict(brand="Voerman", services=["origin", "freight", "destination"], mode="LCL", total_cbm=10 + i,
+                origin_label="Utrecht", dest_label="Berlin", req_label=f"LCL {i}",
+                priced_lines=[{"descr": "Freight", "qty": "1", "rate": "€ 100,00", "amount": 100.0 + i}])
+
+if __name__ == "__main__":   # spawn-workers importeren dit bestand opnieuw
+    tmp = tempfile.mkdtemp()
+    os.environ.update(DB_PATH=os.path.join(tmp, "pdf.db"), OUT_DIR=tmp, STUDIO_WARMUP="0", PIPELINE_WORKERS="0")
+    import pdf_service, storage
+
+    print('[1/5] Wachtrij van 1, tweede render terwijl de eerste loopt → QueueFull...')
+    svc = pdf_service.RenderService(workers=1, queue_max=1, queue_timeout=0.2)
+    first = svc.submit(**_kw(0))   # eerste render start ook de worker (Studio laden): ruim langer dan 0,2 s
+    t = time.perf_counter()
+    try:
+        svc.submit(**_kw(1)); raise AssertionError("verwacht QueueFull")
+    except pdf_service.QueueFull as e:
+        waited = time.perf_counter() - t; reason = str(e)
+    assert 0.15 <= waited < 2 and os.path.getsize(first.result(timeout=120)) > 0, waited
+    assert os.path.getsize(svc.submit(**_kw(2)).result(timeout=60)) > 0   # slot weer vrij
+    print(f'   QueueFull na {waited * 1000:.0f} ms ({reason}); daarna weer plaats')
+
+    print('[2/5] Worker gekilld tijdens een render → BrokenProcessPool, pool opnieuw gestart...')
+    crash = pdf_service.RenderService(workers=1, queue_max=4, queue_timeout=5)
+    crash.warm_up(); old_pids = set(crash._pool._processes)
+    futs = [crash.submit(**_kw(i)) for i in range(3)]
+    for pid in old_pids: os.kill(pid, signal.SIGKILL)
+    errors = 0
+    for f in futs:
+        try: f.result(timeout=60)
+        except pdf_service.BrokenProcessPool: errors += 1
+    after = crash.submit(**_kw(9)).result(timeout=120)
+    new_pids = set(crash._pool._processes)
+    assert errors >= 1 and crash.metrics()["pool_restarts"] == 1 and os.path.getsize(after) > 0, (errors, crash.metrics())
+    assert not (old_pids & new_pids), (old_pids, new_pids)
+    print(f'   {errors} render(s) mislukt, pool_restarts=1, nieuwe worker {sorted(new_pids)}')
+
+    print('[3/5] Metrics...')
+    m, mc = svc.metrics(), crash.metrics()
+    assert (m["submitted"], m["completed"], m["failed"], m["rejected"], m["pending"]) == (2, 2, 0, 1, 0), m
+    assert (mc["submitted"], mc["failed"], mc["completed"], mc["pending"]) == (4, errors, 4 - errors, 0), mc
+    assert m["started"] and m["latency_ms"]["p50"] is not None and m["render_ms"]["p50"] is not None, m
+    print(f'   wachtrij: submitted {m["submitted"]} rejected {m["rejected"]} latency p50 {m["latency_ms"]["p50"]} ms '
+          f'render p50 {m["render_ms"]["p50"]} ms   crash: failed {mc["failed"]} pool_restarts {mc["pool_restarts"]}')
+
+    print('[4/5] Shutdown met renders in de wachtrij: afgerond of geannuleerd, slots vrij...')
+    crash.shutdown()
+    stop = pdf_service.RenderService(workers=1, queue_max=20, queue_timeout=5)
+    stop.warm_up()
+    queued = [stop.submit(**_kw(i)) for i in range(20)]
+    stop.shutdown()
+    outcome = {"done": 0, "cancelled": 0}
+    for f in queued:
+        try: f.result(timeout=30); outcome["done"] += 1
+        except pdf_service.CancelledError: outcome["cancelled"] += 1
+    ms = stop.metrics()
+    # 3.9+: wachtende renders geannuleerd; 3.8 (geen cancel_futures): shutdown maakt ze af
+    assert (outcome["cancelled"] >= 1 if sys.version_info >= (3, 9) else outcome["done"] == 20), outcome
+    assert sum(outcome.values()) == 20 and ms["pending"] == 0, (outcome, ms)
+    assert all(stop._slots.acquire(timeout=0) for _ in range(20)), "slots niet vrijgegeven"
+    print(f'   {outcome["done"]} klaar, {outcome["cancelled"]} geannuleerd; pending 0')
+    svc.shutdown()
+
+    print('[5/5] HTTP: /pipeline/generate met volle wachtrij → 503...')
+    if sys.version_info < (3, 9):   # app/routers gebruiken list[str] e.d.: de API zelf draait pas vanaf 3.9
+        print('   overgeslagen op Python < 3.9')
+    else:
+        from fastapi.testclient import TestClient
+        import app as app_module
+        storage.init_db()
+        storage.insert_message({'id': 'umsg_pdf', 'source': 'web', 'sender': {'email': 'customer@example.com'},
+                                'subject': 'Verhuizing Utrecht naar Berlin', 'body': 'Graag prijs voor 12.5 m3.', 'language': 'nl'})
+        full = pdf_service._SERVICE = pdf_service.RenderService(workers=0, queue_max=1, queue_timeout=0.05)
+        full._slots.acquire()   # één render "in behandeling"
+        with TestClient(app_module.app) as client:
+            r = client.post("/pipeline/generate", json={"message_id": "umsg_pdf"})
+            assert r.status_code == 503 and "PDF-wachtrij vol" in r.json()["detail"], (r.status_code, r.text)
+            full._slots.release()
+            ok = client.post("/pipeline/generate", json={"message_id": "umsg_pdf"})
+            assert ok.status_code == 200 and ok.json()["attachments"], ok.text
+            print(f'   vol: {r.status_code} {r.json()["detail"]!r}; vrij: {ok.status_code} met {len(ok.json()["attachments"])} PDF(s)')
+    print(f'OK — Python {sys.version.split()[0]}: QueueFull na {waited * 1000:.0f} ms, pool herstart na crash, shutdown ruimt de wachtrij op, metrics kloppen')
@@ -0,0 +1,60 @@
+import os, sys, time, tempfile, importlib.util
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# Benchmark: maak_pdf_voerman_style met en zonder render-template cache
+# (PDF_TEMPLATE_CACHE). Met reportlab "invariant" zijn PDF's zonder logo byte-gelijk;
+# met logo verschilt alleen de naam van de image-XObject (bestandsnaam vs. inhoud).
+
+N = int(os.environ.get("BENCH_N", "1000"))
+
+def _load_studio():
+    spec = importlib.util.spec_from_file_location("voerman_studio", os.path.join(ROOT, "Voerman_Quote_Studio_MQ26_P0PATCH.py"))
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+def _rows(i):
+    rows = [{"descr": "Origin services", "qty": f"{10 + i % 40:.2f} m³", "rate": "€ 45,00 / m³", "amount": 450.0 + i},
+            {"descr": "Ocean freight (LCL)", "qty": f"{10 + i % 40:.2f} m³", "rate": "€ 60,00 / m³", "amount": 600.0 + i}]
+    if i % 3: rows.append({"descr": "Destination services", "qty": "1", "rate": "€ 350,00", "amount": 350.0})
+    return rows
+
+def _render(studio, path, i, logo):
+    studio.maak_pdf_voerman_style(
+        save_path=path, charges_rows=_rows(i), client_name=f"Client {i}", job_mode="LCL",
+        origin_addr="Nootdorp, NL", dest_addr="Houston, US", volume_cbm=10 + i % 40, logo_path=logo,
+        dest_only_rows=[{"descr": "DTHC", "qty": "1", "rate": "€ 150,00", "amount": 150.0}] if i % 5 == 0 else None,
+        show_rates=bool(i % 2), show_vat=(i % 7 == 0), vat_applies=True,
+        company_name="Voerman International B.V." if i % 2 else "Transpack B.V.")
+
+print('[1/3] Load studio + test logo...')
+studio = _load_studio()
+from reportlab import rl_config
+rl_config.invariant = 1
+tmp = tempfile.mkdtemp()
+logo = os.path.join(tmp, "VOERMAN.png")
+from PIL import Image as _PIL
+_PIL.new("RGB", (600, 200), (0, 70, 140)).save(logo)
+
+print('[2/3] Compare output cached vs uncached...')
+import re
+def _strip(data): return re.sub(rb"FormXob\.[0-9a-f]+", b"FormXob", data)
+for i in range(20):
+    for lg in (None, logo):
+        a, b = os.path.join(tmp, "a.pdf"), os.path.join(tmp, "b.pdf")
+        studio.PDF_TEMPLATE_CACHE = False; _render(studio, a, i, lg)
+        studio.PDF_TEMPLATE_CACHE = True;  _render(studio, b, i, lg)
+        da, db = open(a, "rb").read(), open(b, "rb").read()
+        assert (da == db) if lg is None else (_strip(da) == _strip(db)), f"PDF {i} differs (logo={bool(lg)})"
+print('   40 PDFs identical')
+
+print(f'[3/3] Render {N} quotes...')
+res = {}
+for cached in (False, True):
+    studio.PDF_TEMPLATE_CACHE = cached; studio._PDF_TEMPLATES.clear()
+    path = os.path.join(tmp, "q.pdf")
+    t = time.perf_counter()
+    for i in range(N): _render(studio, path, i, logo)
+    res[cached] = (time.perf_counter() - t) / N * 1000
+    print(f'   {"cached  " if cached else "uncached"}: {res[cached]:.2f} ms/PDF')
+print(f'OK — template cache saves {res[False] - res[True]:.2f} ms/PDF ({(1 - res[True] / res[False]) * 100:.0f}%)')
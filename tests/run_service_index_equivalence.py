@@ -0,0 +1,79 @@
+import os, sys, time, math, importlib.util
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# Vergelijkt de service-index (match_service_rij / match_service_rij_strict_op)
+# met de oude boolean-mask scans, voor elke rij in tarieven.xlsx over een grid
+# van afstanden en volumes rond de bandgrenzen.
+
+EXCEL = os.environ.get("PRICING_EXCEL_PATH", os.path.join(ROOT, "tarieven.xlsx"))
+
+def _load_studio():
+    spec = importlib.util.spec_from_file_location("voerman_studio", os.path.join(ROOT, "Voerman_Quote_Studio_MQ26_P0PATCH.py"))
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+def _outcome(fn, df, p):
+    try:
+        r = fn(df, p)
+        return ("row", r.name, tuple(str(v) for v in r.tolist()))
+    except LookupError as e:
+        return ("lookup", str(e))
+
+def _points(lo, hi):
+    pts = {0.0, 1e6}
+    for v in (lo, hi):
+        if v is None or (isinstance(v, float) and math.isnan(v)): continue
+        pts.update({v, v - 0.01})
+    if all(isinstance(v, (int, float)) and math.isfinite(v) for v in (lo, hi)):
+        pts.add((lo + hi) / 2.0)
+    return sorted(p for p in pts if p >= 0)
+
+print('[1/3] Load studio + services sheet...')
+studio = _load_studio()
+C = studio.COLS
+df = studio.lees_services_sheet(EXCEL, studio.SERVICES_SHEET)
+print('   rows:', len(df))
+
+print('[2/3] Compare index vs scan...')
+pairs = [
+    (studio.match_service_rij, studio._match_service_rij_scan),
+    (studio.match_service_rij_strict_op, studio._match_service_rij_strict_op_scan),
+]
+checked = 0; t_new = t_old = 0.0
+keys = set(); seen = set()
+for _, row in df.iterrows():
+    op, typ, mode = row[C["operation"]], row[C["type"]], row[C["mode"]]
+    keys.add((op, typ, mode))
+    for dist in _points(row[C["d_start"]], row[C["d_end"]]):
+        for vol in _points(row[C["v_min"]], row[C["v_max"]]):
+            if (op, typ, mode, dist, vol) in seen: continue
+            seen.add((op, typ, mode, dist, vol))
+            p = studio.LineParams("x", typ, op, mode, vol, dist)
+            for new, old in pairs:
+                t = time.perf_counter(); a = _outcome(new, df, p); t_new += time.perf_counter() - t
+                t = time.perf_counter(); b = _outcome(old, df, p); t_old += time.perf_counter() - t
+                assert a == b, f"mismatch {new.__name__} {p}: {a} != {b}"
+                checked += 1
+# spelling-varianten en onbekende plaatsen (fallback-cascade)
+for op, typ, mode in sorted(keys):
+    for op_in in (op.upper() + "  ", " " + op.lower(), "Onbekende Plaats"):
+        for dist in (0.0, 250.0, 5000.0):
+            for vol in (0.5, 25.0):
+                p = studio.LineParams("x", typ.upper(), op_in, mode.lower(), vol, dist)
+                for new, old in pairs:
+                    assert _outcome(new, df, p) == _outcome(old, df, p), f"mismatch {new.__name__} {p}"
+                    checked += 1
+print(f'   {checked} lookups identical (index {t_new*1000:.0f} ms, scan {t_old*1000:.0f} ms)')
+
+print('[3/3] None/NaN input...')
+for dist, vol in ((None, 10.0), (float("nan"), 10.0), (50.0, float("nan"))):
+    op, typ, mode = sorted(keys)[0]
+    p = studio.LineParams("x", typ, op, mode, vol, dist)
+    for new, old in pairs:
+        try: a = _outcome(new, df, p)
+        except TypeError: a = "TypeError"
+        try: b = _outcome(old, df, p)
+        except TypeError: b = "TypeError"
+        assert a == b, f"mismatch {new.__name__} {p}: {a} != {b}"
+print('OK — service index matches the scan implementation')
@@ -0,0 +1,122 @@
+import os, sys, time, tempfile, threading, socketserver, smtplib
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# SMTP-pool en uitgaande wachtrij tegen een lokale SMTP-server (aiosmtpd-achtig, zonder TLS):
+# HANDSHAKE simuleert de kosten van connect + STARTTLS + login per verbinding.
+
+HANDSHAKE = float(os.environ.get("BENCH_HANDSHAKE", "0.1"))
+N = int(os.environ.get("BENCH_N", "30"))
+
+
+class SmtpStandIn(socketserver.StreamRequestHandler):
+    """EHLO/AUTH/MAIL/RCPT/DATA/RSET/NOOP/QUIT. RCPT reject@* → 550, busy@* → eerste keer 451.
+    drop_after = verbinding na zoveel berichten stil sluiten (idle-timeout van de server)."""
+    stats = {"connections": 0, "messages": 0, "auth": 0}
+    inbox, busy_seen, drop_after = [], set(), 0
+    lock = threading.Lock()
+
+    def _say(self, line): self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        with self.lock: self.stats["connections"] += 1
+        time.sleep(HANDSHAKE)
+        self._say("220 localhost stand-in"); sent = 0; rcpt = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw: return
+            cmd = raw.decode().strip(); verb = cmd.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._say("250-localhost"); self._say("250-AUTH PLAIN LOGIN"); self._say("250 8BITMIME")
+            elif verb == "AUTH":
+                with self.lock: self.stats["auth"] += 1
+                self._say("235 ok")
+            elif verb == "MAIL":
+                rcpt = []; self._say("250 ok")
+            elif verb == "RCPT":
+                addr = cmd.split(":", 1)[1].strip(" <>")
+                with self.lock:
+                    busy = addr.startswith("busy@") and addr not in self.busy_seen; self.busy_seen.add(addr)
+                if addr.startswith("reject@"): self._say("550 no such user")
+                elif busy: self._say("451 try again later")
+                else: rcpt.append(addr); self._say("250 ok")
+            elif verb == "DATA":
+                self._say("354 go")
+                while self.rfile.readline() not in (b".\r\n", b""): pass
+                with self.lock: self.stats["messages"] += 1; self.inbox.extend(rcpt)
+                self._say("250 queued"); sent += 1
+                if self.drop_after and sent >= self.drop_after: return
+            elif verb in ("RSET", "NOOP"):
+                self._say("250 ok")
+            elif verb == "QUIT":
+                self._say("221 bye"); return
+            else:
+                self._say("502 unknown")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True; allow_reuse_address = True
+
+srv = _Server(("127.0.0.1", 0), SmtpStandIn)
+threading.Thread(target=srv.serve_forever, daemon=True).start()
+tmp = tempfile.mkdtemp()
+os.environ.update(SMTP_HOST="127.0.0.1", SMTP_PORT=str(srv.server_address[1]), SMTP_USER="quotes@example.com", SMTP_PASS="x",
+                  SMTP_SECURITY="none", DB_PATH=os.path.join(tmp, "mail.db"), OUT_DIR=tmp, JOB_POLL_SECONDS="0.1",
+                  EMAIL_RETRY_SECONDS="0.2", PIPELINE_WORKERS="2")
+import email_service, storage, jobs
+
+def _reset():
+    with SmtpStandIn.lock:
+        for k in SmtpStandIn.stats: SmtpStandIn.stats[k] = 0
+        SmtpStandIn.inbox.clear()
+
+html = "<p>Offerte</p>"
+print(f'[1/4] {N} mails: nieuwe verbinding per mail vs pool (handshake {HANDSHAKE * 1000:.0f} ms)...')
+_reset(); t = time.perf_counter()
+for i in range(N):   # zoals het oude send_via_smtp: connect + login per mail
+    msg = email_service.build_message("quotes@example.com", f"klant{i}@example.com", "Offerte", html)
+    with smtplib.SMTP("127.0.0.1", srv.server_address[1]) as s:
+        s.login("quotes@example.com", "x"); s.sendmail("quotes@example.com", [f"klant{i}@example.com"], msg.as_string())
+t_old = time.perf_counter() - t; conn_old = SmtpStandIn.stats["connections"]
+_reset(); t = time.perf_counter()
+for i in range(N):
+    r = email_service.send_via_smtp(f"klant{i}@example.com", "Offerte", html)
+    assert r["ok"], r
+t_pool = time.perf_counter() - t; conn_pool = SmtpStandIn.stats["connections"]
+assert conn_old == N and conn_pool == 1 and SmtpStandIn.stats["messages"] == N, (conn_old, SmtpStandIn.stats)
+print(f'   per mail {conn_old} verbindingen {t_old:.2f} s   pool {conn_pool} verbinding {t_pool:.2f} s')
+
+print('[2/4] Server sluit na elke 4 mails: pool verbindt opnieuw...')
+_reset(); email_service.close_pools(); SmtpStandIn.drop_after = 4
+for i in range(12):
+    r = email_service.send_via_smtp(f"drop{i}@example.com", "Offerte", html)
+    assert r["ok"], r
+SmtpStandIn.drop_after = 0
+assert SmtpStandIn.stats["messages"] == 12 and SmtpStandIn.stats["connections"] == 3, SmtpStandIn.stats
+print(f'   12 verzonden over {SmtpStandIn.stats["connections"]} verbindingen; pool {email_service.get_pool().stats()}')
+
+print('[3/4] HTTP: /email/send geeft direct een send_id, de wachtrij verstuurt...')
+from fastapi.testclient import TestClient
+import app as app_module
+_reset(); email_service.close_pools()
+with TestClient(app_module.app) as client:
+    opt = {"label": "ROAD", "buy_total": 80.0, "sell_total": 100.0, "validity": "30 dagen", "pdf_path": "", "mode": "ROAD"}
+    t = time.perf_counter()
+    ids = [client.post("/email/send", json={"to": f"bulk{i}@example.com", "options": [opt]}).json() for i in range(20)]
+    t_api = (time.perf_counter() - t) / 20
+    assert all(r["ok"] and r["info"] == "queued" and r["send_id"] for r in ids), ids[0]
+    st = [client.get(f"/email/send/{r['send_id']}?wait=10").json() for r in ids]
+    assert all(s["status"] == "done" for s in st), [s for s in st if s["status"] != "done"][:1]
+    sent_events = [e for e in storage.events_since(0, ["email.sent"])]
+    assert len(sent_events) == 20 and SmtpStandIn.stats["messages"] == 20, (len(sent_events), SmtpStandIn.stats)
+    print(f'   {t_api * 1000:.1f} ms per request; 20 verzonden over {SmtpStandIn.stats["connections"]} verbinding(en)')
+
+    print('[4/4] Tijdelijke fout (451) → nieuwe poging; permanente fout (550) → failed...')
+    busy = client.post("/pipeline/send_raw", json={"to": "busy@example.com", "subject": "Offerte", "html": html}).json()
+    bad = client.post("/pipeline/send_raw", json={"to": "reject@example.com", "subject": "Offerte", "html": html}).json()
+    s_busy = client.get(f"/email/send/{busy['send_id']}?wait=10").json()
+    s_bad = client.get(f"/email/send/{bad['send_id']}?wait=10").json()
+    assert s_busy["status"] == "done" and s_busy["attempts"] == 2, s_busy
+    assert s_bad["status"] == "failed" and s_bad["attempts"] == 1 and "550" in (s_bad["error"] or ""), s_bad
+    print(f'   busy: {s_busy["status"]} na {s_busy["attempts"]} pogingen   reject: {s_bad["status"]} ({s_bad["error"][:40]}...)')
+print(f'OK — pool {t_old / t_pool:.1f}x sneller ({conn_old}→{conn_pool} verbindingen), API {t_api * 1000:.1f} ms per send, retry/failed correct')
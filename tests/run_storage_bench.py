@@ -0,0 +1,51 @@
+import os, sys, time, tempfile
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+# Benchmark: offerte wegschrijven met losse calls (new_quote + add_option per optie +
+# set_quote_status + log_event) tegen storage.save_quote (één transactie), op een DB-bestand.
+
+N = int(os.environ.get("BENCH_N", "500"))
+OPTIONS = 4
+
+tmp = tempfile.mkdtemp()
+os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+import storage
+storage.init_db()
+
+def _opts(i):
+    return [{"mode": m, "label": f"{m} – quote {i}", "buy_total": 850.0 + i, "sell_total": 1000.0 + i,
+             "validity": "14 dagen", "pdf_path": f"out/quote_{i}_{m}.pdf"} for m in ("LCL", "FCL", "AIR", "ROAD")[:OPTIONS]]
+
+def _count(table):
+    return storage._conn().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+print('[1/3] Atomicity...')
+qid = storage.save_quote({"source_id": "m1"}, _opts(0), [("quote.priced", {"n": OPTIONS})])
+before = (_count("quotes"), _count("quote_options"), _count("events"))
+try:
+    storage.save_quote({"id": qid, "source_id": "m1"}, _opts(1), [("quote.priced", {})])   # dubbele id
+    raise AssertionError("expected IntegrityError")
+except storage.sqlite3.IntegrityError:
+    pass
+assert (_count("quotes"), _count("quote_options"), _count("events")) == before, "partial write"
+print(f'   failed save left nothing behind {before}')
+
+print(f'[2/3] Separate calls, {N} quotes x {OPTIONS} options...')
+t = time.perf_counter()
+for i in range(N):
+    q = storage.new_quote(f"m{i}")
+    for o in _opts(i): storage.add_option(q, o)
+    storage.set_quote_status(q, "priced"); storage.log_event("quote.priced", {"quote_id": q})
+old = N / (time.perf_counter() - t)
+print(f'   {old:,.0f} quotes/s')
+
+print(f'[3/3] save_quote, {N} quotes x {OPTIONS} options...')
+t = time.perf_counter()
+for i in range(N):
+    storage.save_quote({"source_id": f"m{i}"}, _opts(i), [("quote.priced", {"source_id": f"m{i}"})])
+new = N / (time.perf_counter() - t)
+print(f'   {new:,.0f} quotes/s')
+assert _count("quotes") == 2 * N + 1 and _count("quote_options") == 2 * N * OPTIONS + OPTIONS
+storage.close_all()
+print(f'OK — save_quote {new / old:.1f}x faster ({old:,.0f} -> {new:,.0f} quotes/s)')